@@ -3,9 +3,15 @@
 모든 전문 에이전트들을 조율하여 최종 발주 결정을 내립니다.
 """
 from langchain_openai import ChatOpenAI
-from typing import Dict, List
+from langchain.schema import HumanMessage, SystemMessage
+from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
 import json
 import logging
+import os
+import re
 
 from .inventory_agent import InventoryAgent
 from .sales_agent import SalesAgent
@@ -14,6 +20,104 @@ from .order_agent import OrderAgent
 
 logger = logging.getLogger(__name__)
 
+# 간단한 의도 판별용 키워드 패턴 (메시지 한 번 스캔으로 판별)
+_GREETING_RE = re.compile(r'안녕|hello|hi|헬로', re.IGNORECASE)
+_HELP_RE = re.compile(r'도움|help|기능|뭐|할수', re.IGNORECASE)
+_THANKS_RE = re.compile(r'고마|감사|thank', re.IGNORECASE)
+
+# OrderAgent 입력 압축용 패턴 (마크다운 기호, 구분선, 연속 공백)
+_MD_HEADER_RE = re.compile(r'^\s*(?:#{1,6}|>)\s*')
+_MD_BULLET_RE = re.compile(r'^\s*[-*+]\s+')
+_MD_INLINE_RE = re.compile(r'\*\*|__|`')
+_RULE_RE = re.compile(r'^\s*(?:[-=*_]\s*){3,}$')
+_SPACES_RE = re.compile(r'[ \t]+')
+
+# 친근한 편의점 직원 스타일 시스템 프롬프트
+CHAT_SYSTEM_PROMPT = """당신은 편의점 AI 어시스턴트입니다. 친근하고 유연하게 대화하세요.
+
+**대화 스타일:**
+- 친근한 편의점 직원처럼 말하기
+- 존댓말 사용하되 너무 딱딱하지 않게
+- 이모지 적절히 사용 (📦, 🔥, ☔ 등)
+- 간결하고 핵심만 전달
+- 불필요한 나열 금지
+
+**답변 방식:**
+1. 먼저 질문에 직접 답변
+2. 필요한 정보만 간단히 설명
+3. 추가 도움 제안
+
+**예시:**
+❌ 나쁜 답변: "다음 기능을 제공합니다: • 재고 확인 • 판매 분석..."
+✅ 좋은 답변: "안녕하세요! 😊 재고 확인, 판매 분석, 날씨 예측 도와드려요. 뭐가 궁금하세요?"
+
+**중요:** 
+- 지식 베이스 정보가 제공되면 자연스럽게 녹여서 답변
+- 리스트 나열보다는 문장으로 설명
+- 사용자가 물어본 것에만 집중"""
+
+
+# LLM 응답 캐시는 프로세스당 한 번만 설정
+_llm_cache_initialized = False
+
+
+def _init_llm_cache():
+    """
+    temperature=0 에이전트 호출용 LLM 응답 캐시 설정
+    
+    REDIS_URL이 있으면 Redis, 없으면 로컬 SQLite 파일을 사용합니다.
+    LLM_CACHE_ENABLED=false 로 비활성화할 수 있습니다.
+    """
+    global _llm_cache_initialized
+    if _llm_cache_initialized:
+        return
+    _llm_cache_initialized = True
+    
+    if os.getenv("LLM_CACHE_ENABLED", "true").lower() != "true":
+        return
+    
+    try:
+        from langchain.globals import set_llm_cache
+        
+        redis_url = os.getenv("REDIS_URL")
+        if redis_url:
+            from redis import Redis
+            from langchain_community.cache import RedisCache
+            set_llm_cache(RedisCache(redis_=Redis.from_url(redis_url)))
+            logger.info("LLM 응답 캐시: Redis")
+        else:
+            from langchain_community.cache import SQLiteCache
+            cache_path = os.getenv("LLM_CACHE_PATH", ".langchain_cache.db")
+            set_llm_cache(SQLiteCache(database_path=cache_path))
+            logger.info(f"LLM 응답 캐시: SQLite ({cache_path})")
+    except ImportError as e:
+        logger.warning(f"LLM 응답 캐시 설정 실패: {e}")
+
+
+@functools.lru_cache(maxsize=None)
+def _build_agents(api_key: str, model: str) -> tuple:
+    """
+    LLM과 전문 에이전트 4개 생성 (동일 설정이면 재사용)
+    
+    에이전트는 생성 후 상태가 없으므로 같은 api_key/model의 코디네이터끼리 공유해도 안전합니다.
+    
+    Returns:
+        tuple: (llm, inventory_agent, sales_agent, weather_agent, order_agent)
+    """
+    llm = ChatOpenAI(
+        temperature=0,
+        model=model,
+        openai_api_key=api_key
+    )
+    
+    # 각 에이전트의 프롬프트/도구 스키마 구성을 병렬로 수행
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        inventory = executor.submit(InventoryAgent, llm)
+        sales = executor.submit(SalesAgent, llm)
+        weather = executor.submit(WeatherAgent, llm)
+        order = executor.submit(OrderAgent, llm, api_key=api_key)
+        return llm, inventory.result(), sales.result(), weather.result(), order.result()
+
 
 class CoordinatorAgent:
     """
@@ -30,28 +134,45 @@ class CoordinatorAgent:
         self.api_key = api_key  # 추가
         self.model = model      # 추가
         
-        self.llm = ChatOpenAI(
-            temperature=0,
-            model=model,
-            openai_api_key=api_key
-        )
+        _init_llm_cache()
         
         # 전문 에이전트들 초기화
-        self.inventory_agent = InventoryAgent(self.llm)
-        self.sales_agent = SalesAgent(self.llm)
-        self.weather_agent = WeatherAgent(self.llm)
-        self.order_agent = OrderAgent(self.llm)
+        (
+            self.llm,
+            self.inventory_agent,
+            self.sales_agent,
+            self.weather_agent,
+            self.order_agent
+        ) = _build_agents(api_key, model)
+        
+        # 대화형 LLM (temperature 높여서 자연스럽게) - 요청마다 생성하지 않고 재사용
+        self._chat_llm = ChatOpenAI(
+            model=model,
+            api_key=api_key,
+            temperature=0.7,  # 자연스러운 대화를 위해 높임
+            cache=False  # 응답이 매번 달라야 하므로 LLM 캐시 제외
+        )
+        self._system_msg = SystemMessage(content=CHAT_SYSTEM_PROMPT)
     
-    def generate_order_recommendation(self, user_request: str = None) -> Dict:
+    async def generate_order_recommendation(
+        self,
+        user_request: str = None,
+        use_batch_api: bool = False
+    ) -> Dict:
         """
         전체 워크플로우 실행하여 발주 추천 생성
         
+        재고/판매/날씨 분석(Step 1~3)은 서로 독립적이므로 동시에 실행하고,
+        세 결과가 모두 모이면 OrderAgent(Step 4)가 최종 발주안을 생성합니다.
+        
+        Args:
+            user_request: 사용자 요청
+            use_batch_api: True이면 Step 4를 OpenAI Batch API로 실행 (야간 자동 발주 전용)
+        
         Returns:
             Dict: 각 에이전트의 분석 결과와 최종 발주 추천
         """
-        print("\n" + "="*80)
-        print("🤖 멀티에이전트 발주 시스템 시작")
-        print("="*80 + "\n")
+        logger.info("🤖 멀티에이전트 발주 시스템 시작")
         
         workflow_results = {
             "timestamp": __import__('datetime').datetime.now().isoformat(),
@@ -60,43 +181,114 @@ class CoordinatorAgent:
             "final_recommendation": None
         }
         
-        # Step 1: 재고 분석
-        print("\n📦 Step 1: 재고 상태 분석 (InventoryAgent)")
-        print("-" * 80)
-        inventory_analysis = self.inventory_agent.get_low_stock_alert()
-        workflow_results["agents_analysis"]["inventory"] = inventory_analysis
-        print(f"✅ 완료: {inventory_analysis['analysis'][:200]}...")
+        # Step 1~3: 재고 / 판매 패턴 / 날씨 분석 (병렬 실행)
+        logger.info("⚡ Step 1~3: 재고·판매·날씨 분석 병렬 실행 (InventoryAgent, SalesAgent, WeatherAgent)")
         
-        # Step 2: 판매 패턴 분석
-        print("\n📊 Step 2: 판매 패턴 분석 (SalesAgent)")
-        print("-" * 80)
-        sales_analysis = self.sales_agent.get_trending_analysis()
-        workflow_results["agents_analysis"]["sales"] = sales_analysis
-        print(f"✅ 완료: {sales_analysis['analysis'][:200]}...")
+        async def _run(key: str, coro) -> tuple:
+            result = await coro
+            # 먼저 끝난 분석은 나머지를 기다리는 동안 OrderAgent 입력용으로 미리 압축
+            self._compress_analysis(result)
+            return key, result
+        
+        analyses = {}
+        for next_done in asyncio.as_completed([
+            _run("inventory", self.inventory_agent.aget_low_stock_alert()),
+            _run("sales", self.sales_agent.aget_trending_analysis()),
+            _run("weather", self.weather_agent.aget_weather_recommendations())
+        ]):
+            key, result = await next_done
+            analyses[key] = result
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(f"✅ {result['agent']} 분석 완료: {result['analysis'][:200]}...")
         
-        # Step 3: 날씨 기반 수요 예측
-        print("\n🌤️ Step 3: 날씨 기반 수요 예측 (WeatherAgent)")
-        print("-" * 80)
-        weather_analysis = self.weather_agent.get_weather_recommendations()
+        inventory_analysis = analyses["inventory"]
+        sales_analysis = analyses["sales"]
+        weather_analysis = analyses["weather"]
+        workflow_results["agents_analysis"]["inventory"] = inventory_analysis
+        workflow_results["agents_analysis"]["sales"] = sales_analysis
         workflow_results["agents_analysis"]["weather"] = weather_analysis
-        print(f"✅ 완료: {weather_analysis['analysis'][:200]}...")
         
         # Step 4: 최종 발주안 생성
-        print("\n📋 Step 4: 최적 발주안 생성 (OrderAgent)")
-        print("-" * 80)
+        logger.info("📋 Step 4: 최적 발주안 생성 (OrderAgent)")
         
         # 모든 분석 결과를 종합
-        combined_insights = f"""
+        combined_insights = self._build_combined_insights(
+            inventory_analysis, sales_analysis, weather_analysis
+        )
+        
+        if use_batch_api:
+            final_order = (await asyncio.to_thread(
+                self.order_agent.analyze_batch, [combined_insights]
+            ))[0]
+        else:
+            final_order = await asyncio.to_thread(self.order_agent.analyze, combined_insights)
+        workflow_results["agents_analysis"]["order"] = final_order
+        workflow_results["final_recommendation"] = final_order["analysis"]
+        
+        # order_items 추가 (OrderAgent에서 생성한 구조화된 데이터)
+        workflow_results["order_items"] = final_order.get("order_items", [])
+        workflow_results["total_items"] = final_order.get("total_items", 0)
+        workflow_results["total_cost"] = final_order.get("total_cost", 0)
+        
+        # 각 에이전트 분석을 텍스트로 저장 (DB 저장용)
+        workflow_results["inventory_analysis"] = inventory_analysis.get("analysis", "")
+        workflow_results["sales_analysis"] = sales_analysis.get("analysis", "")
+        workflow_results["weather_analysis"] = weather_analysis.get("analysis", "")
+        
+        # 요약
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "✨ 멀티에이전트 분석 완료 - 발주 품목 %d개, 총 금액 %s원 (참여 에이전트 %d개)",
+                len(workflow_results['order_items']),
+                f"{workflow_results['total_cost']:,.0f}",
+                len(workflow_results['agents_analysis'])
+            )
+        
+        return workflow_results
+    
+    def _compress_analysis(self, analysis: Dict) -> str:
+        """
+        OrderAgent에 넘길 분석 텍스트 압축 (규칙 기반, LLM 호출 없음)
+        
+        빈 줄, 마크다운 서식, 구분선, 중복 줄을 제거하고 상품명/숫자는 그대로 둡니다.
+        결과는 분석 dict에 저장해 같은 분석을 다시 압축하지 않습니다.
+        """
+        if "compressed_analysis" in analysis:
+            return analysis["compressed_analysis"]
+        
+        lines = []
+        seen = set()
+        for line in analysis.get("analysis", "").splitlines():
+            if _RULE_RE.match(line):
+                continue
+            line = _MD_BULLET_RE.sub("- ", _MD_HEADER_RE.sub("", line))
+            line = _SPACES_RE.sub(" ", _MD_INLINE_RE.sub("", line)).strip()
+            if not line or line in seen:
+                continue
+            seen.add(line)
+            lines.append(line)
+        
+        analysis["compressed_analysis"] = "\n".join(lines)
+        return analysis["compressed_analysis"]
+    
+    def _build_combined_insights(
+        self,
+        inventory_analysis: Dict,
+        sales_analysis: Dict,
+        weather_analysis: Dict
+    ) -> str:
+        """OrderAgent에 전달할 통합 분석 텍스트 생성"""
+        return f"""
 다음은 각 전문 에이전트의 분석 결과입니다:
 
 [재고 분석 - InventoryAgent]
-{inventory_analysis['analysis']}
+{self._compress_analysis(inventory_analysis)}
 
 [판매 분석 - SalesAgent]
-{sales_analysis['analysis']}
+{self._compress_analysis(sales_analysis)}
 
 [날씨 분석 - WeatherAgent]
-{weather_analysis['analysis']}
+{self._compress_analysis(weather_analysis)}
 
 위 모든 분석을 종합하여 최적의 발주안을 생성해주세요.
 각 상품별로:
@@ -106,43 +298,51 @@ class CoordinatorAgent:
 4. 최종 추천 발주량
 을 포함해주세요.
 """
+    
+    async def generate_order_recommendations_batch(
+        self,
+        requests: List[str],
+        max_concurrency: int = 5,
+        rate_limit_rpm: Optional[float] = None
+    ) -> List:
+        """
+        여러 매장/날짜에 대한 발주 추천을 동시에 생성
         
-        final_order = self.order_agent.analyze(combined_insights)
-        workflow_results["agents_analysis"]["order"] = final_order
-        workflow_results["final_recommendation"] = final_order["analysis"]
+        Args:
+            requests: 워크플로우별 사용자 요청 목록
+            max_concurrency: 동시에 실행할 최대 워크플로우 수
+            rate_limit_rpm: 분당 최대 워크플로우 시작 수 (None이면 제한 없음)
         
-        # order_items 추가 (OrderAgent에서 생성한 구조화된 데이터)
-        workflow_results["order_items"] = final_order.get("order_items", [])
-        workflow_results["total_items"] = final_order.get("total_items", 0)
-        workflow_results["total_cost"] = final_order.get("total_cost", 0)
+        Returns:
+            List: 입력 순서와 동일한 결과 목록 (실패한 항목은 Exception 객체)
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        interval = 60.0 / rate_limit_rpm if rate_limit_rpm else 0.0
         
-        # 각 에이전트 분석을 텍스트로 저장 (DB 저장용)
-        workflow_results["inventory_analysis"] = inventory_analysis.get("analysis", "")
-        workflow_results["sales_analysis"] = sales_analysis.get("analysis", "")
-        workflow_results["weather_analysis"] = weather_analysis.get("analysis", "")
+        async def _guarded(request: str) -> Dict:
+            async with semaphore:
+                return await self.generate_order_recommendation(request)
         
-        print(f"✅ 완료: 최종 발주안 생성 완료")
-        print(f"📦 발주 품목: {len(workflow_results['order_items'])}개")
-        print(f"💰 총 금액: {workflow_results['total_cost']:,.0f}원")
+        tasks = []
+        for i, request in enumerate(requests):
+            # 요청 간격을 두고 제출하여 API 레이트 리밋 준수
+            if interval and i > 0:
+                await asyncio.sleep(interval)
+            tasks.append(asyncio.create_task(_guarded(request)))
         
-        # 요약
-        print("\n" + "="*80)
-        print("✨ 멀티에이전트 분석 완료")
-        print("="*80)
-        print(f"\n참여 에이전트: {len(workflow_results['agents_analysis'])}개")
-        print("- InventoryAgent: 재고 상태 분석")
-        print("- SalesAgent: 판매 패턴 및 수요 예측")
-        print("- WeatherAgent: 날씨 기반 조정")
-        print("- OrderAgent: 최적 발주안 생성")
-        print("\n" + "="*80 + "\n")
+        results = await asyncio.gather(*tasks, return_exceptions=True)
         
-        return workflow_results
+        failed = sum(1 for r in results if isinstance(r, Exception))
+        if failed:
+            logger.warning(f"배치 발주 추천 중 {failed}/{len(results)}건 실패")
+        
+        return list(results)
     
     def analyze_specific_product(self, product_name: str) -> Dict:
         """
         특정 상품에 대한 심층 분석
         """
-        print(f"\n🔍 '{product_name}' 상품 심층 분석 시작\n")
+        logger.info("🔍 '%s' 상품 심층 분석 시작", product_name)
         
         results = {
             "product": product_name,
@@ -177,53 +377,18 @@ class CoordinatorAgent:
         """
         사용자와의 대화형 인터페이스 (자연스러운 대화)
         """
-        from langchain_openai import ChatOpenAI
-        from langchain.schema import HumanMessage, SystemMessage
-        
-        # 대화형 LLM (temperature 높여서 자연스럽게)
-        chat_llm = ChatOpenAI(
-            model=self.model,
-            api_key=self.api_key,
-            temperature=0.7  # 자연스러운 대화를 위해 높임
-        )
-        
-        # 친근한 편의점 직원 스타일 시스템 프롬프트
-        system_prompt = """당신은 편의점 AI 어시스턴트입니다. 친근하고 유연하게 대화하세요.
-
-**대화 스타일:**
-- 친근한 편의점 직원처럼 말하기
-- 존댓말 사용하되 너무 딱딱하지 않게
-- 이모지 적절히 사용 (📦, 🔥, ☔ 등)
-- 간결하고 핵심만 전달
-- 불필요한 나열 금지
-
-**답변 방식:**
-1. 먼저 질문에 직접 답변
-2. 필요한 정보만 간단히 설명
-3. 추가 도움 제안
-
-**예시:**
-❌ 나쁜 답변: "다음 기능을 제공합니다: • 재고 확인 • 판매 분석..."
-✅ 좋은 답변: "안녕하세요! 😊 재고 확인, 판매 분석, 날씨 예측 도와드려요. 뭐가 궁금하세요?"
-
-**중요:** 
-- 지식 베이스 정보가 제공되면 자연스럽게 녹여서 답변
-- 리스트 나열보다는 문장으로 설명
-- 사용자가 물어본 것에만 집중"""
-
         try:
             # 간단한 인사 처리
-            message_lower = user_message.lower()
-            if any(word in message_lower for word in ["안녕", "hello", "hi"]):
+            if _GREETING_RE.search(user_message):
                 return "안녕하세요! 😊 편의점 AI 어시스턴트예요.\n\n재고 확인, 판매 분석, 날씨 예측, 발주 정보 등 도와드릴게요. 뭐가 궁금하세요?"
             
             # LLM으로 자연스럽게 답변
             messages = [
-                SystemMessage(content=system_prompt),
+                self._system_msg,
                 HumanMessage(content=user_message)
             ]
             
-            response = chat_llm.invoke(messages).content
+            response = self._chat_llm.invoke(messages).content
             return response
             
         except Exception as e:
@@ -232,13 +397,11 @@ class CoordinatorAgent:
     
     def _simple_response(self, message: str) -> str:
         """간단한 인사나 질문에 대한 직접 응답 (Agent 호출 없음)"""
-        message_lower = message.lower()
-        
-        if any(word in message_lower for word in ["안녕", "hello", "hi", "헬로"]):
+        if _GREETING_RE.search(message):
             return "안녕하세요! 😊 편의점 AI 어시스턴트예요.\n\n재고 확인, 판매 분석, 날씨 예측 도와드릴게요. 뭐가 궁금하세요?"
-        elif any(word in message_lower for word in ["도움", "help", "기능", "뭐", "할수"]):
+        elif _HELP_RE.search(message):
             return "이런 걸 도와드릴 수 있어요! 😊\n\n• 재고 확인 - \"재고 부족한 거 뭐야?\"\n• 판매 분석 - \"어제 뭐 많이 팔렸어?\"\n• 날씨 예측 - \"내일 날씨 어때?\"\n• 상품 정보 - \"삼각김밥 발주 기준이 뭐야?\"\n\n편하게 물어보세요!"
-        elif any(word in message_lower for word in ["고마", "감사", "thank"]):
+        elif _THANKS_RE.search(message):
             return "천만에요! 😊 더 궁금한 거 있으면 언제든 물어보세요!"
         else:
             return "음... 잘 이해하지 못했어요. 😅\n\n재고, 판매, 날씨, 상품 정보 같은 걸 물어보시면 도와드릴게요!"
\ No newline at end of file
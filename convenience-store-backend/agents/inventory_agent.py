@@ -3,13 +3,15 @@
 현재 재고 상태를 분석하고 부족한 상품을 파악합니다.
 """
 try:
-    from langchain.agents import AgentExecutor, create_openai_functions_agent
+    from langchain.agents import AgentExecutor, create_openai_functions_agent, create_openai_tools_agent
 except ImportError:
     from langchain.agents import AgentExecutor
     from langchain.agents.openai_functions_agent.base import create_openai_functions_agent
+    from langchain.agents.openai_tools.base import create_openai_tools_agent
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
 from typing import Dict, List
+from utils.cache import ttl_cache
 from tools.inventory_tools import (
     get_current_inventory,
     get_low_stock_items,
@@ -18,23 +20,12 @@ from tools.inventory_tools import (
 )
 
 
-class InventoryAgent:
-    """재고 관리 전문 에이전트"""
-    
-    def __init__(self, llm: ChatOpenAI):
-        self.llm = llm
-        self.tools = [
-            get_current_inventory,
-            get_low_stock_items,
-            get_expiring_products,
-            calculate_stock_turnover
-        ]
-        self.agent_executor = self._create_agent()
-    
-    def _create_agent(self) -> AgentExecutor:
-        """에이전트 생성"""
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", """당신은 편의점 재고 관리 전문가입니다.
+LOW_STOCK_ALERT_REQUEST = "현재 재고가 부족한 상품을 찾아서 상세히 분석해주세요. 각 상품의 현재 재고, 안전 재고, 부족량을 포함해주세요."
+
+
+# 프롬프트 템플릿은 에이전트 생성마다 다시 파싱하지 않도록 모듈 로드 시 한 번만 생성
+_INVENTORY_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """당신은 편의점 재고 관리 전문가입니다.
             
 당신의 역할:
 1. 현재 재고 상태를 정확히 파악합니다
@@ -49,12 +40,33 @@ class InventoryAgent:
 - 과잉/부족 재고 파악
 
 항상 데이터 기반으로 객관적인 분석을 제공하세요."""),
-            MessagesPlaceholder(variable_name="chat_history", optional=True),
-            ("user", "{input}"),
-            MessagesPlaceholder(variable_name="agent_scratchpad"),
-        ])
-        
-        agent = create_openai_functions_agent(self.llm, self.tools, prompt)
+    MessagesPlaceholder(variable_name="chat_history", optional=True),
+    ("user", "{input}"),
+    MessagesPlaceholder(variable_name="agent_scratchpad"),
+])
+
+
+class InventoryAgent:
+    """재고 관리 전문 에이전트"""
+    
+    def __init__(self, llm: ChatOpenAI, parallel_tools: bool = True):
+        self.llm = llm
+        self.parallel_tools = parallel_tools
+        self.tools = [
+            get_current_inventory,
+            get_low_stock_items,
+            get_expiring_products,
+            calculate_stock_turnover
+        ]
+        self.agent_executor = self._create_agent()
+    
+    def _create_agent(self) -> AgentExecutor:
+        """에이전트 생성"""
+        if self.parallel_tools:
+            # 한 턴에 여러 도구 호출 허용 (ainvoke 시 AgentExecutor가 동시에 실행)
+            agent = create_openai_tools_agent(self.llm, self.tools, _INVENTORY_PROMPT)
+        else:
+            agent = create_openai_functions_agent(self.llm, self.tools, _INVENTORY_PROMPT)
         return AgentExecutor(agent=agent, tools=self.tools, verbose=False)
     
     def analyze(self, request: str) -> Dict:
@@ -66,10 +78,24 @@ class InventoryAgent:
             "role": "재고 상태 분석"
         }
     
+    async def aanalyze(self, request: str) -> Dict:
+        """재고 분석 수행 (비동기)"""
+        response = await self.agent_executor.ainvoke({"input": request})
+        return {
+            "agent": "InventoryAgent",
+            "analysis": response["output"],
+            "role": "재고 상태 분석"
+        }
+    
+    @ttl_cache(ttl_seconds=300)
     def get_low_stock_alert(self) -> Dict:
         """재고 부족 알림"""
-        request = "현재 재고가 부족한 상품을 찾아서 상세히 분석해주세요. 각 상품의 현재 재고, 안전 재고, 부족량을 포함해주세요."
-        return self.analyze(request)
+        return self.analyze(LOW_STOCK_ALERT_REQUEST)
+    
+    @ttl_cache(ttl_seconds=300)
+    async def aget_low_stock_alert(self) -> Dict:
+        """재고 부족 알림 (비동기)"""
+        return await self.aanalyze(LOW_STOCK_ALERT_REQUEST)
     
     def check_expiring_items(self) -> Dict:
         """유통기한 임박 상품 확인"""
@@ -4,41 +4,26 @@
 """
 from langchain_openai import ChatOpenAI
 from langchain.schema import HumanMessage, SystemMessage
-from typing import Dict, List
+from typing import Dict, List, Optional
 import json
 import re
+import time
 
+from openai import OpenAI
 
-class OrderAgent:
-    """발주 최적화 전문 에이전트 - 구조화된 발주 데이터 생성"""
-    
-    def __init__(self, llm: ChatOpenAI):
-        self.llm = llm
-    
-    def _safe_int(self, value, default=0):
-        """안전한 정수 변환"""
-        if value in [None, "", "N/A", "n/a", "null"]:
-            return default
-        try:
-            return int(float(value))  # "10.0" 같은 경우 처리
-        except (ValueError, TypeError):
-            return default
-    
-    def _safe_float(self, value, default=0.0):
-        """안전한 실수 변환"""
-        if value in [None, "", "N/A", "n/a", "null"]:
-            return default
-        try:
-            return float(value)
-        except (ValueError, TypeError):
-            return default
-    
-    def analyze(self, integrated_analysis: str) -> Dict:
-        """
-        통합 분석 결과를 받아 구조화된 발주 품목 리스트 생성
-        """
-        
-        system_prompt = """당신은 편의점 발주 최적화 전문가입니다.
+try:
+    import orjson
+    _json_loads = orjson.loads  # orjson.JSONDecodeError는 json.JSONDecodeError의 하위 클래스
+except ImportError:
+    _json_loads = json.loads
+
+# ```json ... ``` 코드 블록에서 JSON 본문 추출
+_JSON_FENCE = re.compile(r'```(?:json)?\s*(\{.*\})\s*```', re.DOTALL)
+
+
+# 시스템 프롬프트는 요청마다 바뀌지 않는 고정 접두부로 두고(가변 데이터는 사용자 메시지 뒤쪽),
+# OpenAI 프롬프트 캐시가 반복 실행 간에 적중하도록 합니다.
+ORDER_SYSTEM_PROMPT = """당신은 편의점 발주 최적화 전문가입니다.
 
 재고 분석, 판매 분석, 날씨 분석 결과를 종합하여 **구조화된 발주 품목 리스트**를 생성하세요.
 
@@ -96,9 +81,10 @@ class OrderAgent:
 
 **중요**: 반드시 유효한 JSON만 출력하세요. 모든 숫자는 정수 또는 실수로만!"""
 
-        messages = [
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=f"""다음은 각 에이전트의 분석 결과입니다:
+
+def _build_user_content(integrated_analysis: str) -> str:
+    """OrderAgent 사용자 메시지 생성"""
+    return f"""다음은 각 에이전트의 분석 결과입니다:
 
 {integrated_analysis}
 
@@ -106,23 +92,150 @@ class OrderAgent:
 재고가 부족하거나 판매가 증가한 상품, 날씨 영향을 받는 상품을 우선 발주하세요.
 재고가 충분한 상품은 제외하세요.
 
-**다시 한 번 강조**: 모든 숫자 필드는 반드시 숫자만! "N/A" 같은 문자열 금지!""")
+**다시 한 번 강조**: 모든 숫자 필드는 반드시 숫자만! "N/A" 같은 문자열 금지!"""
+
+
+class OrderAgent:
+    """발주 최적화 전문 에이전트 - 구조화된 발주 데이터 생성"""
+    
+    def __init__(self, llm: ChatOpenAI, api_key: Optional[str] = None):
+        self.llm = llm
+        self.api_key = api_key  # Batch API 호출용
+    
+    def _safe_int(self, value, default=0):
+        """안전한 정수 변환"""
+        if value in [None, "", "N/A", "n/a", "null"]:
+            return default
+        try:
+            return int(float(value))  # "10.0" 같은 경우 처리
+        except (ValueError, TypeError):
+            return default
+    
+    def _safe_float(self, value, default=0.0):
+        """안전한 실수 변환"""
+        if value in [None, "", "N/A", "n/a", "null"]:
+            return default
+        try:
+            return float(value)
+        except (ValueError, TypeError):
+            return default
+    
+    def analyze(self, integrated_analysis: str) -> Dict:
+        """
+        통합 분석 결과를 받아 구조화된 발주 품목 리스트 생성
+        """
+        messages = [
+            SystemMessage(content=ORDER_SYSTEM_PROMPT),
+            HumanMessage(content=_build_user_content(integrated_analysis))
         ]
         
         try:
             response = self.llm.invoke(messages)
-            raw_content = response.content.strip()
+        except Exception as e:
+            return self._error_result(e)
+        
+        return self._parse_order_response(response.content)
+    
+    def analyze_batch(
+        self,
+        integrated_analyses: List[str],
+        poll_interval: float = 30.0,
+        timeout: float = 24 * 60 * 60
+    ) -> List[Dict]:
+        """
+        OpenAI Batch API로 여러 발주안을 한 번에 생성 (야간 배치 전용)
+        
+        실시간 호출 대비 비용이 절반이지만 완료까지 최대 24시간이 걸릴 수 있으므로
+        대화형 요청에는 사용하지 마세요.
+        
+        Returns:
+            List[Dict]: 입력 순서와 동일한 발주 결과 목록
+        """
+        if not integrated_analyses:
+            return []
+        
+        client = OpenAI(api_key=self.api_key)
+        model = getattr(self.llm, "model_name", "gpt-3.5-turbo")
+        temperature = getattr(self.llm, "temperature", 0)
+        
+        # 요청별 JSONL 라인 생성
+        lines = []
+        for i, integrated_analysis in enumerate(integrated_analyses):
+            lines.append(json.dumps({
+                "custom_id": str(i),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": model,
+                    "temperature": temperature,
+                    "messages": [
+                        {"role": "system", "content": ORDER_SYSTEM_PROMPT},
+                        {"role": "user", "content": _build_user_content(integrated_analysis)}
+                    ]
+                }
+            }, ensure_ascii=False))
+        
+        try:
+            input_file = client.files.create(
+                file=("order_batch.jsonl", "\n".join(lines).encode("utf-8")),
+                purpose="batch"
+            )
+            batch = client.batches.create(
+                input_file_id=input_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
+            )
+            print(f"📤 Batch 제출 완료: {batch.id} ({len(lines)}건)")
             
-            # JSON 추출 (마크다운 코드 블록 제거)
-            json_match = re.search(r'```json\s*(.*?)\s*```', raw_content, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(1)
-            else:
-                # 코드 블록 없이 바로 JSON인 경우
-                json_str = raw_content
+            # 완료될 때까지 폴링
+            deadline = time.monotonic() + timeout
+            while batch.status not in ("completed", "failed", "expired", "cancelled"):
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Batch {batch.id} 시간 초과 (status={batch.status})")
+                time.sleep(poll_interval)
+                batch = client.batches.retrieve(batch.id)
+            
+            if batch.status != "completed" or not batch.output_file_id:
+                raise RuntimeError(f"Batch {batch.id} 실패 (status={batch.status})")
             
-            # JSON 파싱
-            order_data = json.loads(json_str)
+            output = client.files.content(batch.output_file_id).text
+        except Exception as e:
+            return [self._error_result(e) for _ in integrated_analyses]
+        
+        # custom_id 기준으로 결과 정렬
+        contents = {}
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            response = record.get("response") or {}
+            if response.get("status_code") != 200:
+                continue
+            choices = response.get("body", {}).get("choices") or []
+            if choices:
+                contents[record["custom_id"]] = choices[0]["message"]["content"]
+        
+        results = []
+        for i in range(len(integrated_analyses)):
+            content = contents.get(str(i))
+            if content is None:
+                results.append(self._error_result(RuntimeError(f"Batch 응답 누락 (custom_id={i})")))
+            else:
+                results.append(self._parse_order_response(content))
+        return results
+    
+    def _parse_order_response(self, raw_content: str) -> Dict:
+        """LLM 응답(JSON)을 검증된 발주 결과로 변환"""
+        try:
+            try:
+                # 지시대로 JSON만 응답한 경우 바로 파싱
+                order_data = _json_loads(raw_content)
+            except json.JSONDecodeError:
+                # 마크다운 코드 블록으로 감싼 경우 본문만 추출
+                json_match = _JSON_FENCE.search(raw_content)
+                if not json_match:
+                    raise
+                order_data = _json_loads(json_match.group(1))
             
             # 검증 및 기본값 설정
             if "order_items" not in order_data:
@@ -175,14 +288,18 @@ class OrderAgent:
                 "total_cost": 0
             }
         except Exception as e:
-            print(f"❌ 발주 생성 오류: {e}")
-            import traceback
-            traceback.print_exc()
-            return {
-                "agent": "OrderAgent",
-                "analysis": f"발주 생성 실패: {str(e)}",
-                "role": "발주 최적화 및 생성",
-                "order_items": [],
-                "total_items": 0,
-                "total_cost": 0
-            }
\ No newline at end of file
+            return self._error_result(e)
+    
+    def _error_result(self, error: Exception) -> Dict:
+        """발주 생성 실패 시 빈 발주 결과"""
+        print(f"❌ 발주 생성 오류: {error}")
+        import traceback
+        traceback.print_exc()
+        return {
+            "agent": "OrderAgent",
+            "analysis": f"발주 생성 실패: {str(error)}",
+            "role": "발주 최적화 및 생성",
+            "order_items": [],
+            "total_items": 0,
+            "total_cost": 0
+        }
@@ -3,13 +3,15 @@
 과거 판매 데이터를 분석하고 미래 수요를 예측합니다.
 """
 try:
-    from langchain.agents import AgentExecutor, create_openai_functions_agent
+    from langchain.agents import AgentExecutor, create_openai_functions_agent, create_openai_tools_agent
 except ImportError:
     from langchain.agents import AgentExecutor
     from langchain.agents.openai_functions_agent.base import create_openai_functions_agent
+    from langchain.agents.openai_tools.base import create_openai_tools_agent
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
 from typing import Dict, List
+from utils.cache import ttl_cache
 from tools.sales_tools import (
     get_sales_data,
     analyze_sales_pattern,
@@ -19,24 +21,11 @@ from tools.sales_tools import (
 )
 
 
-class SalesAgent:
-    """판매 분석 전문 에이전트"""
-    
-    def __init__(self, llm: ChatOpenAI):
-        self.llm = llm
-        self.tools = [
-            get_sales_data,
-            analyze_sales_pattern,
-            get_trending_products,
-            predict_daily_sales,
-            analyze_sales_correlation
-        ]
-        self.agent_executor = self._create_agent()
-    
-    def _create_agent(self) -> AgentExecutor:
-        """에이전트 생성"""
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", """당신은 편의점 판매 데이터 분석 전문가입니다.
+TRENDING_ANALYSIS_REQUEST = "현재 인기 상승 중인 상품을 분석하고, 발주 전략을 제안해주세요."
+
+
+_SALES_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """당신은 편의점 판매 데이터 분석 전문가입니다.
             
 당신의 역할:
 1. 과거 판매 데이터를 분석합니다
@@ -52,12 +41,34 @@ class SalesAgent:
 - 과거 데이터 기반 예측
 
 통계적 근거를 바탕으로 명확한 인사이트를 제공하세요."""),
-            MessagesPlaceholder(variable_name="chat_history", optional=True),
-            ("user", "{input}"),
-            MessagesPlaceholder(variable_name="agent_scratchpad"),
-        ])
-        
-        agent = create_openai_functions_agent(self.llm, self.tools, prompt)
+    MessagesPlaceholder(variable_name="chat_history", optional=True),
+    ("user", "{input}"),
+    MessagesPlaceholder(variable_name="agent_scratchpad"),
+])
+
+
+class SalesAgent:
+    """판매 분석 전문 에이전트"""
+    
+    def __init__(self, llm: ChatOpenAI, parallel_tools: bool = True):
+        self.llm = llm
+        self.parallel_tools = parallel_tools
+        self.tools = [
+            get_sales_data,
+            analyze_sales_pattern,
+            get_trending_products,
+            predict_daily_sales,
+            analyze_sales_correlation
+        ]
+        self.agent_executor = self._create_agent()
+    
+    def _create_agent(self) -> AgentExecutor:
+        """에이전트 생성"""
+        if self.parallel_tools:
+            # 한 턴에 여러 도구 호출 허용 (ainvoke 시 AgentExecutor가 동시에 실행)
+            agent = create_openai_tools_agent(self.llm, self.tools, _SALES_PROMPT)
+        else:
+            agent = create_openai_functions_agent(self.llm, self.tools, _SALES_PROMPT)
         return AgentExecutor(agent=agent, tools=self.tools, verbose=False)
     
     def analyze(self, request: str) -> Dict:
@@ -69,6 +80,15 @@ class SalesAgent:
             "role": "판매 패턴 분석 및 수요 예측"
         }
     
+    async def aanalyze(self, request: str) -> Dict:
+        """판매 분석 수행 (비동기)"""
+        response = await self.agent_executor.ainvoke({"input": request})
+        return {
+            "agent": "SalesAgent",
+            "analysis": response["output"],
+            "role": "판매 패턴 분석 및 수요 예측"
+        }
+    
     def predict_tomorrow_sales(self, product: str) -> Dict:
         """내일 판매량 예측"""
         request = f"{product}의 내일 판매량을 예측하고, 예측 근거를 상세히 설명해주세요."
@@ -79,7 +99,12 @@ class SalesAgent:
         request = f"{product}의 판매 패턴을 분석해주세요. 주별, 시간대별 패턴과 트렌드를 포함해주세요."
         return self.analyze(request)
     
+    @ttl_cache(ttl_seconds=300)
     def get_trending_analysis(self) -> Dict:
         """트렌딩 상품 분석"""
-        request = "현재 인기 상승 중인 상품을 분석하고, 발주 전략을 제안해주세요."
-        return self.analyze(request)
+        return self.analyze(TRENDING_ANALYSIS_REQUEST)
+    
+    @ttl_cache(ttl_seconds=300)
+    async def aget_trending_analysis(self) -> Dict:
+        """트렌딩 상품 분석 (비동기)"""
+        return await self.aanalyze(TRENDING_ANALYSIS_REQUEST)
@@ -3,13 +3,15 @@
 날씨 정보를 활용하여 상품 수요 변화를 예측합니다.
 """
 try:
-    from langchain.agents import AgentExecutor, create_openai_functions_agent
+    from langchain.agents import AgentExecutor, create_openai_functions_agent, create_openai_tools_agent
 except ImportError:
     from langchain.agents import AgentExecutor
     from langchain.agents.openai_functions_agent.base import create_openai_functions_agent
+    from langchain.agents.openai_tools.base import create_openai_tools_agent
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
 from typing import Dict, List
+from utils.cache import ttl_cache
 from tools.weather_tools import (
     get_weather_forecast,
     analyze_weather_impact,
@@ -18,23 +20,11 @@ from tools.weather_tools import (
 )
 
 
-class WeatherAgent:
-    """날씨 기반 수요 예측 전문 에이전트"""
-    
-    def __init__(self, llm: ChatOpenAI):
-        self.llm = llm
-        self.tools = [
-            get_weather_forecast,
-            analyze_weather_impact,
-            get_weather_based_recommendations,
-            check_special_events
-        ]
-        self.agent_executor = self._create_agent()
-    
-    def _create_agent(self) -> AgentExecutor:
-        """에이전트 생성"""
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", """당신은 날씨 기반 수요 예측 전문가입니다.
+WEATHER_RECOMMENDATIONS_REQUEST = "내일 날씨를 확인하고, 날씨에 따른 발주 조정 사항을 상세히 추천해주세요."
+
+
+_WEATHER_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """당신은 날씨 기반 수요 예측 전문가입니다.
             
 당신의 역할:
 1. 날씨 예보를 확인합니다
@@ -52,12 +42,33 @@ class WeatherAgent:
 - 과거 날씨별 판매 데이터
 
 날씨 변화에 따른 구체적인 발주 조정안을 제시하세요."""),
-            MessagesPlaceholder(variable_name="chat_history", optional=True),
-            ("user", "{input}"),
-            MessagesPlaceholder(variable_name="agent_scratchpad"),
-        ])
-        
-        agent = create_openai_functions_agent(self.llm, self.tools, prompt)
+    MessagesPlaceholder(variable_name="chat_history", optional=True),
+    ("user", "{input}"),
+    MessagesPlaceholder(variable_name="agent_scratchpad"),
+])
+
+
+class WeatherAgent:
+    """날씨 기반 수요 예측 전문 에이전트"""
+    
+    def __init__(self, llm: ChatOpenAI, parallel_tools: bool = True):
+        self.llm = llm
+        self.parallel_tools = parallel_tools
+        self.tools = [
+            get_weather_forecast,
+            analyze_weather_impact,
+            get_weather_based_recommendations,
+            check_special_events
+        ]
+        self.agent_executor = self._create_agent()
+    
+    def _create_agent(self) -> AgentExecutor:
+        """에이전트 생성"""
+        if self.parallel_tools:
+            # 한 턴에 여러 도구 호출 허용 (ainvoke 시 AgentExecutor가 동시에 실행)
+            agent = create_openai_tools_agent(self.llm, self.tools, _WEATHER_PROMPT)
+        else:
+            agent = create_openai_functions_agent(self.llm, self.tools, _WEATHER_PROMPT)
         return AgentExecutor(agent=agent, tools=self.tools, verbose=False)
     
     def analyze(self, request: str) -> Dict:
@@ -69,10 +80,24 @@ class WeatherAgent:
             "role": "날씨 기반 수요 예측"
         }
     
+    async def aanalyze(self, request: str) -> Dict:
+        """날씨 기반 분석 수행 (비동기)"""
+        response = await self.agent_executor.ainvoke({"input": request})
+        return {
+            "agent": "WeatherAgent",
+            "analysis": response["output"],
+            "role": "날씨 기반 수요 예측"
+        }
+    
+    @ttl_cache(ttl_seconds=300)
     def get_weather_recommendations(self) -> Dict:
         """날씨 기반 발주 추천"""
-        request = "내일 날씨를 확인하고, 날씨에 따른 발주 조정 사항을 상세히 추천해주세요."
-        return self.analyze(request)
+        return self.analyze(WEATHER_RECOMMENDATIONS_REQUEST)
+    
+    @ttl_cache(ttl_seconds=300)
+    async def aget_weather_recommendations(self) -> Dict:
+        """날씨 기반 발주 추천 (비동기)"""
+        return await self.aanalyze(WEATHER_RECOMMENDATIONS_REQUEST)
     
     def analyze_product_weather_impact(self, product: str) -> Dict:
         """특정 상품의 날씨 영향 분석"""
@@ -3,20 +3,245 @@ Data Upload API
 CSV upload and data management
 """
 from fastapi import APIRouter, UploadFile, File, HTTPException
-from typing import Dict
+from typing import Any, Dict, List, Optional, Tuple, BinaryIO
+import asyncio
 import csv
 import io
-from datetime import datetime
-import sys
-import os
+from datetime import date
 
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from database import get_db
+from database import get_db, refresh_sales_daily
 from rag import get_rag
+from agents.inventory_agent import InventoryAgent
+from agents.sales_agent import SalesAgent
+from utils.response_cache import invalidate
 
 router = APIRouter(prefix="/api/data", tags=["data"])
 
+# executemany 한 번에 보낼 행 수
+BATCH_SIZE = 1000
+
+# 요일 (date.weekday() 순서)
+_DOW = ("월", "화", "수", "목", "금", "토", "일")
+
+# 필드별 허용 헤더 (한글/영문, 비교 시 공백 제거 + 소문자)
+_SALES_ALIASES = {
+    "product_name": ('product_name', '상품명', '제품명'),
+    "quantity_sold": ('quantity_sold', '판매수량', '수량'),
+    "sale_price": ('sale_price', '판매가격', '가격'),
+    "sale_date": ('sale_date', '판매날짜', '날짜'),
+    "sale_time": ('sale_time', '판매시간', '시간'),
+}
+_INVENTORY_ALIASES = {
+    "product_name": ('product_name', '상품명', '제품명'),
+    "category": ('category', '카테고리', '분류'),
+    "quantity": ('quantity', '수량', '재고'),
+    "unit_price": ('unit_price', '단가', '가격'),
+    "expiry_date": ('expiry_date', '유통기한', '만료일'),
+}
+
+# 파일에 없는 필드용 키 (row.get() 시 항상 None)
+_MISSING = object()
+
+
+def _resolve_columns(fieldnames: Optional[List[str]], aliases: Dict[str, Tuple[str, ...]]) -> Dict[str, Any]:
+    """
+    파일 헤더를 한 번만 훑어 필드별 실제 헤더명 매핑 생성
+    
+    헤더는 파일 전체에서 고정이므로 행마다 별칭을 다시 조회하지 않습니다.
+    """
+    normalized = {}
+    for header in fieldnames or []:
+        normalized.setdefault(header.strip().lower(), header)
+    
+    col_map = {}
+    for field, names in aliases.items():
+        col_map[field] = next((normalized[name] for name in names if name in normalized), _MISSING)
+    return col_map
+
+
+def _open_csv(stream: BinaryIO) -> Tuple[io.TextIOWrapper, csv.DictReader]:
+    """업로드 파일을 메모리에 올리지 않고 한 줄씩 디코딩하는 CSV 리더 생성"""
+    text_stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')  # BOM 처리
+    return text_stream, csv.DictReader(text_stream)
+
+
+def _process_sales_rows(stream: BinaryIO) -> Tuple[int, List[str]]:
+    """판매 CSV 파싱 및 DB 저장 (워커 스레드에서 실행)"""
+    text_stream, csv_reader = _open_csv(stream)
+    
+    rows_processed = 0
+    errors = []
+    rows_buffer = []
+    inserted_rows = []  # RAG 증분 인덱싱용
+    earliest_date = None  # 일별 집계를 다시 계산할 시작일
+    
+    query = """
+        INSERT INTO sales (product_name, quantity_sold, sale_price, sale_date,
+                          sale_time, day_of_week)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """
+    
+    with get_db() as db:
+        try:
+            # 디버깅: 헤더 출력
+            print(f"CSV Headers: {csv_reader.fieldnames}")
+            
+            # 필드 매핑 (한글/영문 모두 지원, 공백 제거) - 헤더 기준으로 한 번만 계산
+            cols = _resolve_columns(csv_reader.fieldnames, _SALES_ALIASES)
+            
+            for row in csv_reader:
+                try:
+                    product_name = row.get(cols["product_name"])
+                    quantity_sold = row.get(cols["quantity_sold"])
+                    sale_price = row.get(cols["sale_price"])
+                    sale_date = row.get(cols["sale_date"])
+                    sale_time = row.get(cols["sale_time"]) or '12:00:00'
+                    
+                    # 필수 필드 확인
+                    if not all([product_name, quantity_sold, sale_price, sale_date]):
+                        errors.append(f"Row {rows_processed + 1}: 필수 필드 누락 (상품명, 판매수량, 판매가격, 판매날짜 필요)")
+                        continue
+                    
+                    # 날짜 파싱 (fromisoformat이 strptime보다 빠름)
+                    try:
+                        sale_date_obj = date.fromisoformat(sale_date.strip())
+                    except ValueError:
+                        errors.append(f"Row {rows_processed + 1}: 날짜 형식 오류 (YYYY-MM-DD 형식 필요)")
+                        continue
+                    
+                    day_of_week = _DOW[sale_date_obj.weekday()]
+                    if earliest_date is None or sale_date_obj < earliest_date:
+                        earliest_date = sale_date_obj
+                    
+                    rows_buffer.append((
+                        product_name,
+                        int(quantity_sold),
+                        float(sale_price),
+                        sale_date_obj,
+                        sale_time,
+                        day_of_week
+                    ))
+                    inserted_rows.append({
+                        "product_name": product_name,
+                        "quantity_sold": int(quantity_sold),
+                        "sale_price": float(sale_price),
+                        "sale_date": sale_date_obj,
+                        "sale_time": sale_time,
+                        "day_of_week": day_of_week
+                    })
+                    
+                    rows_processed += 1
+                except Exception as e:
+                    errors.append(f"Row {rows_processed + 1}: {str(e)}")
+                    continue
+                
+                # BATCH_SIZE 단위로 일괄 삽입 (커밋은 마지막에 한 번)
+                if len(rows_buffer) >= BATCH_SIZE:
+                    if not db.execute_many(query, rows_buffer, commit=False):
+                        raise HTTPException(status_code=500, detail="판매 데이터 저장 중 오류가 발생했습니다.")
+                    rows_buffer.clear()
+            
+            if not db.execute_many(query, rows_buffer, commit=False):
+                raise HTTPException(status_code=500, detail="판매 데이터 저장 중 오류가 발생했습니다.")
+            db.commit()
+        finally:
+            # UploadFile이 원본 파일을 닫을 수 있도록 래퍼만 분리
+            text_stream.detach()
+    
+    # 과거 날짜 판매가 들어왔으면 해당 날짜부터 일별 집계 재계산
+    if earliest_date is not None:
+        refresh_sales_daily(since=earliest_date)
+    
+    # 캐시된 판매 트렌드 분석 무효화
+    SalesAgent.get_trending_analysis.cache_clear()
+    SalesAgent.aget_trending_analysis.cache_clear()
+    
+    # 벡터 스토어 업데이트 (이번에 업로드된 행만 인덱싱)
+    if inserted_rows:
+        get_rag().index_sales_data(inserted_rows)
+    
+    return rows_processed, errors
+
+
+def _process_inventory_rows(stream: BinaryIO) -> Tuple[int, List[str]]:
+    """재고 CSV 파싱 및 DB 저장 (워커 스레드에서 실행)"""
+    text_stream, csv_reader = _open_csv(stream)
+    
+    rows_processed = 0
+    errors = []
+    rows_buffer = []
+    inserted_rows = []  # RAG 증분 인덱싱용
+    
+    query = """
+        INSERT INTO inventory (product_name, category, quantity, unit_price, expiry_date)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            quantity = VALUES(quantity),
+            unit_price = VALUES(unit_price),
+            expiry_date = VALUES(expiry_date)
+    """
+    
+    with get_db() as db:
+        try:
+            # 필드 매핑 (한글/영문 모두 지원) - 헤더 기준으로 한 번만 계산
+            cols = _resolve_columns(csv_reader.fieldnames, _INVENTORY_ALIASES)
+            
+            for row in csv_reader:
+                try:
+                    product_name = row.get(cols["product_name"])
+                    category = row.get(cols["category"])
+                    quantity = row.get(cols["quantity"])
+                    unit_price = row.get(cols["unit_price"])
+                    expiry_date = row.get(cols["expiry_date"]) or None
+                    
+                    # 필수 필드 확인
+                    if not all([product_name, category, quantity, unit_price]):
+                        errors.append(f"Row {rows_processed + 1}: 필수 필드 누락 (상품명, 카테고리, 수량, 단가 필요)")
+                        continue
+                    
+                    rows_buffer.append((
+                        product_name,
+                        category,
+                        int(quantity),
+                        float(unit_price),
+                        expiry_date
+                    ))
+                    inserted_rows.append({
+                        "product_name": product_name,
+                        "category": category,
+                        "quantity": int(quantity),
+                        "unit_price": float(unit_price),
+                        "expiry_date": expiry_date
+                    })
+                    
+                    rows_processed += 1
+                except Exception as e:
+                    errors.append(f"Row {rows_processed + 1}: {str(e)}")
+                    continue
+                
+                # BATCH_SIZE 단위로 일괄 삽입/업데이트 (커밋은 마지막에 한 번)
+                if len(rows_buffer) >= BATCH_SIZE:
+                    if not db.execute_many(query, rows_buffer, commit=False):
+                        raise HTTPException(status_code=500, detail="재고 데이터 저장 중 오류가 발생했습니다.")
+                    rows_buffer.clear()
+            
+            if not db.execute_many(query, rows_buffer, commit=False):
+                raise HTTPException(status_code=500, detail="재고 데이터 저장 중 오류가 발생했습니다.")
+            db.commit()
+        finally:
+            # UploadFile이 원본 파일을 닫을 수 있도록 래퍼만 분리
+            text_stream.detach()
+    
+    # 캐시된 재고 부족 분석 무효화
+    InventoryAgent.get_low_stock_alert.cache_clear()
+    InventoryAgent.aget_low_stock_alert.cache_clear()
+    
+    # 벡터 스토어 업데이트 (이번에 업로드된 행만 인덱싱)
+    if inserted_rows:
+        get_rag().index_inventory_data(inserted_rows)
+    
+    return rows_processed, errors
+
 
 @router.post("/upload/sales")
 async def upload_sales_csv(file: UploadFile = File(...)) -> Dict:
@@ -25,77 +250,10 @@ async def upload_sales_csv(file: UploadFile = File(...)) -> Dict:
         if not file.filename.endswith('.csv'):
             raise HTTPException(status_code=400, detail="CSV 파일만 업로드 가능합니다.")
         
-        contents = await file.read()
-        decoded = contents.decode('utf-8-sig')  # BOM 처리
-        csv_reader = csv.DictReader(io.StringIO(decoded))
-        
-        db = get_db()
-        rag = get_rag()
-        
-        rows_processed = 0
-        errors = []
-        
-        # 디버깅: 헤더 출력
-        first_row = True
-        
-        for row in csv_reader:
-            try:
-                # 첫 번째 행에서 헤더 확인
-                if first_row:
-                    print(f"CSV Headers: {list(row.keys())}")
-                    first_row = False
-                
-                # 필드 매핑 (한글/영문 모두 지원, 공백 제거)
-                product_name = (row.get('product_name') or row.get('product_name ') or 
-                               row.get(' product_name') or row.get('상품명') or row.get('제품명'))
-                quantity_sold = (row.get('quantity_sold') or row.get('quantity_sold ') or 
-                                row.get(' quantity_sold') or row.get('판매수량') or row.get('수량'))
-                sale_price = (row.get('sale_price') or row.get('sale_price ') or 
-                             row.get(' sale_price') or row.get('판매가격') or row.get('가격'))
-                sale_date = (row.get('sale_date') or row.get('sale_date ') or 
-                            row.get(' sale_date') or row.get('판매날짜') or row.get('날짜'))
-                sale_time = (row.get('sale_time') or row.get('sale_time ') or 
-                            row.get(' sale_time') or row.get('판매시간') or row.get('시간') or '12:00:00')
-                
-                # 필수 필드 확인
-                if not all([product_name, quantity_sold, sale_price, sale_date]):
-                    errors.append(f"Row {rows_processed + 1}: 필수 필드 누락 (상품명, 판매수량, 판매가격, 판매날짜 필요)")
-                    continue
-                
-                # 날짜 파싱
-                try:
-                    sale_date_obj = datetime.strptime(sale_date, '%Y-%m-%d').date()
-                except:
-                    errors.append(f"Row {rows_processed + 1}: 날짜 형식 오류 (YYYY-MM-DD 형식 필요)")
-                    continue
-                
-                # 요일 계산
-                days_of_week = ["월", "화", "수", "목", "금", "토", "일"]
-                day_of_week = days_of_week[sale_date_obj.weekday()]
-                
-                # DB에 삽입
-                query = """
-                    INSERT INTO sales (product_name, quantity_sold, sale_price, sale_date, 
-                                      sale_time, day_of_week)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                """
-                db.execute_query(query, (
-                    product_name,
-                    int(quantity_sold),
-                    float(sale_price),
-                    sale_date_obj,
-                    sale_time,
-                    day_of_week
-                ))
-                
-                rows_processed += 1
-            except Exception as e:
-                errors.append(f"Row {rows_processed + 1}: {str(e)}")
-        
-        # 벡터 스토어 업데이트
-        if rows_processed > 0:
-            sales_data = db.fetch_all("SELECT * FROM sales ORDER BY sale_date DESC LIMIT 500")
-            rag.index_sales_data(sales_data)
+        # 파싱/저장은 스레드에서 스트리밍 처리 (이벤트 루프 블로킹 방지)
+        rows_processed, errors = await asyncio.to_thread(_process_sales_rows, file.file)
+        # 대시보드 통계 응답 캐시 무효화
+        await invalidate("stats:")
         
         return {
             "success": True,
@@ -114,55 +272,10 @@ async def upload_inventory_csv(file: UploadFile = File(...)) -> Dict:
         if not file.filename.endswith('.csv'):
             raise HTTPException(status_code=400, detail="CSV 파일만 업로드 가능합니다.")
         
-        contents = await file.read()
-        decoded = contents.decode('utf-8-sig')
-        csv_reader = csv.DictReader(io.StringIO(decoded))
-        
-        db = get_db()
-        rag = get_rag()
-        
-        rows_processed = 0
-        errors = []
-        
-        for row in csv_reader:
-            try:
-                # 필드 매핑 (한글/영문 모두 지원)
-                product_name = row.get('product_name') or row.get('상품명') or row.get('제품명')
-                category = row.get('category') or row.get('카테고리') or row.get('분류')
-                quantity = row.get('quantity') or row.get('수량') or row.get('재고')
-                unit_price = row.get('unit_price') or row.get('단가') or row.get('가격')
-                expiry_date = row.get('expiry_date') or row.get('유통기한') or row.get('만료일') or None
-                
-                # 필수 필드 확인
-                if not all([product_name, category, quantity, unit_price]):
-                    errors.append(f"Row {rows_processed + 1}: 필수 필드 누락 (상품명, 카테고리, 수량, 단가 필요)")
-                    continue
-                
-                # DB에 삽입 또는 업데이트
-                query = """
-                    INSERT INTO inventory (product_name, category, quantity, unit_price, expiry_date)
-                    VALUES (%s, %s, %s, %s, %s)
-                    ON DUPLICATE KEY UPDATE
-                        quantity = VALUES(quantity),
-                        unit_price = VALUES(unit_price),
-                        expiry_date = VALUES(expiry_date)
-                """
-                db.execute_query(query, (
-                    product_name,
-                    category,
-                    int(quantity),
-                    float(unit_price),
-                    expiry_date
-                ))
-                
-                rows_processed += 1
-            except Exception as e:
-                errors.append(f"Row {rows_processed + 1}: {str(e)}")
-        
-        # 벡터 스토어 업데이트
-        if rows_processed > 0:
-            inventory_data = db.fetch_all("SELECT * FROM inventory")
-            rag.index_inventory_data(inventory_data)
+        # 파싱/저장은 스레드에서 스트리밍 처리 (이벤트 루프 블로킹 방지)
+        rows_processed, errors = await asyncio.to_thread(_process_inventory_rows, file.file)
+        # 대시보드 통계 응답 캐시 무효화
+        await invalidate("stats:")
         
         return {
             "success": True,
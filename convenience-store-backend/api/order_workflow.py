@@ -2,16 +2,13 @@
 Order Workflow API
 Order creation, approval, and management
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, BackgroundTasks, HTTPException
 from pydantic import BaseModel
 from typing import List, Dict, Optional
 from datetime import datetime
-import sys
-import os
-
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database import get_db
+from utils.response_cache import invalidate_from_thread
 
 router = APIRouter(prefix="/api/orders", tags=["orders"])
 
@@ -32,114 +29,98 @@ class OrderApprovalRequest(BaseModel):
 
 
 @router.post("/create")
-async def create_order(request: CreateOrderRequest) -> Dict:
+def create_order(request: CreateOrderRequest) -> Dict:
     """새 발주 생성"""
     try:
-        db = get_db()
-        
-        order_ids = []
-        total_cost = 0
+        if not request.items:
+            raise HTTPException(status_code=400, detail="발주 품목이 없습니다.")
         
-        for item in request.items:
-            # 상품 정보 조회
-            product_query = "SELECT unit_price FROM inventory WHERE product_name = %s"
-            product = db.fetch_one(product_query, (item.product,))
+        with get_db() as db:
+            # 단가 조회부터 INSERT까지 하나의 트랜잭션 (예외 시 with 블록에서 롤백)
+            db.begin()
             
-            if not product:
-                raise HTTPException(status_code=404, detail=f"상품을 찾을 수 없습니다: {item.product}")
+            # 상품 단가를 한 번에 조회
+            product_names = list({item.product for item in request.items})
+            products = db.fetch_many_in(
+                "inventory", "product_name", product_names, columns="product_name, unit_price"
+            )
+            price_map = {row['product_name']: float(row['unit_price']) for row in products}
             
-            unit_cost = float(product['unit_price'])
-            item_total = unit_cost * item.quantity
-            total_cost += item_total
+            rows = []
+            total_cost = 0
+            for item in request.items:
+                if item.product not in price_map:
+                    raise HTTPException(status_code=404, detail=f"상품을 찾을 수 없습니다: {item.product}")
+                
+                unit_cost = price_map[item.product]
+                item_total = unit_cost * item.quantity
+                total_cost += item_total
+                rows.append((item.product, item.quantity, unit_cost, item_total))
             
-            # 발주 생성
+            # 발주 생성 (다중 행 INSERT 한 번)
             order_query = """
                 INSERT INTO orders (product_name, quantity_ordered, unit_cost, total_cost, 
                                    order_date, delivery_date, status)
-                VALUES (%s, %s, %s, %s, CURDATE(), DATE_ADD(CURDATE(), INTERVAL 1 DAY), 'pending')
-            """
-            db.execute_query(order_query, (item.product, item.quantity, unit_cost, item_total))
+                VALUES 
+            """ + ",".join(
+                ["(%s, %s, %s, %s, CURDATE(), DATE_ADD(CURDATE(), INTERVAL 1 DAY), 'pending')"] * len(rows)
+            )
+            params = tuple(value for row in rows for value in row)
+            first_id = db.execute_insert(order_query, params, commit=False)
+            if first_id is None:
+                raise HTTPException(status_code=500, detail="발주 생성 중 오류가 발생했습니다.")
+            db.commit()
+            # 대시보드 통계 응답 캐시 무효화
+            invalidate_from_thread("stats:")
             
-            # 마지막 삽입 ID 가져오기
-            last_id_query = "SELECT LAST_INSERT_ID() as id"
-            result = db.fetch_one(last_id_query)
-            order_ids.append(result['id'])
-        
-        return {
-            "success": True,
-            "order_ids": order_ids,
-            "total_items": len(request.items),
-            "total_cost": total_cost,
-            "status": "pending",
-            "created_at": datetime.now().isoformat()
-        }
+            # 단일 다중 행 INSERT의 AUTO_INCREMENT ID는 연속적으로 할당됨
+            order_ids = list(range(first_id, first_id + len(rows)))
+            
+            return {
+                "success": True,
+                "order_ids": order_ids,
+                "total_items": len(request.items),
+                "total_cost": total_cost,
+                "status": "pending",
+                "created_at": datetime.now().isoformat()
+            }
+    except HTTPException:
+        # 품목 없음(400)/미등록 상품(404)은 그대로 전달
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/pending")
-async def get_pending_orders() -> List[Dict]:
-    """대기 중인 발주 목록"""
-    try:
-        db = get_db()
-        
-        query = """
-            SELECT 
-                id,
-                product_name,
-                quantity_ordered,
-                unit_cost,
-                total_cost,
-                order_date,
-                delivery_date,
-                status
-            FROM orders
-            WHERE status = 'pending'
-            ORDER BY order_date DESC, id DESC
-        """
-        results = db.fetch_all(query)
-        
-        return [
-            {
-                "id": row['id'],
-                "product": row['product_name'],
-                "quantity": row['quantity_ordered'],
-                "unit_cost": float(row['unit_cost']),
-                "total_cost": float(row['total_cost']),
-                "order_date": str(row['order_date']),
-                "delivery_date": str(row['delivery_date']),
-                "status": row['status']
-            }
-            for row in results
-        ]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+def _log_order_action(session_id: str, user_message: str, notes: Optional[str]):
+    """발주 승인/거부 기록 저장 (chat_history 테이블 활용, 응답 후 백그라운드 실행)"""
+    log_query = """
+        INSERT INTO chat_history (session_id, user_message, assistant_message)
+        VALUES (%s, %s, %s)
+    """
+    get_db().execute_query(log_query, (session_id, user_message, notes or "No notes"))
 
 
 @router.put("/{order_id}/approve")
-async def approve_order(order_id: int, request: OrderApprovalRequest) -> Dict:
+def approve_order(order_id: int, request: OrderApprovalRequest, background_tasks: BackgroundTasks) -> Dict:
     """발주 승인"""
     try:
-        db = get_db()
-        
         # 발주 상태 업데이트
         update_query = """
             UPDATE orders
             SET status = 'approved'
             WHERE id = %s
         """
-        db.execute_query(update_query, (order_id,))
+        if not get_db().execute_query(update_query, (order_id,)):
+            raise HTTPException(status_code=500, detail="발주 승인 중 오류가 발생했습니다.")
+        invalidate_from_thread("stats:")
         
-        # 승인 기록 저장 (chat_history 테이블 활용)
-        log_query = """
-            INSERT INTO chat_history (session_id, user_message, assistant_message)
-            VALUES (%s, %s, %s)
-        """
-        db.execute_query(log_query, (
+        # 승인 기록은 응답을 보낸 뒤 저장
+        background_tasks.add_task(
+            _log_order_action,
             f"order_approval_{order_id}",
             f"Order #{order_id} approved by {request.approved_by}",
-            request.notes or "No notes"
-        ))
+            request.notes
+        )
         
         return {
             "success": True,
@@ -148,34 +129,33 @@ async def approve_order(order_id: int, request: OrderApprovalRequest) -> Dict:
             "approved_by": request.approved_by,
             "approved_at": datetime.now().isoformat()
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.put("/{order_id}/reject")
-async def reject_order(order_id: int, request: OrderApprovalRequest) -> Dict:
+def reject_order(order_id: int, request: OrderApprovalRequest, background_tasks: BackgroundTasks) -> Dict:
     """발주 거부"""
     try:
-        db = get_db()
-        
         # 발주 상태 업데이트
         update_query = """
             UPDATE orders
             SET status = 'rejected'
             WHERE id = %s
         """
-        db.execute_query(update_query, (order_id,))
+        if not get_db().execute_query(update_query, (order_id,)):
+            raise HTTPException(status_code=500, detail="발주 거부 중 오류가 발생했습니다.")
+        invalidate_from_thread("stats:")
         
-        # 거부 기록 저장
-        log_query = """
-            INSERT INTO chat_history (session_id, user_message, assistant_message)
-            VALUES (%s, %s, %s)
-        """
-        db.execute_query(log_query, (
+        # 거부 기록은 응답을 보낸 뒤 저장
+        background_tasks.add_task(
+            _log_order_action,
             f"order_rejection_{order_id}",
             f"Order #{order_id} rejected by {request.approved_by}",
-            request.notes or "No notes"
-        ))
+            request.notes
+        )
         
         return {
             "success": True,
@@ -184,49 +164,7 @@ async def reject_order(order_id: int, request: OrderApprovalRequest) -> Dict:
             "rejected_by": request.approved_by,
             "rejected_at": datetime.now().isoformat()
         }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-@router.get("/history")
-async def get_order_history(
-    status: Optional[str] = None,
-    days: int = 30
-) -> List[Dict]:
-    """발주 이력 조회"""
-    try:
-        db = get_db()
-        
-        if status:
-            query = """
-                SELECT *
-                FROM orders
-                WHERE status = %s
-                AND order_date >= DATE_SUB(CURDATE(), INTERVAL %s DAY)
-                ORDER BY order_date DESC, id DESC
-            """
-            results = db.fetch_all(query, (status, days))
-        else:
-            query = """
-                SELECT *
-                FROM orders
-                WHERE order_date >= DATE_SUB(CURDATE(), INTERVAL %s DAY)
-                ORDER BY order_date DESC, id DESC
-            """
-            results = db.fetch_all(query, (days,))
-        
-        return [
-            {
-                "id": row['id'],
-                "product": row['product_name'],
-                "quantity": row['quantity_ordered'],
-                "unit_cost": float(row['unit_cost']),
-                "total_cost": float(row['total_cost']),
-                "order_date": str(row['order_date']),
-                "delivery_date": str(row['delivery_date']) if row['delivery_date'] else None,
-                "status": row['status']
-            }
-            for row in results
-        ]
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
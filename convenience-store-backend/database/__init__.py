@@ -1,6 +1,8 @@
 """
 Database package
 """
-from .db_manager import DatabaseManager, get_db
+from .db_manager import DatabaseManager, get_db, init_pool
+from .migrations import run_migrations
+from .sales_rollup import refresh_sales_daily
 
-__all__ = ["DatabaseManager", "get_db"]
+__all__ = ["DatabaseManager", "get_db", "init_pool", "run_migrations", "refresh_sales_daily"]
@@ -0,0 +1,20 @@
+"""
+MySQL 접속 설정
+환경 변수를 모듈 로드 시 한 번만 읽어 모든 연결(커넥션 풀, pymysql 연결)이 같은 설정을 사용합니다.
+"""
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 공통 접속 정보 (pymysql.connect / mysql.connector에 **MYSQL_CONFIG로 전달)
+MYSQL_CONFIG = {
+    "host": os.getenv("MYSQL_HOST", "localhost"),
+    "port": int(os.getenv("MYSQL_PORT", "3306")),
+    "user": os.getenv("MYSQL_USER", "root"),
+    "password": os.getenv("MYSQL_PASSWORD", ""),
+    "database": os.getenv("MYSQL_DATABASE", "store_order"),
+}
+
+# 세션 시간대 (NOW()/CURRENT_TIMESTAMP 기준)
+MYSQL_TIME_ZONE = os.getenv("MYSQL_TIME_ZONE", "+09:00")
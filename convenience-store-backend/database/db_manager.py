@@ -3,35 +3,71 @@ MySQL 데이터베이스 연결 및 관리 모듈
 """
 import mysql.connector
 from mysql.connector import Error
+from mysql.connector import pooling
+from mysql.connector import HAVE_CEXT
 import os
+from contextlib import contextmanager
 from dotenv import load_dotenv
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator, Tuple
 import logging
 
+from .config import MYSQL_CONFIG, MYSQL_TIME_ZONE
+
 load_dotenv()
 logger = logging.getLogger(__name__)
 
 
 class DatabaseManager:
-    """MySQL 데이터베이스 연결 관리자"""
-    
-    def __init__(self):
-        self.host = os.getenv("MYSQL_HOST", "localhost")
-        self.port = int(os.getenv("MYSQL_PORT", "3306"))
-        self.user = os.getenv("MYSQL_USER", "root")
-        self.password = os.getenv("MYSQL_PASSWORD", "")
-        self.database = os.getenv("MYSQL_DATABASE", "convenience_store")
+    """
+    MySQL 데이터베이스 연결 관리자
+    
+    풀이 주어지면 connect()에서 풀의 연결을 빌리고 disconnect()에서 반납합니다.
+    with 문으로 사용하면 블록이 끝날 때 자동으로 반납됩니다.
+    """
+    
+    def __init__(self, pool: Optional[pooling.MySQLConnectionPool] = None):
+        self.host = MYSQL_CONFIG["host"]
+        self.port = MYSQL_CONFIG["port"]
+        self.user = MYSQL_CONFIG["user"]
+        self.password = MYSQL_CONFIG["password"]
+        self.database = MYSQL_CONFIG["database"]
+        # 세션 시간대 (연결 시 한 번 설정, aiomysql 풀과 동일)
+        self.time_zone = MYSQL_TIME_ZONE
+        # C 확장(libmysqlclient) 사용 - 결과 행 디코딩이 순수 파이썬 구현보다 빠름
+        self.use_pure = os.getenv("MYSQL_USE_PURE", "false").lower() == "true" or not HAVE_CEXT
+        self.pool = pool
         self.connection: Optional[mysql.connector.MySQLConnection] = None
     
+    def __enter__(self) -> "DatabaseManager":
+        if not self.connect():
+            raise ConnectionError("MySQL 연결 실패")
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None and self.connection is not None:
+            try:
+                self.connection.rollback()
+            except Error:
+                pass
+        self.disconnect()
+    
     def connect(self) -> bool:
-        """데이터베이스 연결"""
+        """데이터베이스 연결 (풀이 있으면 풀에서 대여)"""
         try:
+            if self.pool is not None:
+                self.connection = self.pool.get_connection()
+                # pre-ping: 서버가 끊은 유휴 연결이면 재연결
+                self.connection.ping(reconnect=True, attempts=2, delay=0)
+                return True
+            
             self.connection = mysql.connector.connect(
                 host=self.host,
                 port=self.port,
                 user=self.user,
                 password=self.password,
-                database=self.database
+                database=self.database,
+                time_zone=self.time_zone,
+                use_pure=self.use_pure
             )
             if self.connection.is_connected():
                 logger.info(f"MySQL 데이터베이스 연결 성공: {self.database}")
@@ -41,145 +77,294 @@ class DatabaseManager:
             return False
     
     def disconnect(self):
-        """데이터베이스 연결 종료"""
-        if self.connection and self.connection.is_connected():
+        """데이터베이스 연결 종료 (풀 연결은 반납)"""
+        if self.connection is None:
+            return
+        if self.pool is not None:
+            self.connection.close()
+            self.connection = None
+            return
+        if self.connection.is_connected():
             self.connection.close()
             logger.info("MySQL 연결 종료")
     
-    def execute_query(self, query: str, params: tuple = None) -> bool:
-        """쿼리 실행 (INSERT, UPDATE, DELETE)"""
+    @contextmanager
+    def _connection(self):
+        """
+        쿼리에 사용할 연결 반환
+        
+        with 블록(connect() 이후) 안이면 현재 연결을 그대로 쓰고,
+        그렇지 않으면 이번 호출 동안만 풀에서 빌렸다가 바로 반납합니다.
+        """
+        if self.connection is not None or self.pool is None:
+            yield self.connection
+            return
+        
+        if not self.connect():
+            raise ConnectionError("MySQL 연결 실패")
+        try:
+            yield self.connection
+        finally:
+            self.disconnect()
+    
+    def execute_query(self, query: str, params: tuple = None, commit: bool = True) -> bool:
+        """
+        쿼리 실행 (INSERT, UPDATE, DELETE)
+        
+        commit=False이면 begin()으로 시작한 트랜잭션 안에서 실행하고 커밋은 호출자가 합니다.
+        """
         try:
-            cursor = self.connection.cursor()
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
-            self.connection.commit()
-            cursor.close()
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+                if commit:
+                    conn.commit()
+                cursor.close()
             return True
         except Error as e:
             logger.error(f"쿼리 실행 오류: {e}")
             return False
     
+    def execute_insert(self, query: str, params: tuple = None, commit: bool = True) -> Optional[int]:
+        """
+        INSERT 실행 후 첫 번째 AUTO_INCREMENT ID 반환 (실패 시 None)
+        
+        다중 행 INSERT(VALUES (...),(...))의 경우 MySQL은 연속된 ID를 할당하므로
+        반환값부터 행 수만큼이 삽입된 ID입니다.
+        """
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+                if commit:
+                    conn.commit()
+                last_id = cursor.lastrowid
+                cursor.close()
+            return last_id
+        except Error as e:
+            logger.error(f"INSERT 실행 오류: {e}")
+            return None
+    
+    def execute_many(self, query: str, params_list: List[tuple], batch_size: int = 1000,
+                     commit: bool = True) -> bool:
+        """
+        동일 쿼리를 여러 행에 대해 일괄 실행 (executemany)
+        
+        batch_size 단위로 나누어 전송하며, commit=False이면 호출자가
+        commit()/rollback()으로 트랜잭션을 마무리합니다.
+        INSERT ... VALUES (ON DUPLICATE KEY UPDATE 포함)는 드라이버가 배치마다
+        다중 행 INSERT 한 문장으로 바꿔 보내므로, batch_size는 max_allowed_packet을
+        넘지 않는 크기로 지정하세요.
+        """
+        if not params_list:
+            return True
+        with self._connection() as conn:
+            try:
+                cursor = conn.cursor()
+                for i in range(0, len(params_list), batch_size):
+                    cursor.executemany(query, params_list[i:i + batch_size])
+                if commit:
+                    conn.commit()
+                cursor.close()
+                return True
+            except Error as e:
+                logger.error(f"일괄 쿼리 실행 오류: {e}")
+                conn.rollback()
+                return False
+    
+    def begin(self):
+        """트랜잭션 시작 (with 블록 안에서 사용)"""
+        if self.connection.in_transaction:
+            # 이전 조회로 열린 암묵적 트랜잭션 정리
+            self.connection.rollback()
+        self.connection.start_transaction()
+    
+    def commit(self):
+        """트랜잭션 커밋"""
+        self.connection.commit()
+    
+    def rollback(self):
+        """트랜잭션 롤백"""
+        self.connection.rollback()
+    
     def fetch_all(self, query: str, params: tuple = None) -> List[Dict[str, Any]]:
         """쿼리 실행 및 모든 결과 반환"""
         try:
-            cursor = self.connection.cursor(dictionary=True)
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
-            results = cursor.fetchall()
-            cursor.close()
+            with self._connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+                results = cursor.fetchall()
+                cursor.close()
             return results
         except Error as e:
             logger.error(f"쿼리 조회 오류: {e}")
             return []
     
+    def fetch_all_tuples(self, query: str, params: tuple = None) -> Tuple[List[tuple], Tuple[str, ...]]:
+        """
+        쿼리 실행 및 모든 결과를 튜플로 반환 (행마다 dict를 만들지 않음)
+        
+        결과 행이 많은 조회에서 사용하며, (rows, column_names)를 반환합니다.
+        """
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+                rows = cursor.fetchall()
+                columns = tuple(cursor.column_names)
+                cursor.close()
+            return rows, columns
+        except Error as e:
+            logger.error(f"쿼리 조회 오류: {e}")
+            return [], ()
+    
+    def stream_query(self, query: str, params: tuple = None, batch_size: int = 1000,
+                     dictionary: bool = False) -> Iterator[Any]:
+        """
+        서버 측(unbuffered) 커서로 결과를 batch_size 행씩 읽어 하나씩 반환
+        
+        결과 전체를 메모리에 올리지 않으며, 연결은 제너레이터가 끝날 때까지 유지됩니다.
+        dictionary=True이면 행을 dict로 반환하므로 rag.index_* 에 그대로 넘길 수 있습니다.
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor(buffered=False, dictionary=dictionary)
+            try:
+                cursor.execute(query, params or ())
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield from rows
+            finally:
+                # 중간에 중단된 경우 남은 결과를 비워야 연결을 재사용할 수 있음
+                try:
+                    conn.consume_results()
+                except Error:
+                    pass
+                cursor.close()
+    
+    def exec_prepared(self, key: str, query: str, params: tuple = ()) -> Tuple[List[tuple], Tuple[str, ...]]:
+        """
+        서버 측 prepared statement로 조회 (자주 호출되는 고정 쿼리용)
+        
+        key별 prepared 커서를 연결 객체에 보관해 같은 연결에서는 SQL 파싱을
+        다시 하지 않습니다. 풀은 pool_reset_session=False라 반납 후에도 유지됩니다.
+        반환값은 fetch_all_tuples와 같은 (rows, column_names)입니다.
+        """
+        try:
+            with self._connection() as conn:
+                # 풀 연결이면 실제 연결 객체에 캐시 (PooledMySQLConnection은 매번 새로 생성됨)
+                raw = getattr(conn, "_cnx", conn)
+                cursors = raw.__dict__.setdefault("_prepared_cursors", {})
+                
+                cursor = cursors.get(key)
+                if cursor is None:
+                    cursor = cursors[key] = conn.cursor(prepared=True)
+                try:
+                    cursor.execute(query, params)
+                except Error:
+                    # 재연결 등으로 statement가 무효화되면 한 번만 다시 준비
+                    cursors.pop(key, None)
+                    cursor = cursors[key] = conn.cursor(prepared=True)
+                    cursor.execute(query, params)
+                rows = cursor.fetchall()
+                columns = tuple(cursor.column_names)
+            return rows, columns
+        except Error as e:
+            logger.error(f"prepared 쿼리 조회 오류: {e}")
+            return [], ()
+    
+    def fetch_many_in(self, table: str, column: str, values: List[Any],
+                      columns: str = "*") -> List[Dict[str, Any]]:
+        """
+        column IN (...) 조건으로 여러 행을 한 번에 조회
+        
+        table/column/columns는 쿼리에 그대로 들어가므로 코드 상수만 전달하세요.
+        """
+        if not values:
+            return []
+        placeholders = ",".join(["%s"] * len(values))
+        query = f"SELECT {columns} FROM {table} WHERE {column} IN ({placeholders})"
+        return self.fetch_all(query, tuple(values))
+    
     def fetch_one(self, query: str, params: tuple = None) -> Optional[Dict[str, Any]]:
         """쿼리 실행 및 단일 결과 반환"""
         try:
-            cursor = self.connection.cursor(dictionary=True)
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
-            result = cursor.fetchone()
-            cursor.close()
+            with self._connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+                result = cursor.fetchone()
+                cursor.close()
             return result
         except Error as e:
             logger.error(f"쿼리 조회 오류: {e}")
             return None
-    
-    def create_tables(self):
-        """데이터베이스 테이블 생성"""
-        tables = {
-            "inventory": """
-                CREATE TABLE IF NOT EXISTS inventory (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    product_name VARCHAR(100) NOT NULL,
-                    category VARCHAR(50),
-                    quantity INT NOT NULL DEFAULT 0,
-                    unit_price DECIMAL(10, 2),
-                    expiry_date DATE,
-                    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                    INDEX idx_product_name (product_name),
-                    INDEX idx_category (category)
-                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-            """,
-            "sales": """
-                CREATE TABLE IF NOT EXISTS sales (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    product_name VARCHAR(100) NOT NULL,
-                    quantity_sold INT NOT NULL,
-                    sale_price DECIMAL(10, 2),
-                    sale_date DATE NOT NULL,
-                    sale_time TIME,
-                    day_of_week VARCHAR(10),
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    INDEX idx_product_name (product_name),
-                    INDEX idx_sale_date (sale_date),
-                    INDEX idx_day_of_week (day_of_week)
-                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-            """,
-            "orders": """
-                CREATE TABLE IF NOT EXISTS orders (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    product_name VARCHAR(100) NOT NULL,
-                    quantity_ordered INT NOT NULL,
-                    unit_cost DECIMAL(10, 2),
-                    total_cost DECIMAL(10, 2),
-                    order_date DATE NOT NULL,
-                    delivery_date DATE,
-                    status VARCHAR(20) DEFAULT 'pending',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    INDEX idx_product_name (product_name),
-                    INDEX idx_order_date (order_date),
-                    INDEX idx_status (status)
-                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-            """,
-            "weather_history": """
-                CREATE TABLE IF NOT EXISTS weather_history (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    date DATE NOT NULL,
-                    temperature DECIMAL(5, 2),
-                    weather_condition VARCHAR(50),
-                    precipitation_probability INT,
-                    humidity INT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    INDEX idx_date (date),
-                    INDEX idx_weather_condition (weather_condition)
-                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-            """,
-            "chat_history": """
-                CREATE TABLE IF NOT EXISTS chat_history (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    session_id VARCHAR(100) NOT NULL,
-                    user_message TEXT NOT NULL,
-                    assistant_message TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    INDEX idx_session_id (session_id),
-                    INDEX idx_created_at (created_at)
-                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-            """
-        }
-        
-        for table_name, create_query in tables.items():
-            if self.execute_query(create_query):
-                logger.info(f"테이블 생성/확인 완료: {table_name}")
-            else:
-                logger.error(f"테이블 생성 실패: {table_name}")
 
 
-# 전역 데이터베이스 인스턴스
-_db_instance: Optional[DatabaseManager] = None
+# 전역 커넥션 풀
+_pool: Optional[pooling.MySQLConnectionPool] = None
+
+
+def init_pool(pool_size: Optional[int] = None) -> pooling.MySQLConnectionPool:
+    """
+    커넥션 풀 생성 (앱 시작 시 한 번 호출)
+    
+    테이블/인덱스 생성은 서버 시작 전에 `python -m database.migrations`로 실행합니다.
+    
+    pool_size 기본값은 MYSQL_POOL_SIZE 환경 변수 (기본 20, mysql-connector 최대 32)
+    pool_reset_session=False: 반납할 때마다 세션 초기화 왕복을 하지 않음
+    (exec_prepared의 prepared statement도 세션에 남아 재사용됨)
+    """
+    global _pool
+    if _pool is None:
+        if pool_size is None:
+            pool_size = int(os.getenv("MYSQL_POOL_SIZE", "20"))
+        config = DatabaseManager()
+        _pool = pooling.MySQLConnectionPool(
+            pool_name="convenience_store",
+            pool_size=pool_size,
+            pool_reset_session=False,
+            host=config.host,
+            port=config.port,
+            user=config.user,
+            password=config.password,
+            database=config.database,
+            time_zone=config.time_zone,
+            use_pure=config.use_pure
+        )
+        driver = "pure" if config.use_pure else "C extension"
+        logger.info(f"MySQL 커넥션 풀 생성 완료: {config.database} (size={pool_size}, {driver})")
+    return _pool
 
 
 def get_db() -> DatabaseManager:
-    """데이터베이스 인스턴스 싱글톤"""
-    global _db_instance
-    if _db_instance is None:
-        _db_instance = DatabaseManager()
-        if _db_instance.connect():
-            _db_instance.create_tables()
-    return _db_instance
+    """
+    풀 연결을 사용하는 DatabaseManager 반환
+    
+    단일 조회는 with 없이 호출해도 쿼리마다 풀에서 빌리고 반납합니다.
+    여러 쿼리/트랜잭션은 with 블록으로 연결 하나를 유지하세요.
+    
+    사용 예:
+        rows = get_db().fetch_all("SELECT ...")
+        
+        with get_db() as db:
+            db.begin()
+            db.execute_query("UPDATE ...", commit=False)
+            db.commit()
+    """
+    return DatabaseManager(init_pool())
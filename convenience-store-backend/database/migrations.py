@@ -0,0 +1,219 @@
+"""
+데이터베이스 스키마 마이그레이션
+
+서버를 띄우기 전에 한 번 실행합니다 (여러 uvicorn 워커가 동시에 DDL을 실행하지 않도록).
+    python -m database.migrations
+"""
+import logging
+
+from .db_manager import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+# 동시 실행 방지용 MySQL 네임드 락
+MIGRATION_LOCK = "convenience_store_migrations"
+
+# 테이블 DDL
+TABLES = {
+    "inventory": """
+        CREATE TABLE IF NOT EXISTS inventory (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            product_name VARCHAR(100) NOT NULL,
+            category VARCHAR(50),
+            quantity INT NOT NULL DEFAULT 0,
+            unit_price DECIMAL(10, 2),
+            expiry_date DATE,
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            INDEX idx_product_name (product_name),
+            INDEX idx_category (category),
+            INDEX idx_quantity (quantity),
+            INDEX idx_product_category (product_name, category)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    """,
+    "sales": """
+        CREATE TABLE IF NOT EXISTS sales (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            product_name VARCHAR(100) NOT NULL,
+            quantity_sold INT NOT NULL,
+            sale_price DECIMAL(10, 2),
+            sale_date DATE NOT NULL,
+            sale_time TIME,
+            day_of_week VARCHAR(10),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_product_name (product_name),
+            INDEX idx_sale_date (sale_date),
+            INDEX idx_date_prod_cov (sale_date, product_name, quantity_sold, sale_price),
+            INDEX idx_product_date (product_name, sale_date),
+            INDEX idx_day_of_week (day_of_week)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    """,
+    "orders": """
+        CREATE TABLE IF NOT EXISTS orders (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            recommendation_id INT NULL,
+            product_name VARCHAR(100) NOT NULL,
+            quantity_ordered INT NOT NULL,
+            unit_cost DECIMAL(10, 2),
+            total_cost DECIMAL(10, 2),
+            order_date DATE NOT NULL,
+            delivery_date DATE,
+            status VARCHAR(20) DEFAULT 'pending',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_product_name (product_name),
+            INDEX idx_order_date (order_date),
+            INDEX idx_status (status),
+            INDEX idx_status_order_date (status, order_date),
+            UNIQUE KEY uq_reco_product (recommendation_id, product_name)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    """,
+    "sales_daily": """
+        CREATE TABLE IF NOT EXISTS sales_daily (
+            date DATE NOT NULL,
+            product_name VARCHAR(100) NOT NULL,
+            quantity INT NOT NULL DEFAULT 0,
+            revenue DECIMAL(14, 2) NOT NULL DEFAULT 0,
+            PRIMARY KEY (date, product_name)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    """,
+    "weather_history": """
+        CREATE TABLE IF NOT EXISTS weather_history (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            date DATE NOT NULL,
+            temperature DECIMAL(5, 2),
+            weather_condition VARCHAR(50),
+            precipitation_probability INT,
+            humidity INT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_date (date),
+            INDEX idx_weather_condition (weather_condition)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    """,
+    "chat_history": """
+        CREATE TABLE IF NOT EXISTS chat_history (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            session_id VARCHAR(100) NOT NULL,
+            user_message TEXT NOT NULL,
+            assistant_message TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_session_id (session_id),
+            INDEX idx_created_at (created_at)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    """
+}
+
+# 기존 테이블에 추가할 컬럼 (테이블, 컬럼명, 정의)
+# - orders.recommendation_id: 발주 추천 실행으로 생성된 발주 기록의 출처 (수동 발주는 NULL)
+COLUMN_MIGRATIONS = [
+    ("orders", "recommendation_id", "INT NULL AFTER id"),
+]
+
+# 기존 테이블에 추가할 인덱스 (테이블, 인덱스명, 컬럼)
+# - sales: 통계 API의 기간 조회/상품별 집계를 인덱스만으로 처리 (커버링 인덱스),
+#          상품별 판매 이력 조회 (product_name, sale_date)
+# - orders: 상태별 발주 목록/이력 조회
+# - inventory: 재고 부족(quantity < 20) 조회, 판매-재고 조인 시 카테고리까지 인덱스로 조회
+# - order_recommendations/order_items: 스케줄러가 만드는 테이블
+#   (상태별 발주 추천 조회, 월별 발주 통계 커버링 인덱스, 추천별 품목을 우선순위 순으로 조회)
+INDEX_MIGRATIONS = [
+    ("sales", "idx_date_prod_cov", "sale_date, product_name, quantity_sold, sale_price"),
+    ("sales", "idx_product_date", "product_name, sale_date"),
+    ("orders", "idx_status_order_date", "status, order_date"),
+    ("inventory", "idx_quantity", "quantity"),
+    ("inventory", "idx_product_category", "product_name, category"),
+    ("order_recommendations", "idx_status_date", "status, recommendation_date"),
+    ("order_recommendations", "idx_reco_cover", "recommendation_date, status, total_items, total_cost"),
+    ("order_items", "idx_reco_priority", "recommendation_id, priority"),
+]
+
+# 기존 테이블에 추가할 UNIQUE 키 (테이블, 키 이름, 컬럼)
+# - orders: 같은 발주 추천이 두 번 실행되어도 상품별 발주 기록은 한 건만 (NULL은 중복 허용)
+# - order_recommendations: 하루 한 건 (스케줄러 재실행 시 새 행 대신 덮어씀)
+#   이미 같은 날짜의 추천이 여러 건이면 추가에 실패하며, 그 경우 재실행은 계속 새 행을 만듭니다.
+UNIQUE_MIGRATIONS = [
+    ("orders", "uq_reco_product", "recommendation_id, product_name"),
+    ("order_recommendations", "uq_reco_date", "recommendation_date"),
+]
+
+
+def create_tables(db: DatabaseManager):
+    """데이터베이스 테이블 생성"""
+    for table_name, create_query in TABLES.items():
+        if db.execute_query(create_query):
+            logger.info(f"테이블 생성/확인 완료: {table_name}")
+        else:
+            logger.error(f"테이블 생성 실패: {table_name}")
+
+
+def ensure_columns(db: DatabaseManager):
+    """기존 설치본에 없는 컬럼 추가 (ensure_indexes보다 먼저 실행)"""
+    existing = {
+        (row['TABLE_NAME'], row['COLUMN_NAME'])
+        for row in db.fetch_all("""
+            SELECT TABLE_NAME, COLUMN_NAME
+            FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE()
+        """)
+    }
+    tables = {table_name for table_name, _ in existing}
+    
+    for table_name, column_name, definition in COLUMN_MIGRATIONS:
+        if (table_name, column_name) in existing or table_name not in tables:
+            continue
+        query = f"ALTER TABLE {table_name} ADD COLUMN {column_name} {definition}"
+        if db.execute_query(query):
+            logger.info(f"컬럼 추가 완료: {table_name}.{column_name}")
+        else:
+            logger.error(f"컬럼 추가 실패: {table_name}.{column_name}")
+
+
+def ensure_indexes(db: DatabaseManager):
+    """
+    기존 설치본에 없는 인덱스 추가 (CREATE TABLE IF NOT EXISTS는 기존 테이블을 변경하지 않음)
+    """
+    existing = {
+        (row['TABLE_NAME'], row['INDEX_NAME'])
+        for row in db.fetch_all("""
+            SELECT DISTINCT TABLE_NAME, INDEX_NAME
+            FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE()
+        """)
+    }
+    
+    # 모든 InnoDB 테이블은 PRIMARY 인덱스가 있으므로 여기에 없으면 아직 생성되지 않은 테이블
+    tables = {table_name for table_name, _ in existing}
+    
+    migrations = [(*entry, "INDEX") for entry in INDEX_MIGRATIONS]
+    migrations += [(*entry, "UNIQUE INDEX") for entry in UNIQUE_MIGRATIONS]
+    
+    for table_name, index_name, columns, kind in migrations:
+        if (table_name, index_name) in existing:
+            continue
+        if table_name not in tables:
+            logger.info(f"테이블이 아직 없어 인덱스 추가를 건너뜀: {table_name}.{index_name}")
+            continue
+        query = f"ALTER TABLE {table_name} ADD {kind} {index_name} ({columns})"
+        if db.execute_query(query):
+            logger.info(f"인덱스 추가 완료: {table_name}.{index_name}")
+        else:
+            logger.error(f"인덱스 추가 실패: {table_name}.{index_name}")
+
+
+def run_migrations() -> bool:
+    """테이블/인덱스 마이그레이션 실행 (다른 프로세스가 실행 중이면 끝날 때까지 대기)"""
+    with DatabaseManager() as db:
+        acquired = db.fetch_one("SELECT GET_LOCK(%s, 60) AS acquired", (MIGRATION_LOCK,))
+        if not acquired or not acquired['acquired']:
+            logger.error("마이그레이션 락 획득 실패")
+            return False
+        try:
+            create_tables(db)
+            ensure_columns(db)
+            ensure_indexes(db)
+        finally:
+            db.fetch_one("SELECT RELEASE_LOCK(%s) AS released", (MIGRATION_LOCK,))
+    return True
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    run_migrations()
@@ -0,0 +1,106 @@
+"""
+aiomysql 비동기 커넥션 풀
+main.py의 async 엔드포인트에서 요청마다 새로 연결하지 않고 풀에서 빌려 씁니다.
+"""
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import aiomysql
+
+from .config import MYSQL_CONFIG, MYSQL_TIME_ZONE
+
+logger = logging.getLogger(__name__)
+
+# 전역 비동기 커넥션 풀
+_pool: Optional[aiomysql.Pool] = None
+
+
+async def create_pool(minsize: int = 5, maxsize: int = 20) -> aiomysql.Pool:
+    """
+    비동기 커넥션 풀 생성 (앱 시작 시 한 번 호출, 이미 있으면 그대로 반환)
+    
+    autocommit=True: 조회만 한 연결이 트랜잭션을 연 채로 반납되면 aiomysql 풀이
+    연결을 닫아 버리므로, 쓰기 작업은 conn.begin()/commit()으로 명시적으로 묶습니다.
+    init_command: 세션 시간대는 연결을 만들 때 한 번만 설정 (NOW()가 앱 날짜 기준과 일치)
+    """
+    global _pool
+    if _pool is None:
+        _pool = await aiomysql.create_pool(
+            host=MYSQL_CONFIG["host"],
+            port=MYSQL_CONFIG["port"],
+            user=MYSQL_CONFIG["user"],
+            password=MYSQL_CONFIG["password"],
+            db=MYSQL_CONFIG["database"],
+            charset='utf8mb4',
+            autocommit=True,
+            init_command=f"SET time_zone = '{MYSQL_TIME_ZONE}'",
+            minsize=minsize,
+            maxsize=maxsize,
+            pool_recycle=1800  # 서버 wait_timeout 전에 오래된 연결 교체
+        )
+        logger.info(f"✅ aiomysql 커넥션 풀 생성 완료 (min={minsize}, max={maxsize})")
+    return _pool
+
+
+async def close_pool():
+    """비동기 커넥션 풀 종료 (앱 종료 시 호출)"""
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        await _pool.wait_closed()
+        _pool = None
+
+
+@asynccontextmanager
+async def acquire() -> AsyncIterator[aiomysql.Connection]:
+    """
+    풀에서 연결을 빌려 반환 (블록이 끝나면 자동 반납)
+    
+    사용 예:
+        async with acquire() as conn, conn.cursor() as cursor:
+            await cursor.execute("SELECT ...")
+            rows = await cursor.fetchall()
+    """
+    pool = await create_pool()
+    async with pool.acquire() as conn:
+        # pre-ping: 서버가 끊은 유휴 연결이면 재연결
+        await conn.ping(reconnect=True)
+        yield conn
+
+
+async def get_conn() -> AsyncIterator[aiomysql.Connection]:
+    """
+    FastAPI 의존성: 요청 하나에 풀 연결 하나 (핸들러의 모든 쿼리가 같은 연결 사용)
+    
+    응답 전에 반납됩니다. 응답 캐시를 쓰는 핸들러는 캐시 적중 시 연결을 빌리지 않도록
+    의존성 대신 핸들러 안에서 acquire()를 사용하세요.
+    
+    사용 예:
+        @app.get("/api/...")
+        async def handler(conn=Depends(get_conn)):
+            async with conn.cursor() as cursor:
+                await cursor.execute("SELECT ...")
+    """
+    async with acquire() as conn:
+        yield conn
+
+
+@asynccontextmanager
+async def transaction() -> AsyncIterator[aiomysql.Connection]:
+    """
+    트랜잭션으로 묶인 연결 반환 (정상 종료 시 커밋, 예외 시 롤백)
+    
+    사용 예:
+        async with transaction() as conn, conn.cursor() as cursor:
+            await cursor.execute("UPDATE ...")
+            await cursor.execute("INSERT ...")
+    """
+    async with acquire() as conn:
+        await conn.begin()
+        try:
+            yield conn
+        except BaseException:
+            await conn.rollback()
+            raise
+        await conn.commit()
@@ -0,0 +1,69 @@
+"""
+일별 판매 집계 테이블(sales_daily) 갱신
+
+대시보드 통계가 매 요청마다 sales 전체를 합산하지 않도록, 마감된 날짜(어제까지)의
+판매를 (날짜, 상품) 단위로 미리 집계해 둡니다. 아직 집계되지 않은 날짜(오늘 포함)는
+조회 시 sales에서 직접 더합니다 (SALES_DAILY_CUTOFF 참고).
+"""
+import logging
+from datetime import date, timedelta
+from typing import Optional
+
+from .db_manager import get_db
+
+logger = logging.getLogger(__name__)
+
+# 집계가 끝난 다음 날짜 (이 날짜부터는 sales 원본을 조회)
+# 비상관 스칼라 서브쿼리라 한 번만 평가되고 sale_date 범위 스캔에 그대로 쓰입니다.
+SALES_DAILY_CUTOFF = "(SELECT COALESCE(MAX(date) + INTERVAL 1 DAY, '1970-01-01') FROM sales_daily)"
+
+# 기간 판매 (date, product_name, quantity, revenue) - 집계 테이블 + 미집계 원본
+# 파라미터: (시작일, 시작일)
+SALES_DAILY_UNION = f"""
+    SELECT date, product_name, quantity, revenue
+    FROM sales_daily
+    WHERE date >= %s AND date < {SALES_DAILY_CUTOFF}
+    UNION ALL
+    SELECT sale_date, product_name, quantity_sold, sale_price * quantity_sold
+    FROM sales
+    WHERE sale_date >= GREATEST(%s, {SALES_DAILY_CUTOFF})
+"""
+
+
+def refresh_sales_daily(since: Optional[date] = None) -> bool:
+    """
+    since(포함)부터 어제까지의 판매를 sales_daily에 반영
+    
+    since가 없으면 마지막으로 집계된 날짜부터 다시 집계합니다 (처음이면 전체).
+    과거 날짜의 판매가 추가된 경우(CSV 업로드 등) 그 날짜를 since로 넘기세요.
+    since가 아직 집계되지 않은 날짜보다 뒤여도 그 사이 날짜가 빠지지 않도록 앞당겨 집계합니다.
+    """
+    db = get_db()
+    row = db.fetch_one("SELECT MAX(date) AS last_date FROM sales_daily")
+    last_date = row["last_date"] if row and row["last_date"] else None
+    if since is None:
+        since = last_date or date(1970, 1, 1)
+    else:
+        # 집계 후 cutoff(MAX(date) + 1일)보다 앞의 미집계 날짜는 조회에서 사라지므로 함께 집계
+        since = min(since, last_date + timedelta(days=1) if last_date else date(1970, 1, 1))
+    
+    ok = db.execute_query("""
+        INSERT INTO sales_daily (date, product_name, quantity, revenue)
+        SELECT * FROM (
+            SELECT
+                sale_date,
+                product_name,
+                SUM(quantity_sold) AS quantity,
+                SUM(sale_price * quantity_sold) AS revenue
+            FROM sales
+            WHERE sale_date >= %s AND sale_date < %s
+            GROUP BY sale_date, product_name
+        ) AS agg
+        ON DUPLICATE KEY UPDATE quantity = agg.quantity, revenue = agg.revenue
+    """, (since, date.today()))
+    
+    if ok:
+        logger.info(f"📊 일별 판매 집계 갱신 완료 ({since} ~ 어제)")
+    else:
+        logger.error(f"❌ 일별 판매 집계 갱신 실패 ({since} ~ 어제)")
+    return ok
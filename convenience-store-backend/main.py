@@ -1,14 +1,19 @@
 """
 편의점 AI 자동 발주 시스템 - FastAPI 백엔드
 """
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, HTTPException, UploadFile, File, Query, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
 import os
+import asyncio
+from datetime import date, datetime, timedelta
 from dotenv import load_dotenv
 import logging
 import traceback
+from contextlib import asynccontextmanager
 
 # 로깅 설정
 logging.basicConfig(
@@ -23,37 +28,75 @@ logging.getLogger("httpcore").setLevel(logging.WARNING)
 logging.getLogger("openai").setLevel(logging.WARNING)
 logging.getLogger("urllib3").setLevel(logging.WARNING)
 
-from agents import CoordinatorAgent
+from agents import CoordinatorAgent, InventoryAgent
 from scheduler import auto_scheduler
 from rag import get_rag_engine  # RAG 엔진 import
+from tools.inventory_tools import _current_inventory
+from tools.sales_tools import _trending_products
+from tools.weather_tools import _build_forecast
+from database import init_pool
+from database.sales_rollup import SALES_DAILY_UNION
+from database.mysql_pool import acquire, transaction, get_conn, create_pool, close_pool
+from utils.response_cache import cache_response, invalidate
+from utils.http_cache import ETagMiddleware
+from api.stats_api import router as stats_router
+from api.order_workflow import router as orders_router
+from api.data_upload import router as data_router
 
 # 환경 변수 로드
 load_dotenv()
 
-app = FastAPI(
-    title="편의점 AI 발주 시스템",
-    description="멀티에이전트 기반 자동 발주 시스템",
-    version="1.0.0"
-)
 
-# CORS 설정
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # 프로덕션에서는 특정 도메인만 허용
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+def get_coordinator():
+    """코디네이터 에이전트 싱글톤 (app.state에 보관)"""
+    coordinator = getattr(app.state, "coordinator", None)
+    if coordinator is None:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY 환경 변수가 설정되지 않았습니다.")
+        model = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+        coordinator = CoordinatorAgent(api_key=api_key, model=model)
+        app.state.coordinator = coordinator
+    return coordinator
+
+
+def get_rag():
+    """RAG 엔진 싱글톤 (app.state에 보관, 로드 실패 시 다음 호출에서 재시도)"""
+    rag_engine = getattr(app.state, "rag_engine", None)
+    if rag_engine is None:
+        try:
+            rag_engine = get_rag_engine()
+            app.state.rag_engine = rag_engine
+            logger.info("✅ RAG 엔진 로드 완료")
+        except Exception as e:
+            logger.warning(f"⚠️ RAG 엔진 로드 실패: {e}")
+            rag_engine = None
+    return rag_engine
 
 
-# 애플리케이션 시작/종료 이벤트
-@app.on_event("startup")
-async def startup_event():
-    """애플리케이션 시작 시"""
+# 애플리케이션 시작/종료
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """애플리케이션 시작 시 무거운 객체를 미리 만들고, 종료 시 스케줄러 정리"""
     logger.info("🚀 애플리케이션 시작 중...")
     
-    # Coordinator 초기화
-    coord = get_coordinator()
+    # MySQL 커넥션 풀 생성 (업로드/통계 API 공용)
+    try:
+        init_pool()
+    except Exception as e:
+        logger.error(f"❌ MySQL 커넥션 풀 생성 실패: {e}")
+    
+    # 비동기 MySQL 커넥션 풀 생성 (main.py 통계/발주 API용)
+    try:
+        await create_pool()
+    except Exception as e:
+        logger.error(f"❌ aiomysql 커넥션 풀 생성 실패: {e}")
+    
+    # Coordinator와 RAG 엔진을 동시에 초기화 (첫 요청이 콜드 스타트 비용을 내지 않도록)
+    coord, _ = await asyncio.gather(
+        asyncio.to_thread(get_coordinator),
+        asyncio.to_thread(get_rag)
+    )
     
     # 스케줄러에 Coordinator 설정
     auto_scheduler.set_coordinator(coord)
@@ -62,44 +105,43 @@ async def startup_event():
     auto_scheduler.start(schedule_time="06:00")
     
     logger.info("✅ 애플리케이션 시작 완료")
-
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """애플리케이션 종료 시"""
+    
+    yield
+    
     logger.info("⏹️ 애플리케이션 종료 중...")
     auto_scheduler.stop()
+    await close_pool()
     logger.info("✅ 애플리케이션 종료 완료")
 
-# 전역 코디네이터 에이전트
-coordinator = None
 
-def get_coordinator():
-    """코디네이터 에이전트 싱글톤"""
-    global coordinator
-    if coordinator is None:
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY 환경 변수가 설정되지 않았습니다.")
-        model = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
-        coordinator = CoordinatorAgent(api_key=api_key, model=model)
-    return coordinator
+app = FastAPI(
+    title="편의점 AI 발주 시스템",
+    description="멀티에이전트 기반 자동 발주 시스템",
+    version="1.0.0",
+    default_response_class=ORJSONResponse,  # 응답 JSON 직렬화를 orjson으로 처리
+    lifespan=lifespan
+)
 
+# CORS 설정
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],  # 프로덕션에서는 특정 도메인만 허용
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
 
-# RAG 엔진
-rag_engine = None
+# 브라우저 HTTP 캐시 (ETag/Cache-Control) - 자주 바뀌지 않는 대시보드 GET 응답
+# 같은 내용이면 304로 본문 전송 생략 (max-age는 서버 응답 캐시 TTL과 맞춤)
+app.add_middleware(ETagMiddleware, max_age={
+    "/api/agents/status": 300,
+    "/api/stats/summary": 60,
+    "/api/dashboard/bootstrap": 60,
+    "/api/weather/forecast": 900,
+})
 
-def get_rag():
-    """RAG 엔진 싱글톤"""
-    global rag_engine
-    if rag_engine is None:
-        try:
-            rag_engine = get_rag_engine()
-            logger.info("✅ RAG 엔진 로드 완료")
-        except Exception as e:
-            logger.warning(f"⚠️ RAG 엔진 로드 실패: {e}")
-            rag_engine = None
-    return rag_engine
+# 응답 압축 (통계/이력 JSON은 키가 반복되어 압축률이 높음)
+app.add_middleware(GZipMiddleware, minimum_size=500)
 
 
 # Pydantic 모델들
@@ -206,12 +248,12 @@ async def chat(request: ChatRequest):
 async def get_order_recommendation():
     """
     전체 워크플로우 실행하여 발주 추천 생성
-    모든 에이전트가 순차적으로 분석
+    재고/판매/날씨 에이전트가 병렬로 분석한 뒤 OrderAgent가 종합
     """
     try:
         logger.info("Order recommendation request started")
         coord = get_coordinator()
-        result = coord.generate_order_recommendation()
+        result = await coord.generate_order_recommendation()
         logger.info("Order recommendation completed successfully")
         
         return OrderRecommendationResponse(
@@ -262,11 +304,8 @@ async def upload_inventory(file: UploadFile = File(...)):
 async def get_inventory():
     """현재 재고 조회"""
     try:
-        from tools.inventory_tools import get_current_inventory
-        # @tool 데코레이터는 invoke() 사용
-        inventory_str = get_current_inventory.invoke({})
-        import json
-        inventory = json.loads(inventory_str)
+        # 도구 래퍼(invoke) 없이 dict를 직접 받음 (JSON 직렬화/파싱 생략)
+        inventory = _current_inventory()
         
         return {
             "status": "success",
@@ -280,11 +319,8 @@ async def get_inventory():
 async def get_sales_trends(days: int = 7):
     """판매 트렌드 조회"""
     try:
-        from tools.sales_tools import get_trending_products
-        # @tool 데코레이터는 invoke() 사용
-        trends_str = get_trending_products.invoke({"days": days})
-        import json
-        trends = json.loads(trends_str)
+        # 도구 래퍼(invoke) 없이 목록을 직접 받음 (JSON 직렬화/파싱 생략)
+        trends = _trending_products(days)
         
         return {
             "status": "success",
@@ -299,61 +335,105 @@ async def get_sales_trends(days: int = 7):
 # 통계 API (대시보드용)
 # ============================================
 
+# 대시보드 통계 쿼리
+# SQL 텍스트는 모듈 상수로 고정하고, 날짜 기준(CURDATE() 등)은 파이썬에서 계산해 바인딩합니다.
+# (애플리케이션 시간대 기준으로 날짜가 정해지고, 모든 요청이 같은 statement digest로 집계됨)
+
+# 오늘/어제 매출(조건부 집계, sale_date 인덱스 범위 스캔) + 발주 대기 + 재고 부족을 한 번에 조회
+# 금액은 SQL에서 정수 센트(SIGNED)로 변환해 드라이버가 Decimal 대신 int를 돌려주도록 함
+# 파라미터: (오늘, 오늘, 오늘, 어제, 내일)
+STATS_SUMMARY_SQL = """
+    SELECT 
+        CAST(COALESCE(SUM(CASE WHEN sale_date >= %s
+                               THEN sale_price * quantity_sold END), 0) * 100 AS SIGNED) as today_cents,
+        CAST(COALESCE(SUM(CASE WHEN sale_date < %s
+                               THEN sale_price * quantity_sold END), 0) * 100 AS SIGNED) as yesterday_cents,
+        (SELECT COUNT(*) FROM order_recommendations
+         WHERE status = 'pending' AND recommendation_date >= %s) as pending_orders,
+        (SELECT COUNT(*) FROM inventory
+         WHERE quantity < safe_stock) as low_stock_count
+    FROM sales
+    WHERE sale_date >= %s
+    AND sale_date < %s
+"""
+
+# 기간 조회는 일별 집계(sales_daily) + 아직 집계되지 않은 최근 판매를 합쳐서 계산
+# 파라미터: (시작일, 시작일)
+STATS_TREND_SQL = f"""
+    SELECT 
+        date,
+        CAST(SUM(quantity) AS SIGNED) as orders,
+        CAST(SUM(revenue) * 100 AS SIGNED) as sales_cents
+    FROM ({SALES_DAILY_UNION}) d
+    GROUP BY date
+    ORDER BY date ASC
+"""
+
+# 판매량을 먼저 집계해 상위 limit개만 남긴 뒤 재고와 조인
+# 파라미터: (시작일, 시작일, limit)
+STATS_TOP_PRODUCTS_SQL = f"""
+    SELECT 
+        t.product_name,
+        t.total_sales,
+        i.quantity as current_stock
+    FROM (
+        SELECT product_name, SUM(quantity) as total_sales
+        FROM ({SALES_DAILY_UNION}) d
+        GROUP BY product_name
+        ORDER BY total_sales DESC
+        LIMIT %s
+    ) t
+    LEFT JOIN inventory i ON i.product_name = t.product_name
+    ORDER BY t.total_sales DESC
+"""
+
+# 파라미터: (시작일, 시작일)
+STATS_CATEGORY_SQL = f"""
+    SELECT 
+        i.category,
+        CAST(SUM(d.revenue) * 100 AS SIGNED) as total_cents
+    FROM ({SALES_DAILY_UNION}) d
+    JOIN inventory i ON d.product_name = i.product_name
+    GROUP BY i.category
+    ORDER BY total_cents DESC
+"""
+
+# 카테고리 분포 차트 색상 (순서대로 반복)
+CATEGORY_COLORS = ('#3b82f6', '#06b6d4', '#8b5cf6', '#ec4899', '#f59e0b', '#10b981')
+
+
+def _days_ago(days: int) -> date:
+    """오늘 기준 days일 전 날짜 (DATE_SUB(CURDATE(), INTERVAL days DAY)와 동일)"""
+    return date.today() - timedelta(days=days)
+
+
 @app.get("/api/stats/summary")
+@cache_response("stats:summary", ttl=60)
 async def get_stats_summary():
     """대시보드 요약 통계"""
     try:
-        import pymysql
-        db = pymysql.connect(
-            host=os.getenv("MYSQL_HOST", "localhost"),
-            port=int(os.getenv("MYSQL_PORT", 3306)),
-            user=os.getenv("MYSQL_USER", "root"),
-            password=os.getenv("MYSQL_PASSWORD"),
-            database=os.getenv("MYSQL_DATABASE", "store_order"),
-            charset='utf8mb4'
-        )
-        cursor = db.cursor()
-        
-        # 오늘 매출
-        cursor.execute("""
-            SELECT COALESCE(SUM(sale_price * quantity_sold), 0) as total
-            FROM sales
-            WHERE DATE(sale_date) = CURDATE()
-        """)
-        today_sales = float(cursor.fetchone()[0])
-        
-        # 어제 매출
-        cursor.execute("""
-            SELECT COALESCE(SUM(sale_price * quantity_sold), 0) as total
-            FROM sales
-            WHERE DATE(sale_date) = DATE_SUB(CURDATE(), INTERVAL 1 DAY)
-        """)
-        yesterday_sales = float(cursor.fetchone()[0])
-        
-        # 발주 대기
-        cursor.execute("""
-            SELECT COUNT(*) FROM order_recommendations
-            WHERE status = 'pending' AND recommendation_date >= CURDATE()
-        """)
-        pending_orders = int(cursor.fetchone()[0])
-        
-        # 재고 부족 상품
-        cursor.execute("""
-            SELECT COUNT(*) FROM inventory
-            WHERE quantity < safe_stock
-        """)
-        low_stock_count = int(cursor.fetchone()[0])
+        async with acquire() as conn, conn.cursor() as cursor:
+            # 오늘/어제 매출(조건부 집계, sale_date 인덱스 범위 스캔) + 발주 대기 + 재고 부족을 한 번에 조회
+            today = date.today()
+            await cursor.execute(STATS_SUMMARY_SQL, (
+                today, today, today,
+                today - timedelta(days=1), today + timedelta(days=1)
+            ))
+            row = await cursor.fetchone()
         
-        cursor.close()
-        db.close()
+        # 금액은 센트 단위 int (변화율은 센트 값으로 계산해도 같음)
+        today_cents = row[0]
+        yesterday_cents = row[1]
+        pending_orders = int(row[2])
+        low_stock_count = int(row[3])
         
         # 변화율 계산
         sales_change = 0
-        if yesterday_sales > 0:
-            sales_change = ((today_sales - yesterday_sales) / yesterday_sales) * 100
+        if yesterday_cents > 0:
+            sales_change = ((today_cents - yesterday_cents) / yesterday_cents) * 100
         
         return {
-            "today_sales": int(today_sales),
+            "today_sales": today_cents // 100,
             "sales_change": round(sales_change, 1),
             "pending_orders": pending_orders,
             "low_stock_items": low_stock_count,
@@ -365,41 +445,23 @@ async def get_stats_summary():
 
 
 @app.get("/api/stats/sales/trend")
-async def get_sales_trend(days: int = 7):
+@cache_response("stats:trend:{days}", ttl=120)
+async def get_sales_trend(days: int = Query(7, ge=1, le=365)):
     """판매 트렌드"""
     try:
-        import pymysql
-        db = pymysql.connect(
-            host=os.getenv("MYSQL_HOST", "localhost"),
-            port=int(os.getenv("MYSQL_PORT", 3306)),
-            user=os.getenv("MYSQL_USER", "root"),
-            password=os.getenv("MYSQL_PASSWORD"),
-            database=os.getenv("MYSQL_DATABASE", "store_order"),
-            charset='utf8mb4'
-        )
-        cursor = db.cursor()
-        
-        cursor.execute("""
-            SELECT 
-                DATE(sale_date) as date,
-                SUM(quantity_sold) as orders,
-                SUM(sale_price * quantity_sold) as sales
-            FROM sales
-            WHERE sale_date >= DATE_SUB(CURDATE(), INTERVAL %s DAY)
-            GROUP BY DATE(sale_date)
-            ORDER BY date ASC
-        """, (days,))
-        
-        trend_data = []
-        for row in cursor.fetchall():
-            trend_data.append({
-                "date": row[0].strftime('%m/%d'),
-                "sales": int(float(row[2])) if row[2] else 0,
-                "orders": int(row[1]) if row[1] else 0
-            })
-        
-        cursor.close()
-        db.close()
+        async with acquire() as conn, conn.cursor() as cursor:
+            start = _days_ago(days)
+            await cursor.execute(STATS_TREND_SQL, (start, start))
+            
+            # 날짜는 그대로 반환 (orjson이 "YYYY-MM-DD"로 직렬화, 표시 형식은 프론트엔드에서 처리)
+            trend_data = [
+                {
+                    "date": row[0],
+                    "sales": (row[2] or 0) // 100,
+                    "orders": row[1] or 0
+                }
+                for row in await cursor.fetchall()
+            ]
         
         return {"data": trend_data}
     except Exception as e:
@@ -408,47 +470,25 @@ async def get_sales_trend(days: int = 7):
 
 
 @app.get("/api/stats/products/top")
-async def get_top_products(limit: int = 5):
+@cache_response("stats:top:{limit}", ttl=60)
+async def get_top_products(limit: int = Query(5, ge=1, le=50)):
     """인기 상품 TOP"""
     try:
-        import pymysql
-        db = pymysql.connect(
-            host=os.getenv("MYSQL_HOST", "localhost"),
-            port=int(os.getenv("MYSQL_PORT", 3306)),
-            user=os.getenv("MYSQL_USER", "root"),
-            password=os.getenv("MYSQL_PASSWORD"),
-            database=os.getenv("MYSQL_DATABASE", "store_order"),
-            charset='utf8mb4'
-        )
-        cursor = db.cursor()
-        
-        cursor.execute("""
-            SELECT 
-                s.product_name,
-                SUM(s.quantity_sold) as total_sales,
-                i.quantity as current_stock
-            FROM sales s
-            LEFT JOIN inventory i ON s.product_name = i.product_name
-            WHERE s.sale_date >= DATE_SUB(CURDATE(), INTERVAL 7 DAY)
-            GROUP BY s.product_name, i.quantity
-            ORDER BY total_sales DESC
-            LIMIT %s
-        """, (limit,))
-        
-        products = []
-        for row in cursor.fetchall():
-            # 간단한 트렌드 계산
-            trend = round((float(row[1]) / 100) * 10, 1) if row[1] else 0
+        async with acquire() as conn, conn.cursor() as cursor:
+            start = _days_ago(7)
+            await cursor.execute(STATS_TOP_PRODUCTS_SQL, (start, start, limit))
             
-            products.append({
-                "name": row[0],
-                "sales": int(row[1]) if row[1] else 0,
-                "trend": trend,
-                "stock": int(row[2]) if row[2] else 0
-            })
-        
-        cursor.close()
-        db.close()
+            products = []
+            for row in await cursor.fetchall():
+                # 간단한 트렌드 계산 (판매량 / 10)
+                trend = round(float(row[1]) / 10, 1) if row[1] else 0
+                
+                products.append({
+                    "name": row[0],
+                    "sales": int(row[1]) if row[1] else 0,
+                    "trend": trend,
+                    "stock": int(row[2]) if row[2] else 0
+                })
         
         return {"products": products}
     except Exception as e:
@@ -457,43 +497,22 @@ async def get_top_products(limit: int = 5):
 
 
 @app.get("/api/stats/category/distribution")
+@cache_response("stats:cat:30d", ttl=300)
 async def get_category_distribution():
     """카테고리별 판매 분포"""
     try:
-        import pymysql
-        db = pymysql.connect(
-            host=os.getenv("MYSQL_HOST", "localhost"),
-            port=int(os.getenv("MYSQL_PORT", 3306)),
-            user=os.getenv("MYSQL_USER", "root"),
-            password=os.getenv("MYSQL_PASSWORD"),
-            database=os.getenv("MYSQL_DATABASE", "store_order"),
-            charset='utf8mb4'
-        )
-        cursor = db.cursor()
-        
-        cursor.execute("""
-            SELECT 
-                i.category,
-                SUM(s.sale_price * s.quantity_sold) as total
-            FROM sales s
-            JOIN inventory i ON s.product_name = i.product_name
-            WHERE s.sale_date >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
-            GROUP BY i.category
-            ORDER BY total DESC
-        """)
-        
-        colors = ['#3b82f6', '#06b6d4', '#8b5cf6', '#ec4899', '#f59e0b', '#10b981']
-        categories = []
-        
-        for idx, row in enumerate(cursor.fetchall()):
-            categories.append({
-                "name": row[0],
-                "value": int(float(row[1])) if row[1] else 0,
-                "color": colors[idx % len(colors)]
-            })
-        
-        cursor.close()
-        db.close()
+        async with acquire() as conn, conn.cursor() as cursor:
+            start = _days_ago(30)
+            await cursor.execute(STATS_CATEGORY_SQL, (start, start))
+            
+            categories = []
+            
+            for idx, row in enumerate(await cursor.fetchall()):
+                categories.append({
+                    "name": row[0],
+                    "value": row[1] // 100 if row[1] else 0,
+                    "color": CATEGORY_COLORS[idx % len(CATEGORY_COLORS)]
+                })
         
         return {"data": categories}
     except Exception as e:
@@ -501,15 +520,31 @@ async def get_category_distribution():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/dashboard/bootstrap")
+async def get_dashboard_bootstrap(days: int = Query(7, ge=1, le=365), limit: int = Query(5, ge=1, le=50)):
+    """대시보드 초기 데이터 (요약/판매 트렌드/인기 상품/카테고리 분포를 한 번에 반환)"""
+    summary, sales_trend, top_products, categories = await asyncio.gather(
+        get_stats_summary(),
+        get_sales_trend(days),
+        get_top_products(limit),
+        get_category_distribution()
+    )
+    
+    return {
+        "summary": summary,
+        "sales": sales_trend["data"],
+        "products": top_products["products"],
+        "categories": categories["data"]
+    }
+
+
 @app.get("/api/weather/forecast")
-async def get_weather(days: int = 3):
-    """날씨 예보 조회"""
+@cache_response("weather:{days}", ttl=900)
+async def get_weather(days: int = Query(3, ge=1, le=14)):
+    """날씨 예보 조회 (예보는 자주 바뀌지 않으므로 15분 캐시)"""
     try:
-        from tools.weather_tools import get_weather_forecast
-        # @tool 데코레이터는 invoke() 사용
-        weather_str = get_weather_forecast.invoke({"days": days})
-        import json
-        weather = json.loads(weather_str)
+        # 도구 래퍼 없이 예보 dict를 직접 받음 (invoke()의 콜백/검증 단계와 JSON 변환 생략)
+        weather = _build_forecast(days)
         
         return {
             "status": "success",
@@ -577,7 +612,7 @@ async def get_scheduler_status():
 async def run_scheduler_now():
     """발주 추천 즉시 실행 (테스트용)"""
     try:
-        auto_scheduler.run_now()
+        await auto_scheduler.run_now()
         return {
             "status": "success",
             "message": "발주 추천이 실행되었습니다."
@@ -587,48 +622,37 @@ async def run_scheduler_now():
 
 
 @app.get("/api/recommendations")
-async def get_recommendations(limit: int = 10):
+async def get_recommendations(limit: int = 10, conn=Depends(get_conn)):
     """발주 추천 목록 조회"""
     try:
-        import pymysql
-        db = pymysql.connect(
-            host=os.getenv("MYSQL_HOST", "localhost"),
-            port=int(os.getenv("MYSQL_PORT", 3306)),
-            user=os.getenv("MYSQL_USER", "root"),
-            password=os.getenv("MYSQL_PASSWORD"),
-            database=os.getenv("MYSQL_DATABASE", "store_order"),
-            charset='utf8mb4'
-        )
-        cursor = db.cursor()
-        
-        cursor.execute("""
-            SELECT 
-                id,
-                recommendation_date,
-                total_items,
-                total_cost,
-                status,
-                created_at,
-                executed_at
-            FROM order_recommendations
-            ORDER BY recommendation_date DESC, created_at DESC
-            LIMIT %s
-        """, (limit,))
-        
-        recommendations = []
-        for row in cursor.fetchall():
-            recommendations.append({
-                "id": row[0],
-                "recommendation_date": row[1].strftime('%Y-%m-%d'),
-                "total_items": int(row[2]),
-                "total_cost": float(row[3]) if row[3] else 0,
-                "status": row[4],
-                "created_at": row[5].strftime('%Y-%m-%d %H:%M:%S'),
-                "executed_at": row[6].strftime('%Y-%m-%d %H:%M:%S') if row[6] else None
-            })
-        
-        cursor.close()
-        db.close()
+        async with conn.cursor() as cursor:
+            await cursor.execute("""
+                SELECT 
+                    id,
+                    recommendation_date,
+                    total_items,
+                    total_cost,
+                    status,
+                    created_at,
+                    executed_at
+                FROM order_recommendations
+                ORDER BY recommendation_date DESC, created_at DESC
+                LIMIT %s
+            """, (limit,))
+            
+            # DATE 컬럼은 그대로 반환 (orjson이 "YYYY-MM-DD"로 직렬화)
+            recommendations = [
+                {
+                    "id": row[0],
+                    "recommendation_date": row[1],
+                    "total_items": int(row[2]),
+                    "total_cost": float(row[3]) if row[3] else 0,
+                    "status": row[4],
+                    "created_at": row[5].strftime('%Y-%m-%d %H:%M:%S'),
+                    "executed_at": row[6].strftime('%Y-%m-%d %H:%M:%S') if row[6] else None
+                }
+                for row in await cursor.fetchall()
+            ]
         
         return {
             "recommendations": recommendations,
@@ -640,41 +664,35 @@ async def get_recommendations(limit: int = 10):
 
 
 @app.get("/api/recommendations/{recommendation_id}")
-async def get_recommendation_detail(recommendation_id: int):
+async def get_recommendation_detail(recommendation_id: int, conn=Depends(get_conn)):
     """발주 추천 상세 조회"""
     try:
-        
-        
-        
-        import pymysql
-        db = pymysql.connect(host=os.getenv("MYSQL_HOST", "localhost"), port=int(os.getenv("MYSQL_PORT", 3306)), user=os.getenv("MYSQL_USER", "root"), password=os.getenv("MYSQL_PASSWORD"), database=os.getenv("MYSQL_DATABASE", "store_order"), charset="utf8mb4")
-        cursor = db.cursor()
-        cursor.execute("""
-            SELECT 
-                id,
-                recommendation_date,
-                inventory_analysis,
-                sales_analysis,
-                weather_analysis,
-                final_recommendation,
-                total_items,
-                total_cost,
-                status,
-                created_at,
-                executed_at
-            FROM order_recommendations
-            WHERE id = %s
-        """, (recommendation_id,))
-        
-        row = cursor.fetchone()
-        cursor.close()
+        async with conn.cursor() as cursor:
+            await cursor.execute("""
+                SELECT 
+                    id,
+                    recommendation_date,
+                    inventory_analysis,
+                    sales_analysis,
+                    weather_analysis,
+                    final_recommendation,
+                    total_items,
+                    total_cost,
+                    status,
+                    created_at,
+                    executed_at
+                FROM order_recommendations
+                WHERE id = %s
+            """, (recommendation_id,))
+            
+            row = await cursor.fetchone()
         
         if not row:
             raise HTTPException(status_code=404, detail="발주 추천을 찾을 수 없습니다.")
         
         return {
             "id": row[0],
-            "recommendation_date": row[1].strftime('%Y-%m-%d'),
+            "recommendation_date": row[1],
             "inventory_analysis": row[2],
             "sales_analysis": row[3],
             "weather_analysis": row[4],
@@ -690,110 +708,107 @@ async def get_recommendation_detail(recommendation_id: int):
     except Exception as e:
         logger.error(f"발주 추천 상세 조회 오류: {e}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if 'cursor' in locals():
-            cursor.close()
-        if 'db' in locals():
-            db.close()
 
 
 @app.post("/api/recommendations/{recommendation_id}/execute")
 async def execute_recommendation(recommendation_id: int):
     """발주 추천 실행 - 실제 재고 업데이트 + 발주 기록 생성"""
-    db = None
-    cursor = None
-    
     try:
-        import pymysql
-        from datetime import datetime, timedelta
-        
-        db = pymysql.connect(
-            host=os.getenv("MYSQL_HOST", "localhost"),
-            port=int(os.getenv("MYSQL_PORT", 3306)),
-            user=os.getenv("MYSQL_USER", "root"),
-            password=os.getenv("MYSQL_PASSWORD"),
-            database=os.getenv("MYSQL_DATABASE", "store_order"),
-            charset='utf8mb4'
-        )
-        cursor = db.cursor()
-        
-        # 1. 발주 추천 조회
-        cursor.execute("""
-            SELECT status FROM order_recommendations WHERE id = %s
-        """, (recommendation_id,))
-        
-        result = cursor.fetchone()
-        if not result:
-            raise HTTPException(status_code=404, detail="발주 추천을 찾을 수 없습니다.")
-        
-        if result[0] == 'executed':
-            raise HTTPException(status_code=400, detail="이미 실행된 발주 추천입니다.")
-        
-        # 2. 발주 품목 조회
-        cursor.execute("""
-            SELECT 
-                product_name,
-                order_quantity,
-                unit_price,
-                total_cost
-            FROM order_items
-            WHERE recommendation_id = %s
-        """, (recommendation_id,))
-        
-        items = cursor.fetchall()
-        
-        if not items:
-            raise HTTPException(status_code=400, detail="발주 품목이 없습니다.")
-        
-        # 3. 각 품목 처리
-        order_date = datetime.now().date()
-        delivery_date = order_date + timedelta(days=2)  # 2일 후 도착
-        
-        for item in items:
-            product_name = item[0]
-            order_quantity = int(item[1])
-            unit_price = float(item[2])
-            total_cost = float(item[3])
+        async with transaction() as conn, conn.cursor() as cursor:
+            # 1. 발주 추천 상태 + 품목을 한 번에 조회 (품목이 없으면 item 컬럼이 NULL인 한 행)
+            # FOR UPDATE: 같은 추천을 동시에 실행하면 뒤 요청은 커밋까지 기다린 뒤 'executed'를 보고 거절됨
+            await cursor.execute("""
+                SELECT 
+                    r.status,
+                    i.product_name,
+                    i.order_quantity,
+                    i.unit_price,
+                    i.total_cost
+                FROM order_recommendations r
+                LEFT JOIN order_items i ON i.recommendation_id = r.id
+                WHERE r.id = %s
+                FOR UPDATE
+            """, (recommendation_id,))
+            
+            rows = await cursor.fetchall()
+            if not rows:
+                raise HTTPException(status_code=404, detail="발주 추천을 찾을 수 없습니다.")
+            
+            if rows[0][0] == 'executed':
+                raise HTTPException(status_code=400, detail="이미 실행된 발주 추천입니다.")
+            
+            # 2. 발주 품목 (product_name, order_quantity, unit_price, total_cost)
+            items = [row[1:] for row in rows if row[1] is not None]
+            
+            if not items:
+                raise HTTPException(status_code=400, detail="발주 품목이 없습니다.")
             
-            # 3-1. inventory 테이블 업데이트 (재고 증가)
-            cursor.execute("""
+            # 3. 품목 일괄 처리
+            order_date = datetime.now().date()
+            delivery_date = order_date + timedelta(days=2)  # 2일 후 도착
+            
+            # 같은 상품이 여러 번 나오면 수량/금액을 합산 (상품당 발주 기록 1건)
+            # product_name -> [수량, 단가, 금액]
+            merged = {}
+            for product_name, quantity, unit_price, total_cost in items:
+                entry = merged.setdefault(product_name, [0, float(unit_price), 0.0])
+                entry[0] += int(quantity)
+                entry[2] += float(total_cost)
+            added_quantity = {name: entry[0] for name, entry in merged.items()}
+            
+            # 3-1. inventory 테이블 업데이트 (재고 증가) - CASE로 한 번에
+            
+            case_sql = " ".join(["WHEN %s THEN %s"] * len(added_quantity))
+            in_sql = ", ".join(["%s"] * len(added_quantity))
+            case_params = [value for pair in added_quantity.items() for value in pair]
+            await cursor.execute(f"""
                 UPDATE inventory 
                 SET 
-                    quantity = quantity + %s,
+                    quantity = quantity + CASE product_name {case_sql} ELSE 0 END,
                     last_updated = NOW()
-                WHERE product_name = %s
-            """, (order_quantity, product_name))
+                WHERE product_name IN ({in_sql})
+            """, (*case_params, *added_quantity.keys()))
             
-            # 3-2. orders 테이블에 발주 기록 추가
-            cursor.execute("""
+            # 3-2. orders 테이블에 발주 기록 추가 (executemany → 다중 행 INSERT 한 번)
+            # (recommendation_id, product_name) UNIQUE 키로 같은 추천의 중복 발주 기록을 차단
+            await cursor.executemany("""
                 INSERT INTO orders 
-                (product_name, quantity_ordered, unit_cost, total_cost, 
+                (recommendation_id, product_name, quantity_ordered, unit_cost, total_cost, 
                  order_date, delivery_date, status)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """, (
-                product_name,
-                order_quantity,
-                unit_price,
-                total_cost,
-                order_date,
-                delivery_date,
-                'pending'  # 발주 완료, 배송 대기
-            ))
-        
-        # 4. 발주 추천 상태 업데이트
-        cursor.execute("""
-            UPDATE order_recommendations 
-            SET status = 'executed', executed_at = NOW()
-            WHERE id = %s
-        """, (recommendation_id,))
-        
-        db.commit()
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            """, [
+                (
+                    recommendation_id,
+                    product_name,
+                    quantity,
+                    unit_price,
+                    total_cost,
+                    order_date,
+                    delivery_date,
+                    'pending'  # 발주 완료, 배송 대기
+                )
+                for product_name, (quantity, unit_price, total_cost) in merged.items()
+            ])
+            
+            # 4. 발주 추천 상태 업데이트
+            await cursor.execute("""
+                UPDATE order_recommendations 
+                SET status = 'executed', executed_at = NOW()
+                WHERE id = %s
+            """, (recommendation_id,))
         
         logger.info(f"✅ 발주 실행 완료 (ID: {recommendation_id})")
         logger.info(f"📦 {len(items)}개 품목 발주")
         logger.info(f"📦 재고 업데이트 완료")
         logger.info(f"📝 발주 기록 생성 완료")
         
+        # 재고/발주 집계가 바뀌었으므로 대시보드 통계 캐시 무효화
+        await invalidate("stats:")
+        
+        # 재고가 늘었으므로 캐시된 재고 부족 분석도 무효화 (재발주 추천 방지)
+        InventoryAgent.get_low_stock_alert.cache_clear()
+        InventoryAgent.aget_low_stock_alert.cache_clear()
+        
         return {
             "status": "success",
             "message": f"발주가 실행되었습니다. {len(items)}개 품목이 발주되었습니다.",
@@ -801,76 +816,79 @@ async def execute_recommendation(recommendation_id: int):
             "items_count": len(items),
             "delivery_date": delivery_date.strftime('%Y-%m-%d')
         }
-        
+    
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"발주 실행 오류: {e}")
-        if db:
-            try:
-                db.rollback()
-            except:
-                pass
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        # 안전하게 연결 닫기
-        try:
-            if cursor:
-                cursor.close()
-        except:
-            pass
-        
-        try:
-            if db:
-                db.close()
-        except:
-            pass
+
+
+def _keyset_page(cursor_date: Optional[date], cursor_id: Optional[int]) -> Tuple[str, list]:
+    """
+    (recommendation_date DESC, id DESC) 순서의 키셋 페이지 조건
+    
+    이전 페이지 마지막 행의 (recommendation_date, id)를 받아 그 다음 행부터 조회합니다.
+    (status, recommendation_date) 인덱스는 InnoDB에서 PK(id)까지 포함하므로
+    OFFSET 없이 인덱스 범위 스캔으로 바로 다음 페이지를 찾습니다.
+    """
+    if cursor_date is None or cursor_id is None:
+        return "", []
+    return (
+        " AND (recommendation_date < %s OR (recommendation_date = %s AND id < %s))",
+        [cursor_date, cursor_date, cursor_id]
+    )
+
+
+def _next_cursor(rows: list, limit: int) -> Optional[Dict]:
+    """페이지가 가득 찼으면 다음 페이지 요청에 쓸 커서 반환 (마지막 페이지면 None)"""
+    if len(rows) < limit:
+        return None
+    last = rows[-1]
+    return {"cursor_date": last["recommendation_date"], "cursor_id": last["id"]}
 
 
 @app.get("/api/orders/pending")
-async def get_pending_orders():
-    """발주 대기 목록 조회 (pending 상태의 발주 추천)"""
+async def get_pending_orders(
+    limit: int = Query(100, ge=1, le=500),
+    cursor_date: Optional[date] = None,
+    cursor_id: Optional[int] = None,
+    conn=Depends(get_conn)
+):
+    """발주 대기 목록 조회 (pending 상태의 발주 추천, 키셋 페이지네이션)"""
     try:
-        import pymysql
-        db = pymysql.connect(
-            host=os.getenv("MYSQL_HOST", "localhost"),
-            port=int(os.getenv("MYSQL_PORT", 3306)),
-            user=os.getenv("MYSQL_USER", "root"),
-            password=os.getenv("MYSQL_PASSWORD"),
-            database=os.getenv("MYSQL_DATABASE", "store_order"),
-            charset='utf8mb4'
-        )
-        cursor = db.cursor()
-        
-        cursor.execute("""
-            SELECT 
-                id,
-                recommendation_date,
-                total_items,
-                total_cost,
-                created_at
-            FROM order_recommendations
-            WHERE status = 'pending'
-            ORDER BY recommendation_date DESC, created_at DESC
-        """)
-        
-        pending_orders = []
-        for row in cursor.fetchall():
-            pending_orders.append({
-                "id": row[0],
-                "recommendation_date": row[1].strftime('%Y-%m-%d'),
-                "total_items": int(row[2]),
-                "total_cost": float(row[3]) if row[3] else 0,
-                "created_at": row[4].strftime('%Y-%m-%d %H:%M:%S'),
-                "status": "pending"
-            })
-        
-        cursor.close()
-        db.close()
+        page_sql, page_params = _keyset_page(cursor_date, cursor_id)
+        
+        async with conn.cursor() as cursor:
+            await cursor.execute(f"""
+                SELECT 
+                    id,
+                    recommendation_date,
+                    total_items,
+                    total_cost,
+                    created_at
+                FROM order_recommendations
+                WHERE status = 'pending'{page_sql}
+                ORDER BY recommendation_date DESC, id DESC
+                LIMIT %s
+            """, (*page_params, limit))
+            
+            pending_orders = [
+                {
+                    "id": row[0],
+                    "recommendation_date": row[1],
+                    "total_items": int(row[2]),
+                    "total_cost": float(row[3]) if row[3] else 0,
+                    "created_at": row[4].strftime('%Y-%m-%d %H:%M:%S'),
+                    "status": "pending"
+                }
+                for row in await cursor.fetchall()
+            ]
         
         return {
             "orders": pending_orders,
-            "total": len(pending_orders)
+            "total": len(pending_orders),
+            "next_cursor": _next_cursor(pending_orders, limit)
         }
     except Exception as e:
         logger.error(f"발주 대기 목록 조회 오류: {e}")
@@ -878,52 +896,39 @@ async def get_pending_orders():
 
 
 @app.get("/api/recommendations/{recommendation_id}/items")
-async def get_recommendation_items(recommendation_id: int):
+async def get_recommendation_items(recommendation_id: int, conn=Depends(get_conn)):
     """발주 추천의 상세 품목 조회"""
     try:
-        import pymysql
-        db = pymysql.connect(
-            host=os.getenv("MYSQL_HOST", "localhost"),
-            port=int(os.getenv("MYSQL_PORT", 3306)),
-            user=os.getenv("MYSQL_USER", "root"),
-            password=os.getenv("MYSQL_PASSWORD"),
-            database=os.getenv("MYSQL_DATABASE", "store_order"),
-            charset='utf8mb4'
-        )
-        cursor = db.cursor()
-        
-        cursor.execute("""
-            SELECT 
-                id,
-                product_name,
-                current_stock,
-                safe_stock,
-                order_quantity,
-                unit_price,
-                total_cost,
-                reason,
-                priority
-            FROM order_items
-            WHERE recommendation_id = %s
-            ORDER BY priority DESC, product_name ASC
-        """, (recommendation_id,))
-        
-        items = []
-        for row in cursor.fetchall():
-            items.append({
-                "id": row[0],
-                "product_name": row[1],
-                "current_stock": int(row[2]),
-                "safe_stock": int(row[3]),
-                "order_quantity": int(row[4]),
-                "unit_price": float(row[5]) if row[5] else 0,
-                "total_cost": float(row[6]) if row[6] else 0,
-                "reason": row[7],
-                "priority": row[8]
-            })
-        
-        cursor.close()
-        db.close()
+        async with conn.cursor() as cursor:
+            await cursor.execute("""
+                SELECT 
+                    id,
+                    product_name,
+                    current_stock,
+                    safe_stock,
+                    order_quantity,
+                    unit_price,
+                    total_cost,
+                    reason,
+                    priority
+                FROM order_items
+                WHERE recommendation_id = %s
+                ORDER BY priority DESC, product_name ASC
+            """, (recommendation_id,))
+            
+            items = []
+            for row in await cursor.fetchall():
+                items.append({
+                    "id": row[0],
+                    "product_name": row[1],
+                    "current_stock": int(row[2]),
+                    "safe_stock": int(row[3]),
+                    "order_quantity": int(row[4]),
+                    "unit_price": float(row[5]) if row[5] else 0,
+                    "total_cost": float(row[6]) if row[6] else 0,
+                    "reason": row[7],
+                    "priority": row[8]
+                })
         
         return {
             "items": items,
@@ -941,61 +946,48 @@ async def get_recommendation_items(recommendation_id: int):
 @app.put("/api/recommendations/{recommendation_id}/items/{item_id}")
 async def update_order_item(recommendation_id: int, item_id: int, quantity: int):
     """발주 품목 수량 수정"""
-    db = None
-    cursor = None
-    
     try:
-        import pymysql
-        
-        db = pymysql.connect(
-            host=os.getenv("MYSQL_HOST", "localhost"),
-            port=int(os.getenv("MYSQL_PORT", 3306)),
-            user=os.getenv("MYSQL_USER", "root"),
-            password=os.getenv("MYSQL_PASSWORD"),
-            database=os.getenv("MYSQL_DATABASE", "store_order"),
-            charset='utf8mb4'
-        )
-        cursor = db.cursor()
-        
-        # 1. 품목 정보 조회
-        cursor.execute("""
-            SELECT unit_price FROM order_items
-            WHERE id = %s AND recommendation_id = %s
-        """, (item_id, recommendation_id))
-        
-        result = cursor.fetchone()
-        if not result:
-            raise HTTPException(status_code=404, detail="품목을 찾을 수 없습니다.")
-        
-        unit_price = float(result[0])
-        new_total_cost = unit_price * quantity
-        
-        # 2. 품목 수량 및 금액 업데이트
-        cursor.execute("""
-            UPDATE order_items
-            SET order_quantity = %s, total_cost = %s
-            WHERE id = %s AND recommendation_id = %s
-        """, (quantity, new_total_cost, item_id, recommendation_id))
-        
-        # 3. 전체 발주 금액 재계산
-        cursor.execute("""
-            SELECT SUM(total_cost) FROM order_items
-            WHERE recommendation_id = %s
-        """, (recommendation_id,))
-        
-        total_cost = float(cursor.fetchone()[0] or 0)
-        
-        # 4. 발주 추천 테이블 업데이트
-        cursor.execute("""
-            UPDATE order_recommendations
-            SET total_cost = %s
-            WHERE id = %s
-        """, (total_cost, recommendation_id))
-        
-        db.commit()
+        async with transaction() as conn, conn.cursor() as cursor:
+            # 1. 품목 정보 조회
+            await cursor.execute("""
+                SELECT unit_price FROM order_items
+                WHERE id = %s AND recommendation_id = %s
+            """, (item_id, recommendation_id))
+            
+            result = await cursor.fetchone()
+            if not result:
+                raise HTTPException(status_code=404, detail="품목을 찾을 수 없습니다.")
+            
+            unit_price = float(result[0])
+            new_total_cost = unit_price * quantity
+            
+            # 2. 품목 수량 및 금액 업데이트
+            await cursor.execute("""
+                UPDATE order_items
+                SET order_quantity = %s, total_cost = %s
+                WHERE id = %s AND recommendation_id = %s
+            """, (quantity, new_total_cost, item_id, recommendation_id))
+            
+            # 3. 전체 발주 금액 재계산
+            await cursor.execute("""
+                SELECT SUM(total_cost) FROM order_items
+                WHERE recommendation_id = %s
+            """, (recommendation_id,))
+            
+            total_cost = float((await cursor.fetchone())[0] or 0)
+            
+            # 4. 발주 추천 테이블 업데이트
+            await cursor.execute("""
+                UPDATE order_recommendations
+                SET total_cost = %s
+                WHERE id = %s
+            """, (total_cost, recommendation_id))
         
         logger.info(f"✅ 발주 품목 수정: ID={item_id}, 수량={quantity}, 금액={new_total_cost:,.0f}원")
         
+        # 발주 금액 집계가 바뀌었으므로 발주 통계 캐시 무효화
+        await invalidate("stats:orders:")
+        
         return {
             "status": "success",
             "item_id": item_id,
@@ -1003,28 +995,12 @@ async def update_order_item(recommendation_id: int, item_id: int, quantity: int)
             "item_total_cost": new_total_cost,
             "order_total_cost": total_cost
         }
-        
+    
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"발주 품목 수정 오류: {e}")
-        if db:
-            try:
-                db.rollback()
-            except:
-                pass
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if cursor:
-            try:
-                cursor.close()
-            except:
-                pass
-        if db:
-            try:
-                db.close()
-            except:
-                pass
 
 
 @app.get("/api/orders/history")
@@ -1032,154 +1008,154 @@ async def get_order_history(
     start_date: str = None,
     end_date: str = None,
     status: str = None,
-    limit: int = 50
+    limit: int = Query(50, ge=1, le=500),
+    cursor_date: Optional[date] = None,
+    cursor_id: Optional[int] = None,
+    conn=Depends(get_conn)
 ):
-    """발주 이력 조회"""
+    """발주 이력 조회 (키셋 페이지네이션: 응답의 next_cursor 값을 다음 요청에 전달)"""
     try:
-        import pymysql
-        
-        db = pymysql.connect(
-            host=os.getenv("MYSQL_HOST", "localhost"),
-            port=int(os.getenv("MYSQL_PORT", 3306)),
-            user=os.getenv("MYSQL_USER", "root"),
-            password=os.getenv("MYSQL_PASSWORD"),
-            database=os.getenv("MYSQL_DATABASE", "store_order"),
-            charset='utf8mb4'
-        )
-        cursor = db.cursor()
-        
-        # 기본 쿼리
-        query = """
-            SELECT 
-                id,
-                recommendation_date,
-                total_items,
-                total_cost,
-                status,
-                created_at,
-                executed_at
-            FROM order_recommendations
-            WHERE 1=1
-        """
-        params = []
-        
-        # 날짜 필터
-        if start_date:
-            query += " AND recommendation_date >= %s"
-            params.append(start_date)
-        if end_date:
-            query += " AND recommendation_date <= %s"
-            params.append(end_date)
-        
-        # 상태 필터
-        if status:
-            query += " AND status = %s"
-            params.append(status)
-        
-        query += " ORDER BY recommendation_date DESC, created_at DESC LIMIT %s"
-        params.append(limit)
-        
-        cursor.execute(query, tuple(params))
-        
-        history = []
-        for row in cursor.fetchall():
-            history.append({
-                "id": row[0],
-                "recommendation_date": row[1].strftime('%Y-%m-%d'),
-                "total_items": int(row[2]),
-                "total_cost": float(row[3]) if row[3] else 0,
-                "status": row[4],
-                "created_at": row[5].strftime('%Y-%m-%d %H:%M:%S'),
-                "executed_at": row[6].strftime('%Y-%m-%d %H:%M:%S') if row[6] else None
-            })
-        
-        cursor.close()
-        db.close()
+        async with conn.cursor() as cursor:
+            # 기본 쿼리
+            query = """
+                SELECT 
+                    id,
+                    recommendation_date,
+                    total_items,
+                    total_cost,
+                    status,
+                    created_at,
+                    executed_at
+                FROM order_recommendations
+                WHERE 1=1
+            """
+            params = []
+            
+            # 날짜 필터
+            if start_date:
+                query += " AND recommendation_date >= %s"
+                params.append(start_date)
+            if end_date:
+                query += " AND recommendation_date <= %s"
+                params.append(end_date)
+            
+            # 상태 필터
+            if status:
+                query += " AND status = %s"
+                params.append(status)
+            
+            # 이전 페이지 이후부터
+            page_sql, page_params = _keyset_page(cursor_date, cursor_id)
+            query += page_sql
+            params.extend(page_params)
+            
+            query += " ORDER BY recommendation_date DESC, id DESC LIMIT %s"
+            params.append(limit)
+            
+            await cursor.execute(query, tuple(params))
+            
+            history = [
+                {
+                    "id": row[0],
+                    "recommendation_date": row[1],
+                    "total_items": int(row[2]),
+                    "total_cost": float(row[3]) if row[3] else 0,
+                    "status": row[4],
+                    "created_at": row[5].strftime('%Y-%m-%d %H:%M:%S'),
+                    "executed_at": row[6].strftime('%Y-%m-%d %H:%M:%S') if row[6] else None
+                }
+                for row in await cursor.fetchall()
+            ]
         
         return {
             "history": history,
-            "total": len(history)
+            "total": len(history),
+            "next_cursor": _next_cursor(history, limit)
         }
     except Exception as e:
         logger.error(f"발주 이력 조회 오류: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _month_bounds(month: str) -> Tuple[date, date]:
+    """'YYYY-MM' -> (그 달 1일, 다음 달 1일) - 월 조회를 인덱스 범위 조건으로 쓰기 위함"""
+    start = datetime.strptime(month, '%Y-%m').date()
+    if start.month == 12:
+        return start, start.replace(year=start.year + 1, month=1)
+    return start, start.replace(month=start.month + 1)
+
+
 @app.get("/api/orders/statistics")
-async def get_order_statistics(month: str = None):
+@cache_response("stats:orders:{month}", ttl=300)
+async def get_order_statistics(month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$")):
     """발주 통계"""
     try:
-        import pymysql
-        from datetime import datetime
-        
         # 기본값: 이번 달
         if not month:
             month = datetime.now().strftime('%Y-%m')
         
-        db = pymysql.connect(
-            host=os.getenv("MYSQL_HOST", "localhost"),
-            port=int(os.getenv("MYSQL_PORT", 3306)),
-            user=os.getenv("MYSQL_USER", "root"),
-            password=os.getenv("MYSQL_PASSWORD"),
-            database=os.getenv("MYSQL_DATABASE", "store_order"),
-            charset='utf8mb4'
-        )
-        cursor = db.cursor()
-        
-        # 월별 통계
-        cursor.execute("""
-            SELECT 
-                COUNT(*) as total_orders,
-                SUM(total_items) as total_items,
-                SUM(total_cost) as total_cost,
-                SUM(CASE WHEN status = 'executed' THEN 1 ELSE 0 END) as executed_count,
-                SUM(CASE WHEN status = 'pending' THEN 1 ELSE 0 END) as pending_count
-            FROM order_recommendations
-            WHERE DATE_FORMAT(recommendation_date, '%%Y-%%m') = %s
-        """, (month,))
-        
-        row = cursor.fetchone()
-        
-        # 일별 발주 금액
-        cursor.execute("""
-            SELECT 
-                DATE(recommendation_date) as date,
-                SUM(total_cost) as daily_cost,
-                COUNT(*) as daily_count
-            FROM order_recommendations
-            WHERE DATE_FORMAT(recommendation_date, '%%Y-%%m') = %s
-            GROUP BY DATE(recommendation_date)
-            ORDER BY date
-        """, (month,))
-
-        
-        daily_data = []
-        for row2 in cursor.fetchall():
-            daily_data.append({
-                "date": row2[0].strftime('%Y-%m-%d'),
-                "cost": float(row2[1]) if row2[1] else 0,
-                "count": int(row2[2])
-            })
-        
-        cursor.close()
-        db.close()
+        try:
+            month_start, next_month_start = _month_bounds(month)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="month는 YYYY-MM 형식이어야 합니다.")
+        
+        async with acquire() as conn, conn.cursor() as cursor:
+            # 일별 집계 + 월 합계(WITH ROLLUP)를 한 번의 인덱스 범위 스캔으로 조회
+            await cursor.execute("""
+                SELECT 
+                    recommendation_date as date,
+                    COUNT(*) as order_count,
+                    SUM(total_items) as total_items,
+                    SUM(total_cost) as total_cost,
+                    SUM(status = 'executed') as executed_count,
+                    SUM(status = 'pending') as pending_count
+                FROM order_recommendations
+                WHERE recommendation_date >= %s
+                AND recommendation_date < %s
+                GROUP BY recommendation_date WITH ROLLUP
+                ORDER BY GROUPING(recommendation_date), recommendation_date
+            """, (month_start, next_month_start))
+            rows = await cursor.fetchall()
+        
+        # 일별 행은 날짜순, ROLLUP 합계 행(date가 NULL)은 ORDER BY GROUPING(...)으로 마지막에 옴
+        row = (None, 0, 0, 0, 0, 0)
+        if rows and rows[-1][0] is None:
+            row = rows[-1]
+            rows = rows[:-1]
+        
+        daily_data = [
+            {
+                "date": row2[0],
+                "cost": float(row2[3]) if row2[3] else 0,
+                "count": int(row2[1])
+            }
+            for row2 in rows
+        ]
         
         return {
             "month": month,
             "summary": {
-                "total_orders": int(row[0]) if row[0] else 0,
-                "total_items": int(row[1]) if row[1] else 0,
-                "total_cost": float(row[2]) if row[2] else 0,
-                "executed_count": int(row[3]) if row[3] else 0,
-                "pending_count": int(row[4]) if row[4] else 0
+                "total_orders": int(row[1]) if row[1] else 0,
+                "total_items": int(row[2]) if row[2] else 0,
+                "total_cost": float(row[3]) if row[3] else 0,
+                "executed_count": int(row[4]) if row[4] else 0,
+                "pending_count": int(row[5]) if row[5] else 0
             },
             "daily_data": daily_data
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"발주 통계 조회 오류: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# 모듈형 라우터 등록 (대시보드 통계/발주 대기·이력 조회는 위의 main.py 핸들러가 담당)
+app.include_router(stats_router)
+app.include_router(orders_router)
+app.include_router(data_router)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -1,12 +1,12 @@
 """
 RAG package - 지식 베이스 기반 검색 시스템
 """
-from .rag_manager import RAGManager, get_rag  # 기존 (데이터 패턴 학습용)
+from .rag_manager import RAGManager, get_rag, configure  # 기존 (데이터 패턴 학습용)
 from .rag_engine import RAGEngine, get_rag_engine  # 신규 (지식 베이스용)
 from .vector_store import VectorStore
 from .document_loader import DocumentLoader
 
 __all__ = [
-    "RAGManager", "get_rag",  # 기존
+    "RAGManager", "get_rag", "configure",  # 기존
     "RAGEngine", "get_rag_engine", "VectorStore", "DocumentLoader"  # 신규
 ]
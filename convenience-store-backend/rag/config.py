@@ -0,0 +1,22 @@
+"""
+임베딩 모델 설정
+EMBEDDING_BACKEND=minilm 이면 두 RAG 시스템 모두 로컬 경량 다국어 모델(384차원)을 사용합니다.
+"""
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 임베딩 백엔드 ("default" 또는 "minilm")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "default").strip().lower()
+
+# 한국어를 지원하는 경량 다국어 모델
+MINILM_MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+
+# VectorStore(지식 베이스) 모델과 차원
+if EMBEDDING_BACKEND == "minilm":
+    EMBEDDING_MODEL_NAME = MINILM_MODEL_NAME
+    EMBEDDING_DIM = 384
+else:
+    EMBEDDING_MODEL_NAME = "jhgan/ko-sroberta-multitask"
+    EMBEDDING_DIM = 768
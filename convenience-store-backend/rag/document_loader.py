@@ -2,11 +2,26 @@
 문서 로더 - 마크다운 파일 로드
 """
 import os
-from typing import List, Dict
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional
 import logging
 
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
 logger = logging.getLogger(__name__)
 
+# 임베딩 모델 입력 한도(512 토큰) 안에 들어가도록 마크다운 섹션 단위로 분할
+CHUNK_SIZE = 600
+CHUNK_OVERLAP = 80
+_SEPARATORS = ["\n## ", "\n### ", "\n\n", "\n", ". ", " "]
+
+# 파일 읽기 스레드 수 상한
+MAX_READ_WORKERS = 32
+
+# KB_READAHEAD=1 이면 읽기 전에 모든 파일의 커널 readahead를 한 번에 요청 (Linux, 콜드 캐시용)
+KB_READAHEAD = os.getenv("KB_READAHEAD", "0") == "1" and hasattr(os, "posix_fadvise")
+
 
 class DocumentLoader:
     """마크다운 문서 로더"""
@@ -17,16 +32,21 @@ class DocumentLoader:
             base_path: 지식 베이스 디렉토리
         """
         self.base_path = base_path
+        self.splitter = RecursiveCharacterTextSplitter(
+            separators=_SEPARATORS,
+            chunk_size=CHUNK_SIZE,
+            chunk_overlap=CHUNK_OVERLAP
+        )
     
     def load_directory(self, subdirectory: str) -> List[Dict]:
         """
-        디렉토리의 모든 마크다운 파일 로드
+        디렉토리의 모든 마크다운 파일을 로드해 청크 단위로 반환
         
         Args:
             subdirectory: products, manuals, patterns 등
             
         Returns:
-            [{"content": "...", "metadata": {...}}, ...]
+            [{"content": "...", "metadata": {..., "chunk": 0, "file_hash": "..."}}, ...] (파일당 1개 이상)
         """
         directory = os.path.join(self.base_path, subdirectory)
         
@@ -34,36 +54,77 @@ class DocumentLoader:
             logger.warning(f"⚠️ 디렉토리 없음: {directory}")
             return []
         
+        with os.scandir(directory) as entries:
+            paths = sorted(
+                entry.path for entry in entries
+                if entry.name.endswith('.md') and entry.is_file()
+            )
+        
+        # 파일 읽기는 I/O 동안 GIL을 놓으므로 스레드로 동시에 읽기
+        contents = self._read_files(paths)
+        
         documents = []
         
-        for filename in os.listdir(directory):
-            if filename.endswith('.md'):
-                filepath = os.path.join(directory, filename)
-                
-                try:
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    
-                    # 메타데이터
-                    metadata = {
+        for filepath, content in zip(paths, contents):
+            if content is None:
+                continue
+            
+            filename = os.path.basename(filepath)
+            # 파일 내용 해시 (재인덱싱 시 바뀐 파일만 다시 임베딩)
+            file_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+            
+            # 청크마다 메타데이터 (chunk: 파일 내 순번)
+            chunks = self.splitter.split_text(content)
+            for i, chunk in enumerate(chunks):
+                documents.append({
+                    "content": chunk,
+                    "metadata": {
                         "source": filename,
                         "category": subdirectory,
-                        "path": filepath
+                        "path": filepath,
+                        "chunk": i,
+                        "file_hash": file_hash
                     }
-                    
-                    documents.append({
-                        "content": content,
-                        "metadata": metadata
-                    })
-                    
-                    logger.info(f"📄 로드: {filename}")
-                    
-                except Exception as e:
-                    logger.error(f"❌ 파일 로드 실패 ({filename}): {e}")
+                })
+            
+            logger.info(f"📄 로드: {filename} ({len(chunks)}개 청크)")
         
-        logger.info(f"✅ {len(documents)}개 문서 로드 완료: {subdirectory}")
+        logger.info(f"✅ {len(documents)}개 청크 로드 완료: {subdirectory}")
         return documents
     
+    def _read_files(self, paths: List[str]) -> List[Optional[str]]:
+        """파일들을 스레드 풀로 읽기 (paths 순서 유지, 실패한 파일은 None)"""
+        if not paths:
+            return []
+        if KB_READAHEAD:
+            self._prefetch(paths)
+        with ThreadPoolExecutor(max_workers=min(MAX_READ_WORKERS, len(paths))) as executor:
+            return list(executor.map(self._read_file, paths))
+    
+    @staticmethod
+    def _prefetch(paths: List[str]):
+        """POSIX_FADV_WILLNEED로 파일 전체를 비동기 readahead 요청 (디스크가 여러 읽기를 동시에 처리)"""
+        for filepath in paths:
+            try:
+                fd = os.open(filepath, os.O_RDONLY)
+                try:
+                    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+                finally:
+                    os.close(fd)
+            except OSError:
+                # 힌트일 뿐이므로 실패해도 일반 읽기로 진행
+                pass
+    
+    @staticmethod
+    def _read_file(filepath: str) -> Optional[str]:
+        """UTF-8 파일 읽기 (바이너리로 읽어 줄바꿈 변환 생략)"""
+        try:
+            with open(filepath, 'rb') as f:
+                return f.read().decode('utf-8')
+        except Exception as e:
+            logger.error(f"❌ 파일 로드 실패 ({os.path.basename(filepath)}): {e}")
+            return None
+    
     def load_all(self) -> Dict[str, List[Dict]]:
         """
         모든 카테고리 문서 로드
@@ -87,12 +148,23 @@ class DocumentLoader:
         return all_documents
     
     def get_statistics(self) -> Dict:
-        """통계 정보"""
-        all_docs = self.load_all()
+        """통계 정보 (파일 내용을 읽지 않고 .md 파일 수만 셈)"""
+        counts = {
+            category: self._count_markdown(category)
+            for category in ("products", "manuals", "patterns")
+        }
         
         return {
-            "products": len(all_docs.get("products", [])),
-            "manuals": len(all_docs.get("manuals", [])),
-            "patterns": len(all_docs.get("patterns", [])),
-            "total": sum(len(docs) for docs in all_docs.values())
+            "products": counts["products"],
+            "manuals": counts["manuals"],
+            "patterns": counts["patterns"],
+            "total": sum(counts.values())
         }
+    
+    def _count_markdown(self, subdirectory: str) -> int:
+        """디렉토리의 마크다운 파일 수 (디렉토리가 없으면 0)"""
+        try:
+            with os.scandir(os.path.join(self.base_path, subdirectory)) as entries:
+                return sum(1 for entry in entries if entry.name.endswith('.md') and entry.is_file())
+        except FileNotFoundError:
+            return 0
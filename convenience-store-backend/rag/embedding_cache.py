@@ -0,0 +1,164 @@
+"""
+임베딩 캐시 - 같은 텍스트를 다시 임베딩하지 않도록 디스크(SQLite) + 메모리(LRU)에 보관
+키는 sha256("모델명|텍스트")이며 값은 float32 벡터 바이트입니다.
+"""
+import os
+import hashlib
+import sqlite3
+import threading
+import logging
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from langchain.schema.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+# SQLite 한 쿼리당 바인딩 변수 수 제한(999) 이하로 나누어 조회
+_SQLITE_BATCH = 500
+
+
+class EmbeddingCache:
+    """SHA-256 키 기반 임베딩 캐시 (프로세스 메모리 LRU → SQLite 순으로 조회)"""
+    
+    def __init__(self, path: Optional[str] = None, memory_size: int = 4096):
+        """
+        Args:
+            path: SQLite 파일 경로 (기본: EMBEDDING_CACHE_PATH 또는 ./emb_cache/embeddings.db)
+            memory_size: 메모리에 보관할 최근 벡터 수
+        """
+        self.path = path or os.getenv("EMBEDDING_CACHE_PATH", "./emb_cache/embeddings.db")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+        
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.memory_size = memory_size
+    
+    @staticmethod
+    def make_key(model_name: str, text: str) -> str:
+        """캐시 키 생성"""
+        return hashlib.sha256(f"{model_name}|{text}".encode("utf-8")).hexdigest()
+    
+    def _remember(self, key: str, vector: np.ndarray):
+        """메모리 LRU에 저장 (가장 오래 안 쓴 항목부터 제거)"""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+    
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """캐시에 있는 키만 {key: vector}로 반환"""
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            missing = []
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is None:
+                    missing.append(key)
+                else:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+            
+            for i in range(0, len(missing), _SQLITE_BATCH):
+                batch = missing[i:i + _SQLITE_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    self._remember(key, vector)
+                    found[key] = vector
+        return found
+    
+    def put_many(self, items: Dict[str, np.ndarray]):
+        """벡터 저장 (이미 있으면 덮어씀)"""
+        if not items:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items.items()]
+            )
+            self._conn.commit()
+            for key, vector in items.items():
+                self._remember(key, np.asarray(vector, dtype=np.float32))
+    
+    def encode(
+        self,
+        model_name: str,
+        texts: List[str],
+        encode_fn: Callable[[List[str]], np.ndarray]
+    ) -> np.ndarray:
+        """
+        캐시를 거쳐 임베딩 (캐시에 없는 텍스트만 encode_fn으로 한 번에 계산)
+        
+        Args:
+            model_name: 모델 식별자 (모델/정규화 방식이 다르면 다른 이름 사용)
+            texts: 임베딩할 텍스트 목록
+            encode_fn: 텍스트 목록 → (N, D) 행렬
+        
+        Returns:
+            texts 순서대로 쌓은 (N, D) float32 행렬
+        """
+        keys = [self.make_key(model_name, text) for text in texts]
+        found = self.get_many(keys)
+        
+        # 캐시 미스 (같은 텍스트가 여러 번 있으면 한 번만 계산)
+        misses: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in misses:
+                misses[key] = text
+        
+        if misses:
+            vectors = np.asarray(encode_fn(list(misses.values())), dtype=np.float32)
+            computed = dict(zip(misses.keys(), vectors))
+            self.put_many(computed)
+            found.update(computed)
+        
+        logger.debug(f"임베딩 캐시: {len(texts) - len(misses)}/{len(texts)} 적중 ({model_name})")
+        return np.stack([found[key] for key in keys]) if keys else np.empty((0, 0), dtype=np.float32)
+
+
+class CachedEmbeddings(Embeddings):
+    """LangChain Embeddings 래퍼 - 문서/쿼리 임베딩을 EmbeddingCache로 캐시"""
+    
+    def __init__(self, embeddings: Embeddings, model_name: str, cache: Optional["EmbeddingCache"] = None):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache = cache or get_embedding_cache()
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.cache.encode(
+            self.model_name, texts,
+            lambda misses: np.asarray(self.embeddings.embed_documents(misses), dtype=np.float32)
+        ).tolist()
+    
+    def embed_query(self, text: str) -> List[float]:
+        return self.cache.encode(
+            self.model_name, [text],
+            lambda misses: np.asarray([self.embeddings.embed_query(t) for t in misses], dtype=np.float32)
+        )[0].tolist()
+
+
+# 전역 임베딩 캐시 인스턴스
+_cache_instance: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """임베딩 캐시 싱글톤"""
+    global _cache_instance
+    if _cache_instance is None:
+        with _cache_lock:
+            if _cache_instance is None:
+                _cache_instance = EmbeddingCache()
+    return _cache_instance
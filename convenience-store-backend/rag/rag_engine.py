@@ -2,14 +2,88 @@
 RAG 엔진 - 통합 검색 및 컨텍스트 생성
 """
 import os
-from typing import List, Dict, Optional
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple
 import logging
 
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:  # numba 미설치 시 numpy 선택 루프 사용
+    njit = None
+
 from .vector_store import VectorStore
 from .document_loader import DocumentLoader
 
 logger = logging.getLogger(__name__)
 
+# MMR 재정렬용 후보 배수 (n_results * 배수만큼 가져와서 n_results개 선택)
+MMR_FETCH_MULTIPLIER = 4
+# MMR 관련성/다양성 가중치 (1이면 유사도 순, 0이면 다양성만)
+MMR_LAMBDA = 0.5
+
+# 의미 기반 검색 캐시: 최근 질문 수, 같은 질문으로 볼 코사인 유사도 기준
+SEMANTIC_CACHE_SIZE = 512
+SEMANTIC_CACHE_THRESHOLD = 0.95
+
+# 이미 선택한 후보의 점수 (fastmath는 inf를 가정하지 않으므로 유한한 값 사용)
+_MMR_EXCLUDED = -1e30
+
+
+def _mmr_select_numpy(sim_q: np.ndarray, sim_dd: np.ndarray, k: int, lambda_: float) -> np.ndarray:
+    """MMR 선택 루프 (numpy) - 이미 고른 문서와의 최대 유사도만 np.maximum으로 갱신"""
+    n = sim_q.shape[0]
+    selected = np.empty(k, dtype=np.int64)
+    available = np.ones(n, dtype=bool)
+    
+    chosen = int(np.argmax(sim_q))
+    best_sim = sim_dd[:, chosen].copy()
+    selected[0] = chosen
+    available[chosen] = False
+    
+    for step in range(1, k):
+        scores = lambda_ * sim_q - (1 - lambda_) * best_sim
+        scores[~available] = _MMR_EXCLUDED
+        chosen = int(np.argmax(scores))
+        selected[step] = chosen
+        available[chosen] = False
+        np.maximum(best_sim, sim_dd[:, chosen], out=best_sim)
+    
+    return selected
+
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _mmr_select(sim_q, sim_dd, k, lambda_):
+        """MMR 선택 루프 (numba) - 점수 계산과 최대 유사도 갱신을 후보별로 병렬 처리"""
+        n = sim_q.shape[0]
+        selected = np.empty(k, dtype=np.int64)
+        available = np.ones(n, dtype=np.bool_)
+        best_sim = np.empty(n, dtype=np.float32)
+        scores = np.empty(n, dtype=np.float32)
+        
+        chosen = np.argmax(sim_q)
+        for step in range(k):
+            if step > 0:
+                for j in prange(n):
+                    if available[j]:
+                        scores[j] = lambda_ * sim_q[j] - (1 - lambda_) * best_sim[j]
+                    else:
+                        scores[j] = _MMR_EXCLUDED
+                chosen = np.argmax(scores)
+            
+            selected[step] = chosen
+            available[chosen] = False
+            for j in prange(n):
+                if step == 0 or sim_dd[j, chosen] > best_sim[j]:
+                    best_sim[j] = sim_dd[j, chosen]
+        
+        return selected
+else:
+    _mmr_select = _mmr_select_numpy
+
 
 class RAGEngine:
     """RAG 통합 엔진"""
@@ -27,48 +101,101 @@ class RAGEngine:
         self.vector_store = VectorStore(persist_directory=chromadb_path)
         self.document_loader = DocumentLoader(base_path=knowledge_base_path)
         
+        # 의미 기반 검색 캐시 {(질문, n_results): (질문 임베딩, 결과)} - 표현만 조금 다른 질문은 재검색 생략
+        self._semantic_cache: "OrderedDict[Tuple[str, int], Tuple[np.ndarray, Dict]]" = OrderedDict()
+        self._semantic_lock = threading.Lock()
+        
+        # 임베딩 모델/거리 척도가 바뀌었으면 지식 베이스 재구축 (Chroma는 거리 척도 변경 불가)
+        if self.vector_store.needs_rebuild("convenience_store_kb"):
+            logger.info("🔄 임베딩 모델/거리 척도 변경 감지 → 지식 베이스 재구축")
+            self.initialize_knowledge_base(reset=True)
+        
+        # Chroma에 저장된 임베딩으로 FAISS 검색 인덱스 복원
+        self.vector_store.load_index("convenience_store_kb")
+        
         logger.info("✅ RAG 엔진 초기화 완료")
     
-    def initialize_knowledge_base(self, reset: bool = False):
+    def initialize_knowledge_base(self, reset: bool = False) -> Dict:
         """
         지식 베이스 초기화 (문서 → 벡터 DB)
         
+        reset=False면 파일 내용 해시(file_hash)를 비교해 바뀌거나 새로 생긴 파일만 임베딩하고,
+        바뀌거나 삭제된 파일의 기존 청크는 지웁니다.
+        
         Args:
             reset: True면 기존 데이터 삭제 후 재생성
+        
+        Returns:
+            {"added": 추가한 청크 수, "deleted": 삭제한 청크 수, "skipped_files": 변경 없는 파일 수, "batches": add 배치 수}
         """
         logger.info("📚 지식 베이스 초기화 시작...")
         
+        # 문서가 바뀌므로 이전 검색 결과는 버림
+        with self._semantic_lock:
+            self._semantic_cache.clear()
+        
         if reset:
             logger.info("🗑️ 기존 컬렉션 삭제...")
             self.vector_store.delete_collection("convenience_store_kb")
         
         # 모든 문서 로드
         all_documents = self.document_loader.load_all()
+        current_hashes = {
+            doc["metadata"]["path"]: doc["metadata"]["file_hash"]
+            for docs in all_documents.values()
+            for doc in docs
+        }
         
-        # 벡터 DB에 추가
+        # 이미 인덱싱된 파일 해시 (해시가 없는 이전 버전 청크는 바뀐 것으로 취급)
+        existing = self.vector_store.get_metadatas("convenience_store_kb")
+        indexed_hashes = {}
+        stale_ids = []
+        for chunk_id, metadata in zip(existing["ids"], existing["metadatas"]):
+            path = metadata.get("path")
+            file_hash = metadata.get("file_hash")
+            if file_hash is not None and current_hashes.get(path) == file_hash:
+                indexed_hashes[path] = file_hash
+            else:
+                stale_ids.append(chunk_id)
+        
+        self.vector_store.delete_documents("convenience_store_kb", stale_ids)
+        
+        # 벡터 DB에 추가 (바뀐 파일만, id는 파일 경로 + 청크 순번)
         documents = []
         metadatas = []
         ids = []
         
-        doc_id = 0
         for category, docs in all_documents.items():
             for doc in docs:
+                metadata = doc["metadata"]
+                if indexed_hashes.get(metadata["path"]) == metadata["file_hash"]:
+                    continue
                 documents.append(doc["content"])
-                metadatas.append(doc["metadata"])
-                ids.append(f"{category}_{doc_id}")
-                doc_id += 1
+                metadatas.append(metadata)
+                ids.append(f"{category}/{metadata['source']}#{metadata['chunk']}")
         
+        skipped = len(indexed_hashes)
+        batches = 0
         if documents:
-            self.vector_store.add_documents(
+            batches = self.vector_store.add_documents(
                 collection_name="convenience_store_kb",
                 documents=documents,
                 metadatas=metadatas,
                 ids=ids
             )
             
-            logger.info(f"✅ {len(documents)}개 문서 인덱싱 완료")
+            logger.info(f"✅ {len(documents)}개 문서 인덱싱 완료 (변경 없는 파일 {skipped}개 건너뜀)")
+        elif skipped:
+            logger.info(f"✅ 변경된 문서 없음 ({skipped}개 파일 최신 상태)")
         else:
             logger.warning("⚠️ 로드된 문서가 없습니다")
+        
+        return {
+            "added": len(documents),
+            "deleted": len(stale_ids),
+            "skipped_files": skipped,
+            "batches": batches
+        }
     
     def search(self, query: str, n_results: int = 3) -> Dict:
         """
@@ -85,11 +212,49 @@ class RAGEngine:
                 "num_sources": 2
             }
         """
-        # 벡터 검색
+        # 비슷한 질문을 최근에 검색했으면 그 결과 사용
+        query_emb = self.vector_store.embed_query(query)
+        cached = self._semantic_lookup(query_emb, n_results)
+        if cached is not None:
+            return cached
+        
+        result = self._search(query, query_emb, n_results)
+        self._semantic_store(query, query_emb, n_results, result)
+        return result
+    
+    def _semantic_lookup(self, query_emb: np.ndarray, n_results: int) -> Optional[Dict]:
+        """캐시된 질문 중 코사인 유사도가 기준 이상인 가장 가까운 질문의 결과 (없으면 None)"""
+        with self._semantic_lock:
+            keys = [key for key in self._semantic_cache if key[1] == n_results]
+            if not keys:
+                return None
+            
+            # 정규화 임베딩이므로 행렬-벡터 곱 한 번이 곧 코사인 유사도
+            cached_embs = np.stack([self._semantic_cache[key][0] for key in keys])
+            similarities = cached_embs @ query_emb
+            best = int(np.argmax(similarities))
+            if similarities[best] < SEMANTIC_CACHE_THRESHOLD:
+                return None
+            
+            self._semantic_cache.move_to_end(keys[best])
+            return self._semantic_cache[keys[best]][1]
+    
+    def _semantic_store(self, query: str, query_emb: np.ndarray, n_results: int, result: Dict):
+        """검색 결과 저장 (가장 오래 안 쓴 항목부터 제거)"""
+        with self._semantic_lock:
+            self._semantic_cache[(query, n_results)] = (query_emb, result)
+            self._semantic_cache.move_to_end((query, n_results))
+            if len(self._semantic_cache) > SEMANTIC_CACHE_SIZE:
+                self._semantic_cache.popitem(last=False)
+    
+    def _search(self, query: str, query_emb: np.ndarray, n_results: int) -> Dict:
+        """벡터 검색 + MMR 재정렬 + 컨텍스트 생성"""
+        # 벡터 검색 (MMR 재정렬을 위해 후보를 넉넉히)
         results = self.vector_store.search(
             collection_name="convenience_store_kb",
             query=query,
-            n_results=n_results
+            n_results=n_results * MMR_FETCH_MULTIPLIER,
+            include_embeddings=True
         )
         
         # 결과 포맷팅
@@ -104,7 +269,20 @@ class RAGEngine:
         context_parts = []
         sources = []
         
-        for i, doc in enumerate(results["documents"][0]):
+        # 같은 파일의 비슷한 청크가 자리를 차지하지 않도록 MMR로 n_results개 선택
+        documents = results["documents"][0]
+        embeddings = results.get("embeddings")
+        if embeddings is not None and len(documents) > n_results:
+            selected = self._mmr(
+                query_emb,
+                np.asarray(embeddings[0], dtype=np.float32),
+                n_results
+            )
+        else:
+            selected = range(min(n_results, len(documents)))
+        
+        for i in selected:
+            doc = documents[i]
             metadata = results["metadatas"][0][i]
             source = metadata.get("source", "unknown")
             
@@ -119,6 +297,34 @@ class RAGEngine:
             "num_sources": len(sources)
         }
     
+    @staticmethod
+    def _mmr(
+        query_emb: np.ndarray,
+        cand_embs: np.ndarray,
+        k: int,
+        lambda_: float = MMR_LAMBDA
+    ) -> List[int]:
+        """
+        MMR(Maximal Marginal Relevance) 선택 - 정규화 임베딩 기준
+        
+        유사도 행렬은 행렬곱 두 번으로 미리 계산하고, 선택 루프는 _mmr_select
+        (numba가 있으면 JIT 컴파일 버전)에서 수행합니다.
+        
+        Returns:
+            선택된 후보 인덱스 (선택 순서)
+        """
+        n = len(cand_embs)
+        k = min(k, n)
+        if k <= 0:
+            return []
+        
+        cand_embs = np.ascontiguousarray(cand_embs, dtype=np.float32)
+        query_emb = np.asarray(query_emb, dtype=np.float32)
+        sim_to_query = cand_embs @ query_emb
+        sim_doc = cand_embs @ cand_embs.T
+        
+        return _mmr_select(sim_to_query, sim_doc, k, lambda_).tolist()
+    
     def search_products(self, query: str, n_results: int = 3) -> str:
         """상품 정보 검색"""
         result = self.search(query, n_results)
@@ -147,11 +353,15 @@ class RAGEngine:
 
 # 전역 RAG 인스턴스
 _rag_instance: Optional[RAGEngine] = None
+_rag_lock = threading.Lock()
 
 
 def get_rag_engine() -> RAGEngine:
     """RAG 엔진 싱글톤"""
     global _rag_instance
     if _rag_instance is None:
-        _rag_instance = RAGEngine()
+        # 여러 스레드가 동시에 처음 호출해도 모델은 한 번만 로드
+        with _rag_lock:
+            if _rag_instance is None:
+                _rag_instance = RAGEngine()
     return _rag_instance
@@ -3,20 +3,183 @@ RAG (Retrieval-Augmented Generation) 시스템
 ChromaDB를 사용한 벡터 스토어 및 임베딩 관리
 """
 import os
-from typing import List, Dict, Any, Optional
+import hashlib
+import threading
+from itertools import islice
+from typing import Callable, Iterable, List, Dict, Any, Optional
 from dotenv import load_dotenv
 import logging
 from datetime import datetime, timedelta
 
 from langchain_openai import OpenAIEmbeddings
+from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import Chroma
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document
 
+from .config import EMBEDDING_BACKEND, MINILM_MODEL_NAME
+from .embedding_cache import CachedEmbeddings
+
 load_dotenv()
 logger = logging.getLogger(__name__)
 
 
+# 관리하는 컬렉션 (처음 사용할 때 Chroma를 생성)
+COLLECTIONS = ("sales_patterns", "inventory_history", "order_history", "weather_patterns")
+
+# 인덱싱 배치 크기 - 입력 행을 이만큼씩 읽어 배치마다 임베딩을 한 번에 계산해 벡터 스토어에 추가
+INDEX_BATCH_SIZE = 128
+
+# bulk_index에서 Chroma upsert 한 번에 넘길 최대 문서 수 (Chroma의 최대 배치 크기 이하)
+BULK_UPSERT_BATCH = 5000
+
+
+def _doc_id(prefix: str, *parts: Any) -> str:
+    """행 내용 기반의 결정적 문서 ID (재업로드 시 중복 대신 upsert)"""
+    key = "|".join(str(part) for part in parts)
+    return f"{prefix}:{hashlib.md5(key.encode('utf-8')).hexdigest()}"
+
+
+class _SafeDict(dict):
+    """format_map용 dict - 없는 키는 'N/A'로 채움"""
+    
+    def __missing__(self, key: str) -> str:
+        return "N/A"
+
+
+# 인덱싱 문서 본문 템플릿 (행마다 format_map으로 채움)
+_SALES_FMT = """
+상품명: {product_name}
+판매량: {quantity_sold}개
+판매일: {sale_date}
+요일: {day_of_week}
+가격: {price}원
+"""
+
+_INV_FMT = """
+상품명: {product_name}
+카테고리: {category}
+재고량: {quantity}개
+단가: {price}원
+유통기한: {expiry_date}
+"""
+
+_ORDER_FMT = """
+상품명: {product_name}
+발주량: {quantity_ordered}개
+발주일: {order_date}
+배송일: {delivery_date}
+총 비용: {price}원
+상태: {status}
+"""
+
+
+def _round_price(price: Any) -> int:
+    """가격을 100원 단위로 반올림 (원 단위 차이로 같은 내용이 다른 문서가 되지 않도록)"""
+    return int(round(float(price or 0), -2))
+
+
+def _dedupe(documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    내용이 같은 문서는 첫 문서 하나만 남기고 metadata["count"]에 합친 행 수를 기록
+    (같은 내용을 여러 번 임베딩/저장하지 않음)
+    """
+    unique: Dict[str, Dict[str, Any]] = {}
+    for doc in documents:
+        key = hashlib.sha1(doc["content"].encode("utf-8")).hexdigest()
+        kept = unique.get(key)
+        if kept is None:
+            doc["metadata"]["count"] = 1
+            unique[key] = doc
+        else:
+            kept["metadata"]["count"] += 1
+    
+    if len(unique) < len(documents):
+        logger.info(f"중복 문서 {len(documents) - len(unique)}개 제외 ({len(documents)} → {len(unique)})")
+    return list(unique.values())
+
+
+def _last_by_id(documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    ID가 같은 문서는 마지막 문서만 남김 (DB의 ON DUPLICATE KEY처럼 나중 행이 우선)
+    
+    한 번의 upsert에 같은 ID가 두 번 들어가면 Chroma가 호출 전체를 거부하므로,
+    같은 상품이 여러 행에 나오는 재고 CSV 등은 여기서 먼저 합칩니다.
+    """
+    latest: Dict[str, Dict[str, Any]] = {}
+    for doc in documents:
+        # 순서를 마지막 등장 위치로 옮기기 위해 지우고 다시 넣음
+        latest.pop(doc["id"], None)
+        latest[doc["id"]] = doc
+    return list(latest.values())
+
+
+def _sales_doc(sale: Dict[str, Any]) -> Dict[str, Any]:
+    """판매 행 → 인덱싱 문서 (증분 upsert)"""
+    return {
+        "id": _doc_id(
+            "sales", sale['product_name'], sale['sale_date'], sale.get('sale_time', ''),
+            sale['quantity_sold'], sale.get('sale_price', 0)
+        ),
+        "content": _SALES_FMT.format_map(
+            _SafeDict(sale, price=_round_price(sale.get('sale_price', 0)))
+        ),
+        "metadata": {
+            "product_name": sale['product_name'],
+            "sale_date": str(sale['sale_date']),
+            "quantity": sale['quantity_sold'],
+            "type": "sales"
+        }
+    }
+
+
+def _inventory_doc(item: Dict[str, Any]) -> Dict[str, Any]:
+    """재고 행 → 인덱싱 문서 (상품별 최신 재고 스냅샷 하나만 유지)"""
+    return {
+        "id": _doc_id("inventory", item['product_name']),
+        "content": _INV_FMT.format_map(
+            _SafeDict(item, price=_round_price(item.get('unit_price', 0)))
+        ),
+        "metadata": {
+            "product_name": item['product_name'],
+            "category": item.get('category', ''),
+            "quantity": item['quantity'],
+            "type": "inventory"
+        }
+    }
+
+
+def _order_doc(order: Dict[str, Any]) -> Dict[str, Any]:
+    """발주 행 → 인덱싱 문서"""
+    return {
+        "id": _doc_id(
+            "order", order.get('id', ''), order['product_name'], order['order_date'],
+            order['quantity_ordered']
+        ),
+        "content": _ORDER_FMT.format_map(
+            _SafeDict(
+                order,
+                price=_round_price(order.get('total_cost', 0)),
+                status=order.get('status', 'pending')
+            )
+        ),
+        "metadata": {
+            "product_name": order['product_name'],
+            "order_date": str(order['order_date']),
+            "quantity": order['quantity_ordered'],
+            "type": "order"
+        }
+    }
+
+
+# 컬렉션 → 행을 문서로 바꾸는 함수 (bulk_index에서 사용)
+_DOC_BUILDERS: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    "sales_patterns": _sales_doc,
+    "inventory_history": _inventory_doc,
+    "order_history": _order_doc,
+}
+
+
 class RAGManager:
     """RAG 시스템 관리자"""
     
@@ -24,50 +187,100 @@ class RAGManager:
         self.vector_store_path = os.getenv("VECTOR_STORE_PATH", "./vector_store")
         self.embedding_model = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
         
-        # OpenAI 임베딩 초기화
-        self.embeddings = OpenAIEmbeddings(
-            model=self.embedding_model,
-            openai_api_key=os.getenv("OPENAI_API_KEY")
-        )
+        # 임베딩 초기화 (같은 문서/쿼리는 다시 계산하지 않고 캐시에서 반환)
+        device = _rag_config["device"]
+        embed_batch_size = _rag_config["embed_batch_size"]
+        if EMBEDDING_BACKEND == "minilm":
+            # 로컬 모델 - API 호출 없이 384차원 임베딩 (device 미지정 시 GPU가 있으면 자동 사용)
+            self.embeddings = CachedEmbeddings(
+                HuggingFaceEmbeddings(
+                    model_name=MINILM_MODEL_NAME,
+                    model_kwargs={"device": device} if device else {},
+                    encode_kwargs={"normalize_embeddings": True, "batch_size": embed_batch_size or 64}
+                ),
+                model_name=f"hf:{MINILM_MODEL_NAME}:normalized"
+            )
+        else:
+            # embed_batch_size는 API 요청 하나에 담을 텍스트 수 (미지정 시 라이브러리 기본값)
+            openai_kwargs = {"chunk_size": embed_batch_size} if embed_batch_size else {}
+            self.embeddings = CachedEmbeddings(
+                OpenAIEmbeddings(
+                    model=self.embedding_model,
+                    openai_api_key=os.getenv("OPENAI_API_KEY"),
+                    **openai_kwargs
+                ),
+                model_name=f"openai:{self.embedding_model}"
+            )
         
-        # 컬렉션별 벡터 스토어
+        # 컬렉션별 벡터 스토어 (_get에서 처음 사용할 때 생성)
+        self._collection_names = frozenset(COLLECTIONS)
         self.vector_stores: Dict[str, Chroma] = {}
-        self._initialize_vector_stores()
-    
-    def _initialize_vector_stores(self):
-        """벡터 스토어 초기화"""
-        collections = ["sales_patterns", "inventory_history", "order_history", "weather_patterns"]
+        self._stores_lock = threading.Lock()
         
-        for collection in collections:
-            try:
-                self.vector_stores[collection] = Chroma(
-                    collection_name=collection,
-                    embedding_function=self.embeddings,
-                    persist_directory=os.path.join(self.vector_store_path, collection)
-                )
-                logger.info(f"벡터 스토어 초기화 완료: {collection}")
-            except Exception as e:
-                logger.error(f"벡터 스토어 초기화 실패 ({collection}): {e}")
+        # 차원이 다른 임베딩이 섞이지 않도록 백엔드별로 별도 디렉토리 사용 (다음 인덱싱 때 채워짐)
+        self._store_suffix = "_minilm" if EMBEDDING_BACKEND == "minilm" else ""
     
-    def add_documents(self, collection: str, documents: List[Dict[str, Any]]):
-        """문서를 벡터 스토어에 추가"""
-        if collection not in self.vector_stores:
+    def _get(self, collection: str) -> Optional[Chroma]:
+        """컬렉션의 벡터 스토어 (처음 호출 시 생성, 없는 컬렉션이거나 생성 실패 시 None)"""
+        store = self.vector_stores.get(collection)
+        if store is not None:
+            return store
+        
+        if collection not in self._collection_names:
             logger.error(f"존재하지 않는 컬렉션: {collection}")
+            return None
+        
+        with self._stores_lock:
+            store = self.vector_stores.get(collection)
+            if store is None:
+                try:
+                    store = Chroma(
+                        collection_name=collection,
+                        embedding_function=self.embeddings,
+                        persist_directory=os.path.join(self.vector_store_path, collection + self._store_suffix)
+                    )
+                    self.vector_stores[collection] = store
+                    logger.info(f"벡터 스토어 초기화 완료: {collection}")
+                except Exception as e:
+                    logger.error(f"벡터 스토어 초기화 실패 ({collection}): {e}")
+        return store
+    
+    def add_documents(
+        self,
+        collection: str,
+        documents: List[Dict[str, Any]],
+        batch_size: int = INDEX_BATCH_SIZE
+    ):
+        """
+        문서를 벡터 스토어에 추가
+        
+        각 문서에 "id"가 있으면 해당 ID로 upsert하여 같은 행을 다시 인덱싱해도 중복되지 않습니다.
+        batch_size개씩 나누어 배치마다 임베딩을 한 번의 호출로 계산합니다 (문서마다 호출하지 않음).
+        """
+        store = self._get(collection)
+        if store is None:
             return
         
         try:
-            # Document 객체로 변환
-            docs = [
-                Document(
-                    page_content=doc["content"],
-                    metadata=doc.get("metadata", {})
-                )
-                for doc in documents
-            ]
-            
-            # 벡터 스토어에 추가
-            self.vector_stores[collection].add_documents(docs)
-            logger.info(f"{len(docs)}개 문서를 {collection}에 추가")
+            for start in range(0, len(documents), batch_size):
+                batch = documents[start:start + batch_size]
+                
+                # Document 객체로 변환
+                docs = [
+                    Document(
+                        page_content=doc["content"],
+                        metadata=doc.get("metadata", {})
+                    )
+                    for doc in batch
+                ]
+                
+                # 벡터 스토어에 추가 (id가 있으면 같은 id 문서를 덮어씀)
+                ids = [doc["id"] for doc in batch if doc.get("id")]
+                if len(ids) == len(docs):
+                    store.add_documents(docs, ids=ids)
+                else:
+                    store.add_documents(docs)
+            logger.info(f"{len(documents)}개 문서를 {collection}에 추가 (배치 {batch_size})")
         except Exception as e:
             logger.error(f"문서 추가 실패 ({collection}): {e}")
     
@@ -79,19 +292,19 @@ class RAGManager:
         filter_metadata: Optional[Dict] = None
     ) -> List[Document]:
         """유사한 문서 검색"""
-        if collection not in self.vector_stores:
-            logger.error(f"존재하지 않는 컬렉션: {collection}")
+        store = self._get(collection)
+        if store is None:
             return []
         
         try:
             if filter_metadata:
-                results = self.vector_stores[collection].similarity_search(
+                results = store.similarity_search(
                     query, 
                     k=k,
                     filter=filter_metadata
                 )
             else:
-                results = self.vector_stores[collection].similarity_search(query, k=k)
+                results = store.similarity_search(query, k=k)
             
             logger.info(f"{collection}에서 {len(results)}개 유사 문서 검색")
             return results
@@ -99,75 +312,105 @@ class RAGManager:
             logger.error(f"문서 검색 실패 ({collection}): {e}")
             return []
     
-    def index_sales_data(self, sales_data: List[Dict[str, Any]]):
-        """판매 데이터를 벡터 스토어에 인덱싱"""
-        documents = []
-        for sale in sales_data:
-            content = f"""
-상품명: {sale['product_name']}
-판매량: {sale['quantity_sold']}개
-판매일: {sale['sale_date']}
-요일: {sale.get('day_of_week', 'N/A')}
-가격: {sale.get('sale_price', 0)}원
-"""
-            documents.append({
-                "content": content,
-                "metadata": {
-                    "product_name": sale['product_name'],
-                    "sale_date": str(sale['sale_date']),
-                    "quantity": sale['quantity_sold'],
-                    "type": "sales"
-                }
-            })
-        
-        self.add_documents("sales_patterns", documents)
-    
-    def index_inventory_data(self, inventory_data: List[Dict[str, Any]]):
-        """재고 데이터를 벡터 스토어에 인덱싱"""
-        documents = []
-        for item in inventory_data:
-            content = f"""
-상품명: {item['product_name']}
-카테고리: {item.get('category', 'N/A')}
-재고량: {item['quantity']}개
-단가: {item.get('unit_price', 0)}원
-유통기한: {item.get('expiry_date', 'N/A')}
-"""
-            documents.append({
-                "content": content,
-                "metadata": {
-                    "product_name": item['product_name'],
-                    "category": item.get('category', ''),
-                    "quantity": item['quantity'],
-                    "type": "inventory"
-                }
-            })
-        
-        self.add_documents("inventory_history", documents)
-    
-    def index_order_data(self, order_data: List[Dict[str, Any]]):
-        """발주 데이터를 벡터 스토어에 인덱싱"""
-        documents = []
-        for order in order_data:
-            content = f"""
-상품명: {order['product_name']}
-발주량: {order['quantity_ordered']}개
-발주일: {order['order_date']}
-배송일: {order.get('delivery_date', 'N/A')}
-총 비용: {order.get('total_cost', 0)}원
-상태: {order.get('status', 'pending')}
-"""
-            documents.append({
-                "content": content,
-                "metadata": {
-                    "product_name": order['product_name'],
-                    "order_date": str(order['order_date']),
-                    "quantity": order['quantity_ordered'],
-                    "type": "order"
-                }
-            })
-        
-        self.add_documents("order_history", documents)
+    def _index_rows(
+        self,
+        collection: str,
+        rows: Iterable[Dict[str, Any]],
+        to_doc: Callable[[Dict[str, Any]], Dict[str, Any]],
+        batch_size: int
+    ) -> int:
+        """
+        행 이터레이터를 batch_size개씩 읽어 문서로 바꾼 뒤 배치마다 벡터 스토어에 추가
+        
+        리스트 전체를 먼저 만들지 않으므로 제너레이터/DB 커서를 넘기면 메모리는 배치 크기만큼만 씁니다.
+        같은 ID 정리(마지막 행 우선)와 중복 문서 제거는 배치 단위로 이루어집니다.
+        배치 사이의 같은 ID는 나중 upsert가 덮어씁니다. 인덱싱한 행 수를 반환합니다.
+        """
+        rows = iter(rows)
+        total = 0
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            documents = _dedupe(_last_by_id([to_doc(row) for row in batch]))
+            self.add_documents(collection, documents, batch_size=batch_size)
+            total += len(batch)
+        return total
+    
+    def index_sales_data(self, sales_data: Iterable[Dict[str, Any]], batch_size: int = INDEX_BATCH_SIZE) -> int:
+        """판매 데이터를 벡터 스토어에 인덱싱 (증분 upsert, 리스트/제너레이터 모두 가능)"""
+        return self._index_rows("sales_patterns", sales_data, _sales_doc, batch_size)
+    
+    def index_inventory_data(self, inventory_data: Iterable[Dict[str, Any]], batch_size: int = INDEX_BATCH_SIZE) -> int:
+        """재고 데이터를 벡터 스토어에 인덱싱 (상품별 upsert, 리스트/제너레이터 모두 가능)"""
+        return self._index_rows("inventory_history", inventory_data, _inventory_doc, batch_size)
+    
+    def index_order_data(self, order_data: Iterable[Dict[str, Any]], batch_size: int = INDEX_BATCH_SIZE) -> int:
+        """발주 데이터를 벡터 스토어에 인덱싱 (리스트/제너레이터 모두 가능)"""
+        return self._index_rows("order_history", order_data, _order_doc, batch_size)
+    
+    def bulk_index(
+        self,
+        rows_by_collection: Dict[str, Iterable[Dict[str, Any]]],
+        batch_size: int = INDEX_BATCH_SIZE
+    ) -> int:
+        """
+        여러 컬렉션의 행을 한 번에 인덱싱 (시드 등 대량 적재용)
+        
+        모든 컬렉션의 문서를 모아 본문 길이순으로 정렬한 뒤 batch_size개씩 임베딩하고
+        (길이가 비슷한 문서끼리 묶여 패딩 낭비가 적음), 계산한 임베딩을 컬렉션마다
+        Chroma에 직접 upsert합니다. 임베딩은 CachedEmbeddings를 거치므로 이미 계산한 문서는 다시 계산하지 않습니다.
+        
+        Args:
+            rows_by_collection: {컬렉션명: 행 dict 이터러블} (sales_patterns/inventory_history/order_history)
+            batch_size: 임베딩 배치 크기
+        
+        Returns:
+            인덱싱한 문서 수
+        """
+        # 컬렉션별 문서 생성 (같은 ID 정리와 중복 제거는 컬렉션 단위)
+        documents: List[tuple] = []
+        for collection, rows in rows_by_collection.items():
+            to_doc = _DOC_BUILDERS.get(collection)
+            if to_doc is None:
+                logger.error(f"일괄 인덱싱을 지원하지 않는 컬렉션: {collection}")
+                continue
+            documents.extend((collection, doc) for doc in _dedupe(_last_by_id([to_doc(row) for row in rows])))
+        if not documents:
+            return 0
+        
+        # 길이순으로 정렬해 배치마다 한 번에 임베딩
+        documents.sort(key=lambda item: len(item[1]["content"]))
+        embeddings: List[List[float]] = []
+        for start in range(0, len(documents), batch_size):
+            embeddings.extend(self.embeddings.embed_documents(
+                [doc["content"] for _, doc in documents[start:start + batch_size]]
+            ))
+        
+        # 컬렉션별로 모아 계산한 임베딩과 함께 upsert (Chroma가 다시 임베딩하지 않음)
+        grouped: Dict[str, List[tuple]] = {}
+        for (collection, doc), embedding in zip(documents, embeddings):
+            grouped.setdefault(collection, []).append((doc, embedding))
+        
+        indexed = 0
+        for collection, items in grouped.items():
+            store = self._get(collection)
+            if store is None:
+                continue
+            try:
+                for start in range(0, len(items), BULK_UPSERT_BATCH):
+                    batch = items[start:start + BULK_UPSERT_BATCH]
+                    store._collection.upsert(
+                        ids=[doc["id"] for doc, _ in batch],
+                        embeddings=[embedding for _, embedding in batch],
+                        documents=[doc["content"] for doc, _ in batch],
+                        metadatas=[doc["metadata"] for doc, _ in batch]
+                    )
+                indexed += len(items)
+                logger.info(f"{len(items)}개 문서를 {collection}에 일괄 추가")
+            except Exception as e:
+                logger.error(f"일괄 인덱싱 실패 ({collection}): {e}")
+        return indexed
     
     def get_relevant_sales_context(self, product_name: str, days: int = 30) -> str:
         """특정 상품의 관련 판매 컨텍스트 검색"""
@@ -177,11 +420,12 @@ class RAGManager:
         if not results:
             return "관련 판매 데이터가 없습니다."
         
-        context = f"{product_name}의 과거 판매 데이터:\n\n"
+        parts = [f"{product_name}의 과거 판매 데이터:\n\n"]
         for doc in results:
-            context += f"{doc.page_content}\n---\n"
+            parts.append(doc.page_content)
+            parts.append("\n---\n")
         
-        return context
+        return "".join(parts)
     
     def get_relevant_inventory_context(self, product_name: str) -> str:
         """특정 상품의 관련 재고 컨텍스트 검색"""
@@ -191,11 +435,12 @@ class RAGManager:
         if not results:
             return "관련 재고 데이터가 없습니다."
         
-        context = f"{product_name}의 재고 이력:\n\n"
+        parts = [f"{product_name}의 재고 이력:\n\n"]
         for doc in results:
-            context += f"{doc.page_content}\n---\n"
+            parts.append(doc.page_content)
+            parts.append("\n---\n")
         
-        return context
+        return "".join(parts)
     
     def get_similar_order_patterns(self, context: str) -> str:
         """유사한 발주 패턴 검색"""
@@ -204,20 +449,44 @@ class RAGManager:
         if not results:
             return "유사한 발주 이력이 없습니다."
         
-        patterns = "유사한 과거 발주 사례:\n\n"
+        parts = ["유사한 과거 발주 사례:\n\n"]
         for doc in results:
-            patterns += f"{doc.page_content}\n---\n"
+            parts.append(doc.page_content)
+            parts.append("\n---\n")
         
-        return patterns
+        return "".join(parts)
 
 
 # 전역 RAG 인스턴스
 _rag_instance: Optional[RAGManager] = None
+_rag_lock = threading.Lock()
 
 
 def get_rag() -> RAGManager:
     """RAG 인스턴스 싱글톤"""
     global _rag_instance
     if _rag_instance is None:
-        _rag_instance = RAGManager()
+        # 여러 스레드가 동시에 처음 호출해도 모델은 한 번만 로드
+        with _rag_lock:
+            if _rag_instance is None:
+                _rag_instance = RAGManager()
     return _rag_instance
+
+
+# 임베딩 실행 설정 (get_rag() 전에 configure()로 변경)
+_rag_config: Dict[str, Any] = {"device": None, "embed_batch_size": None}
+
+
+def configure(device: Optional[str] = None, embed_batch_size: Optional[int] = None):
+    """
+    RAGManager 임베딩 설정 (첫 get_rag() 호출 전에 한 번 호출)
+    
+    Args:
+        device: 로컬 모델 실행 장치 ("cuda", "cpu" 등, 없으면 GPU가 있을 때 자동 사용)
+        embed_batch_size: 임베딩 한 번에 처리할 텍스트 수 (로컬 모델 배치 / OpenAI 요청당 텍스트 수)
+    """
+    if _rag_instance is not None:
+        logger.warning("RAGManager가 이미 생성되어 임베딩 설정이 적용되지 않습니다")
+        return
+    _rag_config["device"] = device
+    _rag_config["embed_batch_size"] = embed_batch_size
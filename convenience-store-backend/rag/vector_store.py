@@ -1,14 +1,45 @@
 """
 Chroma DB 벡터 스토어 관리
+Chroma는 원본 저장소로만 쓰고, 검색은 Chroma에 저장된 임베딩으로 만든 FAISS 인덱스에서 수행합니다.
 """
 import os
+import threading
 from typing import List, Dict, Optional
 import chromadb
+import numpy as np
+import torch
 from sentence_transformers import SentenceTransformer
 import logging
 
+from .config import EMBEDDING_MODEL_NAME, EMBEDDING_DIM
+from .embedding_cache import get_embedding_cache
+
+try:
+    import faiss
+except ImportError:  # faiss 미설치 시 Chroma 검색 사용
+    faiss = None
+
 logger = logging.getLogger(__name__)
 
+# 임베딩 배치 크기 (문서 전체를 한 번의 encode 호출로 처리)
+# GPU(fp16)는 배치가 커야 연산 유닛을 채우므로 더 크게
+ENCODE_BATCH_SIZE = 64
+GPU_ENCODE_BATCH_SIZE = 256
+
+# 이 개수 이상을 한 번에 임베딩하면 진행률 표시 (지식 베이스 전체 인덱싱 등)
+PROGRESS_BAR_MIN_TEXTS = 1000
+
+# Chroma에 한 번에 add하는 문서 수 (SQLite 트랜잭션/HNSW 갱신을 묶어서 처리)
+ADD_BATCH_SIZE = 200
+
+# 벡터 수가 이 값 이상이면 정확 검색(IndexFlatIP) 대신 HNSW 근사 검색 사용
+HNSW_THRESHOLD = 50000
+HNSW_M = 32
+
+# FAISS 인덱스 벡터를 int8로 양자화해 저장 (메모리 1/4, 재정렬 없이 근사 점수)
+# fp32 원본 행렬은 캐시 엔트리에 그대로 보관하므로 인덱스 재빌드 시 정밀도 손실이 누적되지 않음
+FAISS_INT8 = os.getenv("FAISS_INT8", "false").lower() == "true"
+
 
 class VectorStore:
     """ChromaDB 벡터 스토어"""
@@ -26,10 +57,21 @@ class VectorStore:
         # ChromaDB 클라이언트 초기화 (PersistentClient 사용)
         self.client = chromadb.PersistentClient(path=persist_directory)
         
-        # 임베딩 모델 (한국어 지원)
-        self.embedding_model = SentenceTransformer('jhgan/ko-sroberta-multitask')
+        # 임베딩 모델 (한국어 지원, EMBEDDING_BACKEND로 선택) - GPU가 있으면 fp16으로 올림
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME, device=self.device)
+        if self.device == "cuda":
+            self.embedding_model.half()
+        self.encode_batch_size = GPU_ENCODE_BATCH_SIZE if self.device == "cuda" else ENCODE_BATCH_SIZE
+        # 정규화 여부까지 캐시 키에 포함
+        self.cache_model_name = f"{EMBEDDING_MODEL_NAME}:normalized"
+        self.embedding_cache = get_embedding_cache()
+        
+        # 컬렉션별 FAISS 인덱스 {name: {"index", "ids", "documents", "metadatas"}}
+        self._faiss: Dict[str, Dict] = {}
+        self._faiss_lock = threading.Lock()
         
-        logger.info(f"✅ VectorStore 초기화: {persist_directory}")
+        logger.info(f"✅ VectorStore 초기화: {persist_directory} (device={self.device})")
 
     
     def get_or_create_collection(self, name: str):
@@ -38,58 +80,273 @@ class VectorStore:
             collection = self.client.get_collection(name)
             logger.info(f"📚 기존 컬렉션 로드: {name}")
         except:
-            collection = self.client.create_collection(name)
+            # 어떤 모델로 임베딩했는지 기록 (모델이 바뀌면 재구축)
+            # 정규화 벡터만 저장하므로 내적(ip)이 곧 코사인 유사도
+            collection = self.client.create_collection(
+                name, metadata={"embedding_model": EMBEDDING_MODEL_NAME, "hnsw:space": "ip"}
+            )
             logger.info(f"📚 새 컬렉션 생성: {name}")
         
         return collection
     
+    def needs_rebuild(self, collection_name: str) -> bool:
+        """컬렉션이 현재 임베딩 모델/거리 척도(ip)와 다르게 만들어졌는지 확인"""
+        try:
+            collection = self.client.get_collection(collection_name)
+        except:
+            return False
+        
+        # 메타데이터가 없는 기존 컬렉션은 기본 모델 + l2 거리로 만든 것
+        metadata = collection.metadata or {}
+        stored_model = metadata.get("embedding_model", "jhgan/ko-sroberta-multitask")
+        return stored_model != EMBEDDING_MODEL_NAME or metadata.get("hnsw:space", "l2") != "ip"
+    
     def add_documents(
         self, 
         collection_name: str, 
         documents: List[str], 
         metadatas: List[Dict],
         ids: List[str]
-    ):
-        """문서 추가"""
+    ) -> int:
+        """
+        문서 추가 (임베딩은 전체를 한 번에 계산, Chroma에는 ADD_BATCH_SIZE개씩 저장)
+        
+        Returns:
+            Chroma add 호출(배치) 수
+        """
         collection = self.get_or_create_collection(collection_name)
         
-        # 임베딩 생성
-        embeddings = self.embedding_model.encode(documents).tolist()
+        # 임베딩 생성 (전체 청크를 한 번에 배치 인코딩, 정규화된 float32)
+        # 미리 계산한 임베딩을 넘기므로 Chroma는 자체 임베딩 함수를 실행하지 않음
+        embeddings = self._encode(documents)
         
-        # 문서 추가
-        collection.add(
-            embeddings=embeddings,
-            documents=documents,
-            metadatas=metadatas,
-            ids=ids
-        )
+        # 문서 추가 (chromadb 0.4.x는 리스트만 받으므로 Chroma에 넘길 때만 배치별로 변환)
+        batches = 0
+        for start in range(0, len(documents), ADD_BATCH_SIZE):
+            end = start + ADD_BATCH_SIZE
+            collection.add(
+                embeddings=embeddings[start:end].tolist(),
+                documents=documents[start:end],
+                metadatas=metadatas[start:end],
+                ids=ids[start:end]
+            )
+            batches += 1
         
-        logger.info(f"✅ {len(documents)}개 문서 추가 → {collection_name}")
+        # 이미 빌드된 FAISS 인덱스에는 계산한 행렬을 그대로 추가 (Chroma에서 다시 읽지 않음)
+        self._append_to_index(collection_name, ids, documents, metadatas, embeddings)
+        
+        logger.info(f"✅ {len(documents)}개 문서 추가 → {collection_name} ({batches}개 배치)")
+        return batches
     
     def search(
         self, 
         collection_name: str, 
         query: str, 
-        n_results: int = 3
+        n_results: int = 3,
+        include_embeddings: bool = False
     ) -> Dict:
-        """유사 문서 검색"""
+        """유사 문서 검색 (include_embeddings=True면 결과 문서의 정규화 임베딩도 반환)"""
+        if faiss is not None:
+            return self._search_faiss(collection_name, query, n_results, include_embeddings)
+        
         try:
             collection = self.client.get_collection(collection_name)
         except:
             logger.warning(f"⚠️ 컬렉션 없음: {collection_name}")
             return {"documents": [], "metadatas": [], "distances": []}
         
-        # 쿼리 임베딩
-        query_embedding = self.embedding_model.encode([query]).tolist()
+        # 쿼리 임베딩 (문서와 같은 방식으로 정규화)
+        query_embedding = self._encode([query]).tolist()
         
         # 검색
+        include = ["documents", "metadatas", "distances"]
+        if include_embeddings:
+            include.append("embeddings")
         results = collection.query(
             query_embeddings=query_embedding,
-            n_results=n_results
+            n_results=n_results,
+            include=include
         )
         
         return results
     
+    def embed_query(self, query: str) -> np.ndarray:
+        """쿼리 임베딩 (검색과 같은 정규화 벡터, 캐시 사용)"""
+        return self._encode([query])[0]
+    
+    def load_index(self, collection_name: str) -> bool:
+        """Chroma에 저장된 임베딩으로 FAISS 인덱스 미리 빌드 (프로세스 시작 시 호출)"""
+        if faiss is None:
+            return False
+        return self._get_index(collection_name) is not None
+    
+    def _search_faiss(
+        self, collection_name: str, query: str, n_results: int, include_embeddings: bool = False
+    ) -> Dict:
+        """FAISS 내적 검색 (Chroma query와 같은 형태로 반환)"""
+        entry = self._get_index(collection_name)
+        if entry is None:
+            return {"documents": [], "metadatas": [], "distances": []}
+        
+        index = entry["index"]
+        k = min(n_results, index.ntotal)
+        if k <= 0:
+            return {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]}
+        
+        scores, positions = index.search(self._encode([query]), k)
+        hits = [(pos, score) for pos, score in zip(positions[0], scores[0]) if pos >= 0]
+        
+        # Chroma(ip)와 같은 거리 척도: 1 - 내적 (작을수록 유사)
+        results = {
+            "ids": [[entry["ids"][pos] for pos, _ in hits]],
+            "documents": [[entry["documents"][pos] for pos, _ in hits]],
+            "metadatas": [[entry["metadatas"][pos] for pos, _ in hits]],
+            "distances": [[float(1 - score) for _, score in hits]]
+        }
+        if include_embeddings:
+            results["embeddings"] = [entry["embeddings"][[pos for pos, _ in hits]]]
+        return results
+    
+    def _get_index(self, collection_name: str) -> Optional[Dict]:
+        """캐시된 FAISS 인덱스 반환 (없으면 Chroma에서 빌드, 컬렉션이 없으면 None)"""
+        with self._faiss_lock:
+            entry = self._faiss.get(collection_name)
+            if entry is not None:
+                return entry
+            
+            try:
+                collection = self.client.get_collection(collection_name)
+            except:
+                logger.warning(f"⚠️ 컬렉션 없음: {collection_name}")
+                return None
+            
+            data = collection.get(include=["embeddings", "documents", "metadatas"])
+            matrix = self._normalize(data["embeddings"])
+            entry = {
+                "index": self._build_index(matrix),
+                "embeddings": matrix,
+                "ids": data["ids"],
+                "documents": data["documents"],
+                "metadatas": data["metadatas"]
+            }
+            self._faiss[collection_name] = entry
+            logger.info(f"⚡ FAISS 인덱스 빌드: {collection_name} ({entry['index'].ntotal}개)")
+            return entry
+    
+    @staticmethod
+    def _normalize(embeddings: List[List[float]]) -> np.ndarray:
+        """(N, D) float32 행렬로 변환 후 L2 정규화 (이전에 정규화 없이 저장된 벡터 대비)"""
+        matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if matrix.size == 0:
+            return np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+        faiss.normalize_L2(matrix)
+        return matrix
+    
+    def _build_index(self, matrix: np.ndarray):
+        """정규화된 임베딩 행렬로 내적(코사인) 인덱스 생성 (FAISS_INT8이면 int8 스칼라 양자화)"""
+        dim = matrix.shape[1]
+        # 양자화 범위는 차원별 min/max로 학습하므로 벡터가 있어야 함
+        quantize = FAISS_INT8 and len(matrix) > 0
+        if len(matrix) >= HNSW_THRESHOLD:
+            if quantize:
+                index = faiss.IndexHNSWSQ(dim, faiss.ScalarQuantizer.QT_8bit, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            else:
+                index = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        elif quantize:
+            index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexFlatIP(dim)
+        if quantize:
+            index.train(matrix)
+        index.add(matrix)
+        return index
+    
+    def _append_to_index(
+        self,
+        collection_name: str,
+        ids: List[str],
+        documents: List[str],
+        metadatas: List[Dict],
+        embeddings: np.ndarray
+    ):
+        """캐시된 FAISS 인덱스에 새 문서 추가 (인덱스가 아직 없으면 다음 검색 때 빌드)"""
+        with self._faiss_lock:
+            entry = self._faiss.get(collection_name)
+            if entry is None:
+                return
+            
+            # 중복 id는 Chroma가 무시하므로 이 경우만 다음 검색 때 Chroma 기준으로 다시 빌드
+            if not set(ids).isdisjoint(entry["ids"]):
+                self._faiss.pop(collection_name, None)
+                return
+            
+            rows = np.ascontiguousarray(embeddings, dtype=np.float32)
+            matrix = np.vstack([entry["embeddings"], rows])
+            if len(entry["embeddings"]) < HNSW_THRESHOLD <= len(matrix):
+                entry["index"] = self._build_index(matrix)
+            else:
+                entry["index"].add(rows)
+            entry["embeddings"] = matrix
+            entry["ids"] = entry["ids"] + list(ids)
+            entry["documents"] = entry["documents"] + list(documents)
+            entry["metadatas"] = entry["metadatas"] + list(metadatas)
+    
+    def _remove_from_index(self, collection_name: str, ids: List[str]):
+        """캐시된 FAISS 인덱스에서 문서 제거 (남은 행렬로 다시 빌드, Chroma에서 다시 읽지 않음)"""
+        with self._faiss_lock:
+            entry = self._faiss.get(collection_name)
+            if entry is None:
+                return
+            
+            removed = set(ids)
+            keep = [pos for pos, doc_id in enumerate(entry["ids"]) if doc_id not in removed]
+            if len(keep) == len(entry["ids"]):
+                return
+            
+            matrix = entry["embeddings"][keep]
+            entry["index"] = self._build_index(matrix)
+            entry["embeddings"] = matrix
+            entry["ids"] = [entry["ids"][pos] for pos in keep]
+            entry["documents"] = [entry["documents"][pos] for pos in keep]
+            entry["metadatas"] = [entry["metadatas"][pos] for pos in keep]
+    
+    def _invalidate_index(self, collection_name: str):
+        """FAISS 인덱스 캐시 제거"""
+        with self._faiss_lock:
+            self._faiss.pop(collection_name, None)
+    
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """텍스트 목록을 정규화된 float32 임베딩 행렬로 변환 (캐시에 없는 텍스트만 모델 실행)"""
+        return self.embedding_cache.encode(self.cache_model_name, texts, self._encode_batch)
+    
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        """모델로 직접 배치 인코딩 (텐서로 유지하다가 마지막에 한 번만 float32 numpy로 변환)"""
+        embeddings = self.embedding_model.encode(
+            texts,
+            batch_size=self.encode_batch_size,
+            convert_to_tensor=True,
+            normalize_embeddings=True,
+            show_progress_bar=len(texts) >= PROGRESS_BAR_MIN_TEXTS
+        )
+        return embeddings.float().cpu().numpy()
+    
+    def get_metadatas(self, collection_name: str) -> Dict:
+        """컬렉션의 모든 id와 메타데이터 (임베딩/본문 제외, 컬렉션이 없으면 빈 결과)"""
+        try:
+            collection = self.client.get_collection(collection_name)
+        except:
+            return {"ids": [], "metadatas": []}
+        return collection.get(include=["metadatas"])
+    
+    def delete_documents(self, collection_name: str, ids: List[str]):
+        """id로 문서 삭제"""
+        if not ids:
+            return
+        collection = self.get_or_create_collection(collection_name)
+        collection.delete(ids=ids)
+        self._remove_from_index(collection_name, ids)
+        logger.info(f"🗑️ {len(ids)}개 문서 삭제 → {collection_name}")
+    
     def get_collection_count(self, collection_name: str) -> int:
         """컬렉션 문서 수"""
         try:
@@ -100,6 +357,7 @@ class VectorStore:
     
     def delete_collection(self, collection_name: str):
         """컬렉션 삭제"""
+        self._invalidate_index(collection_name)
         try:
             self.client.delete_collection(collection_name)
             logger.info(f"🗑️ 컬렉션 삭제: {collection_name}")
@@ -2,8 +2,9 @@
 자동 발주 스케줄러 (개선 버전)
 매일 정해진 시간에 발주안을 자동으로 생성하고 order_items까지 저장
 """
-from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from datetime import datetime
 import json
 import logging
@@ -11,6 +12,10 @@ import pymysql
 import os
 from dotenv import load_dotenv
 
+from database import refresh_sales_daily
+from database.config import MYSQL_CONFIG
+from database.mysql_pool import transaction
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
@@ -20,31 +25,37 @@ class AutoOrderScheduler:
     """자동 발주 스케줄러"""
     
     def __init__(self):
-        self.scheduler = BackgroundScheduler(timezone='Asia/Seoul')
+        # FastAPI 이벤트 루프에서 실행 (LLM 호출 대기 중에도 다른 요청 처리)
+        self.scheduler = AsyncIOScheduler(timezone='Asia/Seoul')
         self.coordinator = None
         self.is_running = False
+        self.tables_ready = False
         
     def set_coordinator(self, coordinator):
         """Coordinator Agent 설정"""
         self.coordinator = coordinator
         
-    def get_db_connection(self):
-        """DB 연결"""
-        return pymysql.connect(
-            host=os.getenv("MYSQL_HOST", "localhost"),
-            port=int(os.getenv("MYSQL_PORT", 3306)),
-            user=os.getenv("MYSQL_USER", "root"),
-            password=os.getenv("MYSQL_PASSWORD"),
-            database=os.getenv("MYSQL_DATABASE", "store_order"),
-            charset='utf8mb4'
-        )
-    
     def create_tables(self):
-        """필요한 테이블 생성"""
-        db = self.get_db_connection()
+        """필요한 테이블 생성 (이미 두 테이블이 모두 있으면 DDL 생략)"""
+        if self.tables_ready:
+            return
+        
+        # 시작 시 한 번만 쓰므로 풀 없이 짧게 연결 (저장은 aiomysql transaction() 사용)
+        db = pymysql.connect(**MYSQL_CONFIG, charset='utf8mb4')
         cursor = db.cursor()
         
         try:
+            # 메타데이터 조회만으로 확인 (CREATE TABLE IF NOT EXISTS도 메타데이터 락을 잡음)
+            cursor.execute("""
+                SELECT COUNT(*) FROM information_schema.TABLES
+                WHERE TABLE_SCHEMA = DATABASE()
+                  AND TABLE_NAME IN ('order_recommendations', 'order_items')
+            """)
+            if cursor.fetchone()[0] == 2:
+                self.tables_ready = True
+                logger.info("✅ 테이블 확인 완료 (order_recommendations, order_items)")
+                return
+            
             # order_recommendations 테이블
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS order_recommendations (
@@ -60,7 +71,10 @@ class AutoOrderScheduler:
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     executed_at TIMESTAMP NULL,
                     INDEX idx_date (recommendation_date),
-                    INDEX idx_status (status)
+                    INDEX idx_status (status),
+                    INDEX idx_status_date (status, recommendation_date),
+                    INDEX idx_reco_cover (recommendation_date, status, total_items, total_cost),
+                    UNIQUE KEY uq_reco_date (recommendation_date)
                 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
             """)
             
@@ -81,6 +95,7 @@ class AutoOrderScheduler:
                     
                     INDEX idx_recommendation (recommendation_id),
                     INDEX idx_product (product_name),
+                    INDEX idx_reco_priority (recommendation_id, priority),
                     
                     FOREIGN KEY (recommendation_id) 
                         REFERENCES order_recommendations(id) 
@@ -89,6 +104,7 @@ class AutoOrderScheduler:
             """)
             
             db.commit()
+            self.tables_ready = True
             logger.info("✅ 테이블 생성/확인 완료 (order_recommendations, order_items)")
         except Exception as e:
             logger.error(f"테이블 생성 오류: {e}")
@@ -96,7 +112,7 @@ class AutoOrderScheduler:
             cursor.close()
             db.close()
     
-    def generate_and_save_recommendation(self):
+    async def generate_and_save_recommendation(self):
         """발주 추천 생성 및 저장 (order_items 포함)"""
         try:
             logger.info("🤖 자동 발주 추천 생성 시작...")
@@ -105,69 +121,92 @@ class AutoOrderScheduler:
                 logger.error("❌ Coordinator가 설정되지 않았습니다.")
                 return
             
-            # 발주 추천 생성
-            result = self.coordinator.generate_order_recommendation(
-                "내일 발주를 위한 자동 추천을 생성해주세요."
+            # 발주 추천 생성 (서버 이벤트 루프에서 대기, 그동안 다른 요청 처리)
+            # AUTO_ORDER_USE_BATCH_API=true 이면 최종 발주안을 Batch API로 생성 (비용 절감)
+            result = await self.coordinator.generate_order_recommendation(
+                "내일 발주를 위한 자동 추천을 생성해주세요.",
+                use_batch_api=os.getenv("AUTO_ORDER_USE_BATCH_API", "false").lower() == "true"
             )
             
-            # DB에 저장
-            db = self.get_db_connection()
-            cursor = db.cursor()
+            # 추천 내용 파싱 (분석 텍스트는 5000자로 제한)
+            inventory_analysis, sales_analysis, weather_analysis, final_recommendation = [
+                (result.get(key, '') or '')[:5000]
+                for key in ('inventory_analysis', 'sales_analysis', 'weather_analysis', 'final_recommendation')
+            ]
             
+            # order_items에서 total_items와 total_cost 가져오기
+            order_items = result.get('order_items', [])
+            total_items = len(order_items)
+            total_cost = sum(item.get('total_cost', 0) for item in order_items)
+            
+            # DB에 저장 (aiomysql 풀, 하나의 트랜잭션 - 오류 시 롤백)
             try:
-                # 추천 내용 파싱
-                inventory_analysis = result.get('inventory_analysis', '')
-                sales_analysis = result.get('sales_analysis', '')
-                weather_analysis = result.get('weather_analysis', '')
-                final_recommendation = result.get('final_recommendation', '')
-                
-                # order_items에서 total_items와 total_cost 가져오기
-                order_items = result.get('order_items', [])
-                total_items = len(order_items)
-                total_cost = sum(item.get('total_cost', 0) for item in order_items)
-                
-                # order_recommendations 저장
-                cursor.execute("""
-                    INSERT INTO order_recommendations 
-                    (recommendation_date, inventory_analysis, sales_analysis, 
-                     weather_analysis, final_recommendation, total_items, total_cost, status)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                """, (
-                    datetime.now().date(),
-                    inventory_analysis[:5000] if len(inventory_analysis) > 5000 else inventory_analysis,
-                    sales_analysis[:5000] if len(sales_analysis) > 5000 else sales_analysis,
-                    weather_analysis[:5000] if len(weather_analysis) > 5000 else weather_analysis,
-                    final_recommendation[:5000] if len(final_recommendation) > 5000 else final_recommendation,
-                    total_items,
-                    total_cost,
-                    'pending'
-                ))
-                
-                recommendation_id = cursor.lastrowid
-                
-                # order_items 저장
-                if order_items:
-                    for item in order_items:
-                        cursor.execute("""
+                async with transaction() as conn, conn.cursor() as cursor:
+                    # order_recommendations 저장 - 같은 날 재실행이면 아직 대기 중인 추천만 덮어씀
+                    # (id = LAST_INSERT_ID(id): 덮어쓴 경우에도 lastrowid로 기존 id를 받음)
+                    await cursor.execute("""
+                        INSERT INTO order_recommendations 
+                        (recommendation_date, inventory_analysis, sales_analysis, 
+                         weather_analysis, final_recommendation, total_items, total_cost, status)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                        ON DUPLICATE KEY UPDATE
+                            id = LAST_INSERT_ID(id),
+                            inventory_analysis = IF(status = 'pending', VALUES(inventory_analysis), inventory_analysis),
+                            sales_analysis = IF(status = 'pending', VALUES(sales_analysis), sales_analysis),
+                            weather_analysis = IF(status = 'pending', VALUES(weather_analysis), weather_analysis),
+                            final_recommendation = IF(status = 'pending', VALUES(final_recommendation), final_recommendation),
+                            total_items = IF(status = 'pending', VALUES(total_items), total_items),
+                            total_cost = IF(status = 'pending', VALUES(total_cost), total_cost)
+                    """, (
+                        datetime.now().date(),
+                        inventory_analysis,
+                        sales_analysis,
+                        weather_analysis,
+                        final_recommendation,
+                        total_items,
+                        total_cost,
+                        'pending'
+                    ))
+                    
+                    recommendation_id = cursor.lastrowid
+                    
+                    # 이미 실행/취소된 추천은 덮어쓰지 않음 (rowcount는 CLIENT_FOUND_ROWS 설정에 따라 달라 상태로 확인)
+                    await cursor.execute(
+                        "SELECT status FROM order_recommendations WHERE id = %s", (recommendation_id,)
+                    )
+                    (status,) = await cursor.fetchone()
+                    if status != 'pending':
+                        logger.warning(f"⚠️ 오늘 발주 추천(ID: {recommendation_id})이 이미 처리되어({status}) 덮어쓰지 않습니다.")
+                        return
+                    
+                    # 덮어쓴 경우 이전 품목 제거 (새로 추가된 추천이면 지울 행 없음)
+                    await cursor.execute(
+                        "DELETE FROM order_items WHERE recommendation_id = %s", (recommendation_id,)
+                    )
+                    
+                    # order_items 저장 (executemany는 다중 VALUES INSERT 한 번으로 전송)
+                    if order_items:
+                        await cursor.executemany("""
                             INSERT INTO order_items
                             (recommendation_id, product_name, current_stock, safe_stock,
                              order_quantity, unit_price, total_cost, reason, priority)
                             VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                        """, (
-                            recommendation_id,
-                            item.get('product_name', ''),
-                            item.get('current_stock', 0),
-                            item.get('safe_stock', 0),
-                            item.get('order_quantity', 0),
-                            item.get('unit_price', 0),
-                            item.get('total_cost', 0),
-                            item.get('reason', '')[:500],  # reason은 500자로 제한
-                            item.get('priority', 'medium')
-                        ))
-                    
-                    logger.info(f"✅ 발주 품목 {len(order_items)}개 저장 완료")
-                
-                db.commit()
+                        """, [
+                            (
+                                recommendation_id,
+                                item.get('product_name', ''),
+                                item.get('current_stock', 0),
+                                item.get('safe_stock', 0),
+                                item.get('order_quantity', 0),
+                                item.get('unit_price', 0),
+                                item.get('total_cost', 0),
+                                (item.get('reason', '') or '')[:500],  # reason은 500자로 제한
+                                item.get('priority', 'medium')
+                            )
+                            for item in order_items
+                        ])
+                        
+                        logger.info(f"✅ 발주 품목 {len(order_items)}개 저장 완료")
                 
                 logger.info(f"✅ 발주 추천 저장 완료 (ID: {recommendation_id})")
                 logger.info(f"📅 추천일: {datetime.now().date()}")
@@ -176,12 +215,8 @@ class AutoOrderScheduler:
                 
             except Exception as e:
                 logger.error(f"❌ DB 저장 오류: {e}")
-                db.rollback()
                 import traceback
                 traceback.print_exc()
-            finally:
-                cursor.close()
-                db.close()
                 
         except Exception as e:
             logger.error(f"❌ 발주 추천 생성 오류: {e}")
@@ -189,7 +224,7 @@ class AutoOrderScheduler:
             traceback.print_exc()
     
     def start(self, schedule_time="06:00"):
-        """스케줄러 시작"""
+        """스케줄러 시작 (이벤트 루프가 실행 중일 때 호출 - FastAPI lifespan)"""
         if self.is_running:
             logger.warning("⚠️ 스케줄러가 이미 실행 중입니다.")
             return
@@ -208,6 +243,17 @@ class AutoOrderScheduler:
             replace_existing=True
         )
         
+        # 대시보드용 일별 판매 집계 (시작 직후 한 번, 이후 매시간)
+        # 동기 함수라 APScheduler가 기본 스레드 풀에서 실행
+        self.scheduler.add_job(
+            refresh_sales_daily,
+            trigger=IntervalTrigger(hours=1),
+            id='sales_daily_rollup',
+            name='일별 판매 집계 갱신',
+            next_run_time=datetime.now(self.scheduler.timezone),
+            replace_existing=True
+        )
+        
         self.scheduler.start()
         self.is_running = True
         
@@ -246,10 +292,10 @@ class AutoOrderScheduler:
                 "message": "스케줄 작업을 찾을 수 없습니다."
             }
     
-    def run_now(self):
+    async def run_now(self):
         """즉시 실행 (테스트용)"""
         logger.info("🚀 발주 추천 즉시 실행...")
-        self.generate_and_save_recommendation()
+        await self.generate_and_save_recommendation()
 
 
 # 전역 스케줄러 인스턴스
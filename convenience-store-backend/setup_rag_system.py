@@ -5,6 +5,7 @@ RAG 시스템 자동 설치 스크립트
 import subprocess
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 
 def install_packages():
@@ -17,12 +18,29 @@ def install_packages():
         "torch"  # sentence-transformers 의존성
     ]
     
+    # 한 번의 pip 실행으로 설치 (pip 시작/의존성 해석을 한 번만)
+    # 출력은 환경 변수로 줄이고 표준 출력은 그대로 상속 (오류 메시지는 그대로 보임)
+    pip = [sys.executable, "-m", "pip", "install"]
+    env = os.environ.copy()
+    env.update(
+        PIP_QUIET="1",
+        PIP_DISABLE_PIP_VERSION_CHECK="1",
+        PIP_NO_INPUT="1",
+        PIP_PROGRESS_BAR="off"
+    )
+    print(f"  - {', '.join(packages)} 설치 중...")
+    try:
+        subprocess.check_call(pip + packages, env=env)
+        print("  ✅ 패키지 설치 완료")
+        return
+    except subprocess.CalledProcessError as e:
+        print(f"  ⚠️ 일괄 설치 실패: {e} → 패키지별로 다시 시도")
+    
+    # 어떤 패키지가 실패했는지 알 수 있도록 하나씩 설치
     for package in packages:
         print(f"  - {package} 설치 중...")
         try:
-            subprocess.check_call([
-                sys.executable, "-m", "pip", "install", package
-            ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            subprocess.check_call(pip + [package], env=env)
             print(f"  ✅ {package} 설치 완료")
         except subprocess.CalledProcessError as e:
             print(f"  ⚠️ {package} 설치 실패: {e}")
@@ -56,15 +74,43 @@ def generate_knowledge_base():
         ("create_patterns.py", "판매 패턴")
     ]
     
+    # 스크립트끼리 의존성이 없으므로 동시에 실행 (전체 시간 ≈ 가장 오래 걸리는 스크립트)
+    # 출력이 섞이지 않도록 각 스크립트의 출력은 끝난 뒤 한 번에 표시
+    runnable = []
     for script, name in scripts:
         if os.path.exists(script):
-            print(f"\n  {name} 생성 중...")
+            runnable.append((script, name))
+        else:
+            print(f"  ⚠️ {script} 파일이 없습니다")
+    
+    if not runnable:
+        return
+    
+    print(f"\n  {', '.join(name for _, name in runnable)} 생성 중...")
+    with ThreadPoolExecutor(max_workers=len(runnable)) as executor:
+        futures = {
+            executor.submit(
+                subprocess.run, [sys.executable, script],
+                check=True, capture_output=True, text=True
+            ): name
+            for script, name in runnable
+        }
+        for future in as_completed(futures):
+            name = futures[future]
             try:
-                subprocess.check_call([sys.executable, script])
+                result = future.result()
+                if result.stdout:
+                    print(result.stdout, end="")
+                if result.stderr:
+                    print(result.stderr, end="", file=sys.stderr)
+                print(f"  ✅ {name} 생성 완료")
             except subprocess.CalledProcessError as e:
+                if e.stdout:
+                    print(e.stdout, end="")
+                # 실패한 스크립트의 traceback은 stderr에 있음
+                if e.stderr:
+                    print(e.stderr, end="", file=sys.stderr)
                 print(f"  ⚠️ {name} 생성 실패: {e}")
-        else:
-            print(f"  ⚠️ {script} 파일이 없습니다")
 
 
 def initialize_vector_db():
@@ -75,7 +121,9 @@ def initialize_vector_db():
         from rag.rag_engine import RAGEngine
         
         rag = RAGEngine()
-        rag.initialize_knowledge_base(reset=True)
+        index_stats = rag.initialize_knowledge_base()  # 바뀐 파일만 다시 임베딩
+        print(f"  - 추가: {index_stats['added']}개 청크 ({index_stats['batches']}개 배치)")
+        print(f"  - 삭제: {index_stats['deleted']}개 청크, 변경 없는 파일: {index_stats['skipped_files']}개")
         
         # 통계 출력
         stats = rag.get_statistics()
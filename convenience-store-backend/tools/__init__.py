@@ -1,36 +1,48 @@
 """
 편의점 AI 시스템 도구 모음
 """
-from .inventory_tools import (
-    get_current_inventory,
-    get_low_stock_items,
-    get_expiring_products,
-    calculate_stock_turnover,
-    update_inventory
-)
+import importlib
+from typing import Any, Dict
 
-from .sales_tools import (
-    get_sales_data,
-    analyze_sales_pattern,
-    get_trending_products,
-    predict_daily_sales,
-    analyze_sales_correlation
-)
+# 도구 이름 → 정의된 모듈 (처음 접근할 때 해당 모듈만 import)
+# tools.weather_tools만 쓰는 경우 DB 드라이버(pymysql) 등 다른 모듈의 의존성을 불러오지 않음
+_TOOL_MODULES: Dict[str, str] = {
+    **dict.fromkeys(
+        ("get_current_inventory", "get_low_stock_items", "get_expiring_products",
+         "calculate_stock_turnover", "update_inventory"),
+        ".inventory_tools"
+    ),
+    **dict.fromkeys(
+        ("get_sales_data", "analyze_sales_pattern", "get_trending_products",
+         "predict_daily_sales", "analyze_sales_correlation"),
+        ".sales_tools"
+    ),
+    **dict.fromkeys(
+        ("get_weather_forecast", "analyze_weather_impact", "get_weather_based_recommendations",
+         "check_special_events"),
+        ".weather_tools"
+    ),
+    **dict.fromkeys(
+        ("create_order", "calculate_order_cost", "optimize_order_quantity",
+         "get_order_history", "validate_order"),
+        ".order_tools"
+    ),
+}
 
-from .weather_tools import (
-    get_weather_forecast,
-    analyze_weather_impact,
-    get_weather_based_recommendations,
-    check_special_events
-)
 
-from .order_tools import (
-    create_order,
-    calculate_order_cost,
-    optimize_order_quantity,
-    get_order_history,
-    validate_order
-)
+def __getattr__(name: str) -> Any:
+    """PEP 562 지연 로딩 - from tools import get_sales_data 처럼 기존 방식 그대로 사용"""
+    module_name = _TOOL_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value  # 다음 접근부터는 __getattr__를 거치지 않음
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
 
 __all__ = [
     # Inventory tools
@@ -0,0 +1,65 @@
+"""
+도구(tool)용 pymysql 커넥션 풀
+에이전트가 한 턴에 여러 도구를 호출해도 매번 TCP 연결/인증을 하지 않도록 연결을 재사용합니다.
+"""
+import logging
+import threading
+from typing import Optional
+
+from database.config import MYSQL_CONFIG
+
+try:
+    from dbutils.pooled_db import PooledDB
+except ImportError:  # DBUtils 미설치 시 매번 새 연결
+    PooledDB = None
+
+logger = logging.getLogger(__name__)
+
+# 전역 커넥션 풀 (첫 get_conn() 호출 시 생성)
+_pool: Optional["PooledDB"] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> "PooledDB":
+    """커넥션 풀 싱글톤"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                import pymysql
+                
+                _pool = PooledDB(
+                    creator=pymysql,
+                    mincached=2,
+                    maxcached=10,
+                    maxconnections=20,
+                    blocking=True,  # 모두 사용 중이면 반납될 때까지 대기
+                    ping=1,  # 꺼낼 때 끊긴 연결이면 재연결
+                    charset='utf8mb4',
+                    cursorclass=pymysql.cursors.DictCursor,
+                    **MYSQL_CONFIG
+                )
+                logger.info("✅ 도구용 pymysql 커넥션 풀 생성 완료 (max=20)")
+    return _pool
+
+
+def get_conn():
+    """
+    풀에서 연결 대여 (DictCursor)
+    
+    사용 후 close() 또는 release()를 호출하면 실제로 끊지 않고 풀로 반환됩니다.
+    """
+    if PooledDB is None:
+        import pymysql
+        
+        return pymysql.connect(
+            **MYSQL_CONFIG,
+            charset='utf8mb4',
+            cursorclass=pymysql.cursors.DictCursor
+        )
+    return _get_pool().connection()
+
+
+def release(conn):
+    """연결 반납"""
+    conn.close()
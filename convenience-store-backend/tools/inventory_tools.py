@@ -4,81 +4,99 @@
 from langchain.tools import tool
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
-import json
-import os
-import pymysql
+import orjson
 from dotenv import load_dotenv
 
+from .db_pool import get_conn
+
 load_dotenv()
 
 
+def _dumps(obj) -> str:
+    """JSON 문자열로 직렬화 (orjson - 한글은 그대로, datetime/date는 ISO 형식)"""
+    return orjson.dumps(obj).decode()
+
+
+# 유통기한 임박 상품 (실제로는 DB에서 조회) - 응답 JSON을 모듈 로드 시 한 번만 직렬화
+_EXPIRING_JSON = _dumps({
+    "삼각김밥": {"quantity": 5, "expiry_date": "2024-12-15"},
+    "도시락": {"quantity": 3, "expiry_date": "2024-12-14"},
+    "우유": {"quantity": 4, "expiry_date": "2024-12-16"},
+})
+
+# 재고 회전율 계산용 기준값 (실제로는 판매 데이터 기반)
+_AVG_DAILY_SALES = 8.5
+_AVG_INVENTORY = 15
+_DAYS_OF_SUPPLY = round(_AVG_INVENTORY / _AVG_DAILY_SALES, 1)
+
+# 재고 수정 쿼리 (action별 계산은 DB에서, 차감은 0 미만으로 내려가지 않음)
+_UPDATE_INVENTORY_SQL = """
+    UPDATE inventory
+    SET quantity = CASE %s
+        WHEN 'set' THEN %s
+        WHEN 'add' THEN quantity + %s
+        WHEN 'subtract' THEN GREATEST(quantity - %s, 0)
+    END
+    WHERE product_name = %s
+"""
+
+_INVENTORY_ACTIONS = ("set", "add", "subtract")
+
+
 def get_db_connection():
-    """DB 연결"""
-    return pymysql.connect(
-        host=os.getenv("MYSQL_HOST", "localhost"),
-        port=int(os.getenv("MYSQL_PORT", 3306)),
-        user=os.getenv("MYSQL_USER", "root"),
-        password=os.getenv("MYSQL_PASSWORD"),
-        database=os.getenv("MYSQL_DATABASE", "store_order"),
-        charset='utf8mb4',
-        cursorclass=pymysql.cursors.DictCursor
-    )
+    """DB 연결 (풀에서 대여, close() 하면 풀로 반환)"""
+    return get_conn()
 
 
-@tool
-def get_current_inventory(product_name: Optional[str] = None) -> str:
-    """
-    현재 재고를 조회합니다.
-    
-    Args:
-        product_name: 특정 상품명 (없으면 전체 조회)
-    
-    Returns:
-        현재 재고 정보 (JSON 문자열)
-    """
+def _current_inventory(product_name: Optional[str] = None) -> Dict[str, Dict]:
+    """현재 재고 {상품명: {...}} (없는 상품이면 빈 dict) - 도구 래퍼/JSON 변환 없이 직접 호출용"""
     db = get_db_connection()
     cursor = db.cursor()
     
     try:
         if product_name:
             cursor.execute("""
-                SELECT product_name, quantity, safe_stock, max_stock, unit_price
+                SELECT product_name, quantity, safe_stock, max_stock
                 FROM inventory
                 WHERE product_name = %s
             """, (product_name,))
-            result = cursor.fetchone()
-            
-            if result:
-                return json.dumps({
-                    result['product_name']: {
-                        "quantity": int(result['quantity']),
-                        "safe_stock": int(result['safe_stock']),
-                        "max_stock": int(result['max_stock'])
-                    }
-                }, ensure_ascii=False)
-            else:
-                return f"상품 '{product_name}'을 찾을 수 없습니다."
         else:
             cursor.execute("""
                 SELECT product_name, quantity, safe_stock, max_stock
                 FROM inventory
             """)
-            results = cursor.fetchall()
-            
-            inventory_data = {}
-            for row in results:
-                inventory_data[row['product_name']] = {
-                    "quantity": int(row['quantity']),
-                    "safe_stock": int(row['safe_stock']),
-                    "max_stock": int(row['max_stock'])
-                }
-            
-            return json.dumps(inventory_data, ensure_ascii=False)
+        
+        return {
+            row['product_name']: {
+                "quantity": int(row['quantity']),
+                "safe_stock": int(row['safe_stock']),
+                "max_stock": int(row['max_stock'])
+            }
+            for row in cursor.fetchall()
+        }
     finally:
         cursor.close()
         db.close()
 
 
+@tool
+def get_current_inventory(product_name: Optional[str] = None) -> str:
+    """
+    현재 재고를 조회합니다.
+    
+    Args:
+        product_name: 특정 상품명 (없으면 전체 조회)
+    
+    Returns:
+        현재 재고 정보 (JSON 문자열)
+    """
+    inventory_data = _current_inventory(product_name)
+    if product_name and not inventory_data:
+        return f"상품 '{product_name}'을 찾을 수 없습니다."
+    
+    return _dumps(inventory_data)
+
+
 @tool
 def get_low_stock_items(threshold: float = 0.8) -> str:
     """
@@ -90,23 +108,39 @@ def get_low_stock_items(threshold: float = 0.8) -> str:
     Returns:
         재고 부족 상품 목록
     """
-    inventory = json.loads(get_current_inventory.invoke({}))
-    low_stock = {}
-    
-    for product, data in inventory.items():
-        ratio = data["quantity"] / data["safe_stock"]
-        if ratio < threshold:
-            low_stock[product] = {
-                "current": data["quantity"],
-                "safe_stock": data["safe_stock"],
-                "shortage": data["safe_stock"] - data["quantity"],
-                "ratio": round(ratio, 2)
+    db = get_db_connection()
+    cursor = db.cursor()
+    
+    try:
+        # 부족 여부는 DB에서 판단해 부족한 상품만 가져옴
+        cursor.execute("""
+            SELECT
+                product_name,
+                quantity,
+                safe_stock,
+                safe_stock - quantity AS shortage,
+                quantity / NULLIF(safe_stock, 0) AS ratio
+            FROM inventory
+            WHERE quantity < safe_stock * %s
+        """, (threshold,))
+        
+        low_stock = {
+            row['product_name']: {
+                "current": int(row['quantity']),
+                "safe_stock": int(row['safe_stock']),
+                "shortage": int(row['shortage']),
+                "ratio": round(float(row['ratio']), 2) if row['ratio'] is not None else 0.0
             }
+            for row in cursor.fetchall()
+        }
+    finally:
+        cursor.close()
+        db.close()
     
     if not low_stock:
         return "모든 상품의 재고가 충분합니다."
     
-    return json.dumps(low_stock, ensure_ascii=False)
+    return _dumps(low_stock)
 
 
 @tool
@@ -121,13 +155,7 @@ def get_expiring_products(days: int = 3) -> str:
         유통기한 임박 상품 목록
     """
     # 실제로는 DB에서 유통기한 데이터 조회
-    expiring = {
-        "삼각김밥": {"quantity": 5, "expiry_date": "2024-12-15"},
-        "도시락": {"quantity": 3, "expiry_date": "2024-12-14"},
-        "우유": {"quantity": 4, "expiry_date": "2024-12-16"},
-    }
-    
-    return json.dumps(expiring, ensure_ascii=False)
+    return _EXPIRING_JSON
 
 
 @tool
@@ -146,35 +174,104 @@ def calculate_stock_turnover(product_name: str, period_days: int = 7) -> str:
     turnover_data = {
         "product": product_name,
         "period_days": period_days,
-        "avg_daily_sales": 8.5,
-        "avg_inventory": 15,
-        "turnover_rate": round(8.5 * period_days / 15, 2),
-        "days_of_supply": round(15 / 8.5, 1)
+        "avg_daily_sales": _AVG_DAILY_SALES,
+        "avg_inventory": _AVG_INVENTORY,
+        "turnover_rate": round(_AVG_DAILY_SALES * period_days / _AVG_INVENTORY, 2),
+        "days_of_supply": _DAYS_OF_SUPPLY
     }
     
-    return json.dumps(turnover_data, ensure_ascii=False)
+    return _dumps(turnover_data)
 
 
 @tool
-def update_inventory(product_name: str, quantity: int, action: str = "set") -> str:
+def update_inventory(product_name: str, quantity: Optional[int] = None, action: str = "set") -> str:
     """
     재고를 업데이트합니다.
     
     Args:
-        product_name: 상품명
-        quantity: 수량
+        product_name: 상품명, 또는 여러 상품을 한 번에 수정할 때 JSON 목록
+            예: '[{"product": "삼각김밥", "quantity": 30, "action": "add"}]'
+        quantity: 수량 (상품 하나를 수정할 때 필수, 목록의 각 항목에도 필수)
         action: 'set' (설정), 'add' (추가), 'subtract' (차감)
     
     Returns:
         업데이트 결과
     """
-    # 실제로는 DB 업데이트
-    result = {
-        "product": product_name,
-        "action": action,
-        "quantity": quantity,
-        "timestamp": datetime.now().isoformat(),
-        "success": True
-    }
+    if product_name.lstrip().startswith("["):
+        try:
+            items = [
+                (item["product"], int(item["quantity"]), item.get("action", "set"))
+                for item in orjson.loads(product_name)
+            ]
+        except Exception:
+            return "재고 수정 목록 형식이 올바르지 않습니다."
+        if not items:
+            return "재고 수정 목록이 비어 있습니다."
+    else:
+        # 수량 없이 호출되면 재고를 0으로 덮어쓰지 않도록 거부
+        if quantity is None:
+            return "재고를 수정할 수량(quantity)을 지정하세요."
+        items = [(product_name, quantity, action)]
+    
+    invalid = [item_action for _, _, item_action in items if item_action not in _INVENTORY_ACTIONS]
+    if invalid:
+        return f"지원하지 않는 action: {', '.join(invalid)}"
+    
+    # 여러 상품도 한 트랜잭션에서 executemany로 처리 (커밋 한 번)
+    db = get_db_connection()
+    cursor = db.cursor()
+    try:
+        db.begin()
+        # 없는 상품 확인 (값이 같아 바뀌지 않은 행은 rowcount에 잡히지 않으므로 직접 조회)
+        product_names = list(dict.fromkeys(product for product, _, _ in items))
+        cursor.execute(
+            "SELECT product_name FROM inventory WHERE product_name IN (" + ",".join(["%s"] * len(product_names)) + ")",
+            product_names
+        )
+        found = {row['product_name'] for row in cursor.fetchall()}
+        not_found = [product for product in product_names if product not in found]
+        
+        cursor.executemany(
+            _UPDATE_INVENTORY_SQL,
+            [(item_action, qty, qty, qty, product) for product, qty, item_action in items]
+        )
+        updated_rows = cursor.rowcount
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        cursor.close()
+        db.close()
+    
+    # 캐시된 재고 부족 분석 무효화 (inventory_agent가 이 모듈을 import하므로 지연 import)
+    from agents.inventory_agent import InventoryAgent
+    InventoryAgent.get_low_stock_alert.cache_clear()
+    InventoryAgent.aget_low_stock_alert.cache_clear()
+    
+    timestamp = datetime.now()
+    if len(items) == 1:
+        product, qty, item_action = items[0]
+        result = {
+            "product": product,
+            "action": item_action,
+            "quantity": qty,
+            "updated_rows": updated_rows,
+            "timestamp": timestamp,
+            "success": not not_found
+        }
+        if not_found:
+            result["error"] = f"상품을 찾을 수 없습니다: {product}"
+    else:
+        result = {
+            "items": [
+                {"product": product, "action": item_action, "quantity": qty}
+                for product, qty, item_action in items
+            ],
+            "updated_rows": updated_rows,
+            "not_found": not_found,
+            "timestamp": timestamp,
+            "success": not not_found
+        }
     
-    return json.dumps(result, ensure_ascii=False)
\ No newline at end of file
+    return _dumps(result)
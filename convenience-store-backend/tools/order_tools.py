@@ -2,11 +2,32 @@
 발주 생성 및 관리 도구들
 """
 from langchain.tools import tool
-import json
+import numpy as np
+import orjson
 from datetime import datetime, timedelta
 from typing import Dict, List
 
 
+def _dumps(obj) -> str:
+    """JSON 문자열로 직렬화 (orjson - 한글은 그대로, datetime/date는 ISO 형식)"""
+    return orjson.dumps(obj).decode()
+
+
+# 상품별 도매가 (실제로는 DB에서 조회) - 호출마다 다시 만들지 않도록 모듈 로드 시 한 번 생성
+_WHOLESALE_PRICES: Dict[str, int] = {
+    "삼각김밥": 1000,
+    "도시락": 3000,
+    "컵라면": 800,
+    "우유": 1500,
+    "빵": 1200,
+    "음료수": 700,
+    "과자": 900,
+    "라면": 600,
+    "아이스크림": 1100,
+    "우산": 5000,
+}
+
+
 @tool
 def create_order(orders: str) -> str:
     """
@@ -20,28 +41,35 @@ def create_order(orders: str) -> str:
         생성된 발주서 정보
     """
     try:
-        order_items = json.loads(orders)
+        order_items = orjson.loads(orders)
     except:
         return "발주 정보 형식이 올바르지 않습니다."
     
-    order_id = f"ORD-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+    now = datetime.now()
+    order_id = f"ORD-{now.year:04d}{now.month:02d}{now.day:02d}-{now.hour:02d}{now.minute:02d}{now.second:02d}"
     
     total_items = len(order_items)
     total_quantity = sum(item.get("quantity", 0) for item in order_items)
     
     order_document = {
         "order_id": order_id,
-        "created_at": datetime.now().isoformat(),
+        "created_at": datetime.now(),
         "status": "대기중",
         "items": order_items,
         "summary": {
             "total_items": total_items,
             "total_quantity": total_quantity
         },
-        "estimated_delivery": (datetime.now().date() + timedelta(days=1)).isoformat()
+        "estimated_delivery": datetime.now().date() + timedelta(days=1)
     }
     
-    return json.dumps(order_document, ensure_ascii=False)
+    return _dumps(order_document)
+
+
+def _as_number(value: float):
+    """정수로 떨어지는 금액은 int로 (정수 수량이면 기존처럼 정수 금액을 반환)"""
+    value = float(value)
+    return int(value) if value.is_integer() else value
 
 
 @tool
@@ -56,40 +84,34 @@ def calculate_order_cost(orders: str) -> str:
         비용 계산 결과
     """
     try:
-        order_items = json.loads(orders)
+        order_items = orjson.loads(orders)
     except:
         return "발주 정보 형식이 올바르지 않습니다."
     
-    # 상품별 도매가 (실제로는 DB에서 조회)
-    wholesale_prices = {
-        "삼각김밥": 1000,
-        "도시락": 3000,
-        "컵라면": 800,
-        "우유": 1500,
-        "빵": 1200,
-        "음료수": 700,
-        "과자": 900,
-        "라면": 600,
-        "아이스크림": 1100,
-        "우산": 5000,
-    }
-    
-    total_cost = 0
-    item_costs = []
-    
-    for item in order_items:
-        product = item.get("product")
-        quantity = item.get("quantity", 0)
-        unit_price = wholesale_prices.get(product, 1000)
-        item_total = unit_price * quantity
-        
-        total_cost += item_total
-        item_costs.append({
-            "product": product,
+    # 수량은 받은 값 그대로 사용 (소수 수량을 정수로 자르지 않음), 숫자가 아니면 거부
+    quantities = [item.get("quantity", 0) for item in order_items]
+    if any(isinstance(q, bool) or not isinstance(q, (int, float)) for q in quantities):
+        return "발주 수량은 숫자여야 합니다."
+    
+    # 수량 × 단가를 벡터 연산으로 한 번에 계산 (품목이 많은 대량 발주 대비)
+    unit_prices = np.fromiter(
+        (_WHOLESALE_PRICES.get(item.get("product"), 1000) for item in order_items),
+        dtype=np.int64, count=len(order_items)
+    )
+    item_totals = np.asarray(quantities, dtype=np.float64) * unit_prices
+    total_cost = _as_number(item_totals.sum())
+    
+    item_costs = [
+        {
+            "product": item.get("product"),
             "quantity": quantity,
             "unit_price": unit_price,
-            "total": item_total
-        })
+            "total": _as_number(item_total)
+        }
+        for item, quantity, unit_price, item_total in zip(
+            order_items, quantities, unit_prices.tolist(), item_totals.tolist()
+        )
+    ]
     
     result = {
         "items": item_costs,
@@ -98,7 +120,7 @@ def calculate_order_cost(orders: str) -> str:
         "total": int(total_cost * 1.1)
     }
     
-    return json.dumps(result, ensure_ascii=False)
+    return _dumps(result)
 
 
 @tool
@@ -136,7 +158,7 @@ def optimize_order_quantity(product: str, predicted_sales: int, current_stock: i
         "rationale": f"{lead_time_days}일 소요 + 안전재고 20% 고려"
     }
     
-    return json.dumps(result, ensure_ascii=False)
+    return _dumps(result)
 
 
 @tool
@@ -152,11 +174,10 @@ def get_order_history(days: int = 30, product: str = None) -> str:
         발주 내역
     """
     # 실제로는 DB에서 조회
-    from datetime import timedelta
-    
+    today = datetime.now().date()
     history = []
     for i in range(5):
-        date = (datetime.now() - timedelta(days=i*7)).strftime("%Y-%m-%d")
+        date = (today - timedelta(days=i*7)).isoformat()
         history.append({
             "order_id": f"ORD-{date.replace('-', '')}",
             "date": date,
@@ -165,7 +186,7 @@ def get_order_history(days: int = 30, product: str = None) -> str:
             "status": "완료"
         })
     
-    return json.dumps(history, ensure_ascii=False)
+    return _dumps(history)
 
 
 @tool
@@ -180,9 +201,9 @@ def validate_order(orders: str) -> str:
         검증 결과
     """
     try:
-        order_items = json.loads(orders)
+        order_items = orjson.loads(orders)
     except:
-        return json.dumps({"valid": False, "error": "잘못된 형식"}, ensure_ascii=False)
+        return _dumps({"valid": False, "error": "잘못된 형식"})
     
     issues = []
     warnings = []
@@ -208,4 +229,4 @@ def validate_order(orders: str) -> str:
         "can_proceed": len(issues) == 0
     }
     
-    return json.dumps(result, ensure_ascii=False)
+    return _dumps(result)
@@ -2,27 +2,25 @@
 판매 데이터 분석 도구들
 """
 from langchain.tools import tool
-from typing import List, Dict, Optional
-import json
+from typing import Callable, List, Dict, Optional
+import orjson
 from datetime import datetime, timedelta
-import os
-import pymysql
 from dotenv import load_dotenv
 
+from .db_pool import get_conn
+
 load_dotenv()
 
 
+def _dumps(obj) -> str:
+    """JSON 문자열로 직렬화 (orjson - 한글은 그대로, datetime/date는 ISO 형식)"""
+    return orjson.dumps(obj).decode()
+
+
+
 def get_db_connection():
-    """DB 연결"""
-    return pymysql.connect(
-        host=os.getenv("MYSQL_HOST", "localhost"),
-        port=int(os.getenv("MYSQL_PORT", 3306)),
-        user=os.getenv("MYSQL_USER", "root"),
-        password=os.getenv("MYSQL_PASSWORD"),
-        database=os.getenv("MYSQL_DATABASE", "store_order"),
-        charset='utf8mb4',
-        cursorclass=pymysql.cursors.DictCursor
-    )
+    """DB 연결 (풀에서 대여, close() 하면 풀로 반환)"""
+    return get_conn()
 
 
 @tool
@@ -37,8 +35,11 @@ def get_sales_data(product_name: Optional[str] = None, days: int = 7) -> str:
     Returns:
         판매 데이터 (JSON 문자열)
     """
+    from pymysql.cursors import SSDictCursor  # DB를 쓰는 도구에서만 드라이버 로드
+    
     db = get_db_connection()
-    cursor = db.cursor()
+    # 전체 상품 조회는 행이 많으므로 서버 측 커서로 한 행씩 받아 메모리에 모두 올리지 않음
+    cursor = db.cursor() if product_name else db.cursor(SSDictCursor)
     
     try:
         start_date = (datetime.now() - timedelta(days=days)).date()
@@ -59,12 +60,12 @@ def get_sales_data(product_name: Optional[str] = None, days: int = 7) -> str:
             daily_sales = []
             for row in cursor.fetchall():
                 daily_sales.append({
-                    "date": row['date'].strftime('%Y-%m-%d'),
+                    "date": row['date'].isoformat(),
                     "quantity": int(float(row['quantity'])) if row['quantity'] else 0,
                     "revenue": int(float(row['revenue'])) if row['revenue'] else 0
                 })
             
-            return json.dumps({product_name: daily_sales}, ensure_ascii=False)
+            return _dumps({product_name: daily_sales})
         else:
             cursor.execute("""
                 SELECT 
@@ -79,23 +80,71 @@ def get_sales_data(product_name: Optional[str] = None, days: int = 7) -> str:
             """, (start_date,))
             
             sales_data = {}
-            for row in cursor.fetchall():
+            for row in cursor:
                 product = row['product_name']
                 if product not in sales_data:
                     sales_data[product] = []
                 
                 sales_data[product].append({
-                    "date": row['date'].strftime('%Y-%m-%d'),
+                    "date": row['date'].isoformat(),
                     "quantity": int(float(row['quantity'])) if row['quantity'] else 0,
                     "revenue": int(float(row['revenue'])) if row['revenue'] else 0
                 })
             
-            return json.dumps(sales_data, ensure_ascii=False)
+            return _dumps(sales_data)
     finally:
         cursor.close()
         db.close()
 
 
+def _weekly_pattern(product_name: str) -> Dict:
+    """요일별 판매 패턴"""
+    return {
+        "product": product_name,
+        "period": "weekly",
+        "peak_days": ["월요일", "금요일"],
+        "low_days": ["수요일"],
+        "avg_daily_sales": 28.5,
+        "peak_avg": 35,
+        "low_avg": 20,
+        "trend": "상승세",
+        "seasonality": "주말 전 수요 증가"
+    }
+
+
+def _hourly_pattern(product_name: str) -> Dict:
+    """시간대별 판매 패턴"""
+    return {
+        "product": product_name,
+        "period": "hourly",
+        "peak_hours": ["7-9시", "12-13시", "18-20시"],
+        "peak_sales": "아침 7-9시가 가장 높음",
+        "recommendation": "아침 시간대 재고 확보 필요"
+    }
+
+
+def _daily_pattern(product_name: str) -> Dict:
+    """일별 판매 패턴 (기본)"""
+    return {
+        "product": product_name,
+        "period": "daily",
+        "avg_sales": 28.5,
+        "max_sales": 45,
+        "min_sales": 15
+    }
+
+
+# 분석 주기 → 패턴 생성 함수 (없는 주기는 daily)
+_PATTERNS_BY_PERIOD: Dict[str, Callable[[str], Dict]] = {
+    "weekly": _weekly_pattern,
+    "hourly": _hourly_pattern,
+    "daily": _daily_pattern,
+}
+
+# 요일별 판매량 배수 (월=0 ... 일=6, 월요일/금요일 증가)
+_WEEKDAY_MULTIPLIER = [1.3, 1.0, 1.0, 1.0, 1.2, 1.0, 1.0]
+
+
 @tool
 def analyze_sales_pattern(product_name: str, period: str = "weekly") -> str:
     """
@@ -108,50 +157,13 @@ def analyze_sales_pattern(product_name: str, period: str = "weekly") -> str:
     Returns:
         판매 패턴 분석 결과
     """
-    if period == "weekly":
-        pattern = {
-            "product": product_name,
-            "period": "weekly",
-            "peak_days": ["월요일", "금요일"],
-            "low_days": ["수요일"],
-            "avg_daily_sales": 28.5,
-            "peak_avg": 35,
-            "low_avg": 20,
-            "trend": "상승세",
-            "seasonality": "주말 전 수요 증가"
-        }
-    elif period == "hourly":
-        pattern = {
-            "product": product_name,
-            "period": "hourly",
-            "peak_hours": ["7-9시", "12-13시", "18-20시"],
-            "peak_sales": "아침 7-9시가 가장 높음",
-            "recommendation": "아침 시간대 재고 확보 필요"
-        }
-    else:
-        pattern = {
-            "product": product_name,
-            "period": "daily",
-            "avg_sales": 28.5,
-            "max_sales": 45,
-            "min_sales": 15
-        }
+    pattern = _PATTERNS_BY_PERIOD.get(period, _daily_pattern)(product_name)
     
-    return json.dumps(pattern, ensure_ascii=False)
+    return _dumps(pattern)
 
 
-@tool
-def get_trending_products(days: int = 7, top_n: int = 5) -> str:
-    """
-    인기 상승 상품을 조회합니다.
-    
-    Args:
-        days: 분석 기간
-        top_n: 상위 N개
-    
-    Returns:
-        트렌딩 상품 목록
-    """
+def _trending_products(days: int = 7, top_n: int = 5) -> List[Dict]:
+    """성장률 상위 상품 목록 - 도구 래퍼/JSON 변환 없이 직접 호출용"""
     db = get_db_connection()
     cursor = db.cursor()
     
@@ -161,36 +173,30 @@ def get_trending_products(days: int = 7, top_n: int = 5) -> str:
         previous_start = (datetime.now() - timedelta(days=days*2)).date()
         previous_end = current_start
         
+        # 두 기간을 한 번의 스캔으로 집계 (idx_date_prod_cov 커버링 인덱스만 읽음)
         cursor.execute("""
-            WITH current_sales AS (
+            SELECT 
+                product_name as product,
+                cur_qty as current_qty,
+                prev_qty as previous_qty,
+                CASE 
+                    WHEN prev_qty = 0 THEN 100.0
+                    ELSE ((cur_qty - prev_qty) / prev_qty) * 100
+                END as growth_rate
+            FROM (
                 SELECT 
                     product_name,
-                    SUM(quantity_sold) as qty
+                    SUM(CASE WHEN sale_date >= %s THEN quantity_sold ELSE 0 END) as cur_qty,
+                    SUM(CASE WHEN sale_date < %s THEN quantity_sold ELSE 0 END) as prev_qty,
+                    COUNT(CASE WHEN sale_date >= %s THEN 1 END) as cur_rows
                 FROM sales
                 WHERE sale_date >= %s
                 GROUP BY product_name
-            ),
-            previous_sales AS (
-                SELECT 
-                    product_name,
-                    SUM(quantity_sold) as qty
-                FROM sales
-                WHERE sale_date >= %s AND sale_date < %s
-                GROUP BY product_name
-            )
-            SELECT 
-                c.product_name as product,
-                c.qty as current_qty,
-                COALESCE(p.qty, 0) as previous_qty,
-                CASE 
-                    WHEN COALESCE(p.qty, 0) = 0 THEN 100.0
-                    ELSE ((c.qty - COALESCE(p.qty, 0)) / COALESCE(p.qty, 1)) * 100
-                END as growth_rate
-            FROM current_sales c
-            LEFT JOIN previous_sales p ON c.product_name = p.product_name
+            ) t
+            WHERE cur_rows > 0
             ORDER BY growth_rate DESC
             LIMIT %s
-        """, (current_start, previous_start, previous_end, top_n))
+        """, (current_start, previous_end, current_start, previous_start, top_n))
         
         trending = []
         for idx, row in enumerate(cursor.fetchall(), 1):
@@ -200,12 +206,27 @@ def get_trending_products(days: int = 7, top_n: int = 5) -> str:
                 "current_rank": idx
             })
         
-        return json.dumps(trending, ensure_ascii=False)
+        return trending
     finally:
         cursor.close()
         db.close()
 
 
+@tool
+def get_trending_products(days: int = 7, top_n: int = 5) -> str:
+    """
+    인기 상승 상품을 조회합니다.
+    
+    Args:
+        days: 분석 기간
+        top_n: 상위 N개
+    
+    Returns:
+        트렌딩 상품 목록
+    """
+    return _dumps(_trending_products(days, top_n))
+
+
 @tool
 def predict_daily_sales(product_name: str, target_date: Optional[str] = None) -> str:
     """
@@ -219,18 +240,13 @@ def predict_daily_sales(product_name: str, target_date: Optional[str] = None) ->
         예측 판매량
     """
     if not target_date:
-        target_date = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+        target_date = (datetime.now().date() + timedelta(days=1)).isoformat()
     
     # 간단한 예측 로직 (실제로는 ML 모델 사용)
     weekday = datetime.strptime(target_date, "%Y-%m-%d").weekday()
     base_sales = 30
     
-    if weekday == 0:  # 월요일
-        predicted = int(base_sales * 1.3)
-    elif weekday == 4:  # 금요일
-        predicted = int(base_sales * 1.2)
-    else:
-        predicted = base_sales
+    predicted = int(base_sales * _WEEKDAY_MULTIPLIER[weekday])
     
     prediction = {
         "product": product_name,
@@ -240,7 +256,7 @@ def predict_daily_sales(product_name: str, target_date: Optional[str] = None) ->
         "range": [int(predicted * 0.9), int(predicted * 1.1)]
     }
     
-    return json.dumps(prediction, ensure_ascii=False)
+    return _dumps(prediction)
 
 
 @tool
@@ -265,4 +281,4 @@ def analyze_sales_correlation(product1: str, product2: str) -> str:
         "recommendation": "번들 프로모션 추천"
     }
     
-    return json.dumps(correlation, ensure_ascii=False)
\ No newline at end of file
+    return _dumps(correlation)
\ No newline at end of file
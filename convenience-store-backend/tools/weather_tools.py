@@ -2,38 +2,103 @@
 날씨 기반 수요 예측 도구들
 """
 from langchain.tools import tool
-import json
-from datetime import datetime, timedelta
-from typing import Optional
+import orjson
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional
 
+from utils.cache import ttl_cache
 
-@tool
-def get_weather_forecast(days: int = 3, location: str = "서울") -> str:
+
+def _dumps(obj) -> str:
+    """JSON 문자열로 직렬화 (orjson - 한글은 그대로, datetime/date는 ISO 형식)"""
+    return orjson.dumps(obj).decode()
+
+
+# 날씨별 상품 영향도 (실제로는 과거 데이터 기반) - 모듈 로드 시 한 번 생성
+_WEATHER_IMPACT: Dict[str, Dict[str, Dict]] = {
+    "우산": {
+        "비": {"impact": "매우 높음", "multiplier": 8.0, "description": "비올 때 필수품"},
+        "눈": {"impact": "높음", "multiplier": 3.0},
+        "더위": {"impact": "없음", "multiplier": 1.0},
+        "추위": {"impact": "낮음", "multiplier": 1.2}
+    },
+    "아이스크림": {
+        "비": {"impact": "낮음", "multiplier": 0.7},
+        "눈": {"impact": "매우 낮음", "multiplier": 0.3},
+        "더위": {"impact": "매우 높음", "multiplier": 3.5},
+        "추위": {"impact": "낮음", "multiplier": 0.5}
+    },
+    "컵라면": {
+        "비": {"impact": "높음", "multiplier": 1.5, "description": "비오는 날 따뜻한 음식 선호"},
+        "눈": {"impact": "높음", "multiplier": 1.8},
+        "더위": {"impact": "낮음", "multiplier": 0.8},
+        "추위": {"impact": "높음", "multiplier": 1.6}
+    },
+    "음료수": {
+        "비": {"impact": "보통", "multiplier": 1.0},
+        "눈": {"impact": "낮음", "multiplier": 0.8},
+        "더위": {"impact": "매우 높음", "multiplier": 2.5},
+        "추위": {"impact": "낮음", "multiplier": 0.7}
+    }
+}
+
+# 예보 캐시 유지 시간 (초) - 예보는 보통 1시간 단위로 갱신
+FORECAST_CACHE_TTL = 1800
+
+# 특별 이벤트/공휴일 (실제로는 공휴일 API 조회)
+_SPECIAL_EVENTS: Dict[str, Dict[str, str]] = {
+    "2024-12-25": {"name": "크리스마스", "type": "공휴일", "impact": "높음"},
+    "2024-01-01": {"name": "신정", "type": "공휴일", "impact": "높음"},
+    "2024-02-14": {"name": "밸런타인데이", "type": "기념일", "impact": "중간"},
+}
+
+# 이벤트 응답 JSON은 날짜별로 미리 직렬화 (호출마다 다시 직렬화하지 않음)
+_EVENTS_JSON_BY_DATE: Dict[str, str] = {
+    date: _dumps(event) for date, event in _SPECIAL_EVENTS.items()
+}
+
+
+def _build_forecast(days: int = 3, location: str = "서울") -> Dict:
+    """날씨 예보 dict 생성 (도구 래퍼 없이 모듈 내부에서 직접 사용)"""
+    # 날짜가 바뀌면 캐시 키도 바뀌어 전날 예보를 반환하지 않음
+    return _fetch_forecast(days, location, datetime.now().date())
+
+
+@ttl_cache(ttl_seconds=FORECAST_CACHE_TTL, maxsize=64)
+def _fetch_forecast(days: int, location: str, today: date) -> Dict:
     """
-    날씨 예보를 조회합니다.
-    
-    Args:
-        days: 예보 일수
-        location: 지역
+    예보 조회 (지역/일수/날짜별로 30분 캐시 - 에이전트가 한 세션에서 여러 번 불러도 한 번만 조회)
     
-    Returns:
-        날씨 예보 정보 (JSON 문자열)
+    반환된 dict는 호출자끼리 공유되므로 수정하지 않습니다.
     """
     # 실제로는 기상청 API 호출
     forecast = []
-    weather_types = ["맑음", "흐림", "비", "눈"]
     
     for i in range(days):
-        date = (datetime.now() + timedelta(days=i)).strftime("%Y-%m-%d")
         forecast.append({
-            "date": date,
+            "date": (today + timedelta(days=i)).isoformat(),
             "weather": "비" if i == 1 else "맑음",  # 내일 비 예보
             "temperature": 15 + i,
             "precipitation_prob": 80 if i == 1 else 20,
             "humidity": 75 if i == 1 else 50
         })
     
-    return json.dumps({"location": location, "forecast": forecast}, ensure_ascii=False)
+    return {"location": location, "forecast": forecast}
+
+
+@tool
+def get_weather_forecast(days: int = 3, location: str = "서울") -> str:
+    """
+    날씨 예보를 조회합니다.
+    
+    Args:
+        days: 예보 일수
+        location: 지역
+    
+    Returns:
+        날씨 예보 정보 (JSON 문자열)
+    """
+    return _dumps(_build_forecast(days, location))
 
 
 @tool
@@ -48,36 +113,8 @@ def analyze_weather_impact(product_name: str, weather_condition: str) -> str:
     Returns:
         날씨 영향 분석 결과
     """
-    # 날씨별 상품 영향도 (실제로는 과거 데이터 기반)
-    weather_impact = {
-        "우산": {
-            "비": {"impact": "매우 높음", "multiplier": 8.0, "description": "비올 때 필수품"},
-            "눈": {"impact": "높음", "multiplier": 3.0},
-            "더위": {"impact": "없음", "multiplier": 1.0},
-            "추위": {"impact": "낮음", "multiplier": 1.2}
-        },
-        "아이스크림": {
-            "비": {"impact": "낮음", "multiplier": 0.7},
-            "눈": {"impact": "매우 낮음", "multiplier": 0.3},
-            "더위": {"impact": "매우 높음", "multiplier": 3.5},
-            "추위": {"impact": "낮음", "multiplier": 0.5}
-        },
-        "컵라면": {
-            "비": {"impact": "높음", "multiplier": 1.5, "description": "비오는 날 따뜻한 음식 선호"},
-            "눈": {"impact": "높음", "multiplier": 1.8},
-            "더위": {"impact": "낮음", "multiplier": 0.8},
-            "추위": {"impact": "높음", "multiplier": 1.6}
-        },
-        "음료수": {
-            "비": {"impact": "보통", "multiplier": 1.0},
-            "눈": {"impact": "낮음", "multiplier": 0.8},
-            "더위": {"impact": "매우 높음", "multiplier": 2.5},
-            "추위": {"impact": "낮음", "multiplier": 0.7}
-        }
-    }
-    
-    if product_name in weather_impact and weather_condition in weather_impact[product_name]:
-        impact_data = weather_impact[product_name][weather_condition]
+    impact_data = _WEATHER_IMPACT.get(product_name, {}).get(weather_condition)
+    if impact_data is not None:
         result = {
             "product": product_name,
             "weather": weather_condition,
@@ -95,7 +132,7 @@ def analyze_weather_impact(product_name: str, weather_condition: str) -> str:
             "description": "특별한 영향 없음"
         }
     
-    return json.dumps(result, ensure_ascii=False)
+    return _dumps(result)
 
 
 @tool
@@ -110,10 +147,10 @@ def get_weather_based_recommendations(target_date: Optional[str] = None) -> str:
         날씨 기반 추천 사항
     """
     if not target_date:
-        target_date = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+        target_date = (datetime.now().date() + timedelta(days=1)).isoformat()
     
-    # 날씨 예보 가져오기
-    weather_data = json.loads(get_weather_forecast.invoke({}))
+    # 날씨 예보 가져오기 (JSON 직렬화/파싱 없이 dict 그대로)
+    weather_data = _build_forecast(3, "서울")
     tomorrow_weather = weather_data["forecast"][1] if len(weather_data["forecast"]) > 1 else weather_data["forecast"][0]
     
     recommendations = []
@@ -139,7 +176,7 @@ def get_weather_based_recommendations(target_date: Optional[str] = None) -> str:
         "recommendations": recommendations
     }
     
-    return json.dumps(result, ensure_ascii=False)
+    return _dumps(result)
 
 
 @tool
@@ -153,17 +190,10 @@ def check_special_events(date: Optional[str] = None) -> str:
     Returns:
         이벤트 정보
     """
-    # 실제로는 공휴일 API 조회
-    events = {
-        "2024-12-25": {"name": "크리스마스", "type": "공휴일", "impact": "높음"},
-        "2024-01-01": {"name": "신정", "type": "공휴일", "impact": "높음"},
-        "2024-02-14": {"name": "밸런타인데이", "type": "기념일", "impact": "중간"},
-    }
-    
     if not date:
-        date = datetime.now().strftime("%Y-%m-%d")
+        date = datetime.now().date().isoformat()
     
-    if date in events:
-        return json.dumps(events[date], ensure_ascii=False)
-    else:
-        return json.dumps({"date": date, "events": "없음"}, ensure_ascii=False)
\ No newline at end of file
+    event_json = _EVENTS_JSON_BY_DATE.get(date)
+    if event_json is not None:
+        return event_json
+    return _dumps({"date": date, "events": "없음"})
\ No newline at end of file
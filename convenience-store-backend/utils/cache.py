@@ -0,0 +1,123 @@
+"""
+간단한 TTL 캐시 유틸리티
+동기/비동기 함수 결과를 일정 시간 동안 메모리에 보관합니다.
+"""
+import asyncio
+import functools
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+def _make_key(args: tuple, kwargs: dict) -> Hashable:
+    """함수 인자로 캐시 키 생성"""
+    if kwargs:
+        return args + tuple(sorted(kwargs.items()))
+    return args
+
+
+def ttl_cache(ttl_seconds: float = 300, maxsize: int = 128) -> Callable:
+    """
+    TTL 기반 캐시 데코레이터
+    
+    - 동기 함수와 async 함수 모두 지원 (async 함수는 코루틴이 아닌 결과값을 캐시)
+    - async 함수는 같은 키로 동시에 들어온 호출이 진행 중인 한 번의 실행 결과를 함께 기다림
+    - ttl_seconds가 지나면 다시 계산
+    - 래핑된 함수의 cache_clear()로 즉시 무효화
+    
+    Args:
+        ttl_seconds: 캐시 유지 시간 (초)
+        maxsize: 최대 보관 항목 수 (초과 시 가장 오래된 항목부터 제거)
+    """
+    def decorator(func: Callable) -> Callable:
+        store: Dict[Hashable, Tuple[float, Any]] = {}
+        # async 함수: 키별로 진행 중인 실행 (동시 미스가 함수를 중복 실행하지 않도록)
+        inflight: Dict[Hashable, asyncio.Future] = {}
+        # cache_clear() 이전에 시작된 실행 결과는 저장하지 않도록 세대 번호로 구분
+        generation = [0]
+        lock = threading.Lock()
+        
+        def _get(key: Hashable):
+            with lock:
+                entry = store.get(key)
+                if entry is None:
+                    return False, None
+                expires_at, value = entry
+                if expires_at < time.monotonic():
+                    del store[key]
+                    return False, None
+                return True, value
+        
+        def _set(key: Hashable, value: Any, started_generation: int):
+            with lock:
+                if started_generation != generation[0]:
+                    return
+                if key not in store and len(store) >= maxsize:
+                    store.pop(next(iter(store)))
+                store[key] = (time.monotonic() + ttl_seconds, value)
+        
+        def cache_clear():
+            with lock:
+                store.clear()
+                inflight.clear()
+                generation[0] += 1
+        
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                key = _make_key(args, kwargs)
+                hit, value = _get(key)
+                if hit:
+                    return value
+                
+                with lock:
+                    pending = inflight.get(key)
+                    if pending is None:
+                        pending = asyncio.get_running_loop().create_future()
+                        inflight[key] = pending
+                        started_generation = generation[0]
+                        owner = True
+                    else:
+                        owner = False
+                
+                if not owner:
+                    # 먼저 시작된 실행 결과를 공유 (대기 중인 호출이 취소돼도 실행은 계속)
+                    return await asyncio.shield(pending)
+                
+                try:
+                    value = await func(*args, **kwargs)
+                except asyncio.CancelledError:
+                    pending.cancel()
+                    raise
+                except BaseException as e:
+                    pending.set_exception(e)
+                    # 기다리는 호출이 없어도 "exception was never retrieved" 경고가 나지 않도록
+                    pending.exception()
+                    raise
+                else:
+                    _set(key, value, started_generation)
+                    pending.set_result(value)
+                    return value
+                finally:
+                    with lock:
+                        if inflight.get(key) is pending:
+                            del inflight[key]
+            
+            async_wrapper.cache_clear = cache_clear
+            return async_wrapper
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = _make_key(args, kwargs)
+            hit, value = _get(key)
+            if hit:
+                return value
+            started_generation = generation[0]
+            value = func(*args, **kwargs)
+            _set(key, value, started_generation)
+            return value
+        
+        wrapper.cache_clear = cache_clear
+        return wrapper
+    
+    return decorator
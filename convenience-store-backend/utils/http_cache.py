@@ -0,0 +1,97 @@
+"""
+HTTP 캐시 헤더 (ETag / Cache-Control) 미들웨어
+지정한 GET 경로의 응답에 ETag와 max-age를 붙이고, 브라우저가 같은 ETag로
+재요청(If-None-Match)하면 본문 없이 304 Not Modified를 반환합니다.
+"""
+import hashlib
+from typing import Dict, List
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# 304 응답에서 제외할 헤더 (본문이 없으므로)
+_BODY_HEADERS = {b"content-length", b"content-type", b"content-encoding"}
+
+
+def _opaque_tag(tag: bytes) -> bytes:
+    """약한 비교용 태그 값 (W/ 접두사 제거)"""
+    return tag[2:] if tag.startswith(b"W/") else tag
+
+
+def _etag_matches(if_none_match: bytes, etag: bytes) -> bool:
+    """
+    If-None-Match 헤더 값이 etag와 일치하는지 확인 (RFC 9110 약한 비교)
+    
+    쉼표로 구분된 ETag 목록과 "*"를 지원하고, 각 항목의 앞뒤 공백과 W/ 접두사는 무시합니다.
+    """
+    target = _opaque_tag(etag)
+    for token in if_none_match.split(b","):
+        token = token.strip()
+        if token == b"*" or (token and _opaque_tag(token) == target):
+            return True
+    return False
+
+
+class ETagMiddleware:
+    """
+    경로별 HTTP 캐시 헤더 미들웨어 (순수 ASGI)
+    
+    GZipMiddleware보다 먼저 add_middleware 해야 압축 전 본문으로 ETag를 계산합니다.
+    압축 여부와 관계없이 같은 내용이면 같은 값이므로 약한 ETag(W/"...")를 사용합니다.
+    
+    Args:
+        app: ASGI 앱
+        max_age: 경로 -> Cache-Control max-age(초)
+    """
+    
+    def __init__(self, app: ASGIApp, max_age: Dict[str, int]):
+        self.app = app
+        self.max_age = max_age
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "GET" or scope["path"] not in self.max_age:
+            await self.app(scope, receive, send)
+            return
+        
+        max_age = self.max_age[scope["path"]]
+        # 같은 헤더가 여러 줄로 오면 쉼표 목록으로 합침
+        if_none_match = b",".join(value for name, value in scope["headers"] if name == b"if-none-match")
+        
+        start: Message = {}
+        body: List[bytes] = []
+        
+        async def buffer_send(message: Message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            
+            body.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            
+            # 오류 응답은 캐시 헤더 없이 그대로 전달
+            if start["status"] != 200:
+                await send(start)
+                await send({"type": "http.response.body", "body": b"".join(body)})
+                return
+            
+            content = b"".join(body)
+            etag = b'W/"' + hashlib.blake2b(content, digest_size=16).hexdigest().encode() + b'"'
+            cache_headers = [
+                (b"etag", etag),
+                (b"cache-control", f"public, max-age={max_age}".encode()),
+            ]
+            
+            if if_none_match and _etag_matches(if_none_match, etag):
+                headers = [(k, v) for k, v in start["headers"] if k.lower() not in _BODY_HEADERS]
+                await send({"type": "http.response.start", "status": 304, "headers": headers + cache_headers})
+                await send({"type": "http.response.body", "body": b""})
+                return
+            
+            await send({**start, "headers": list(start["headers"]) + cache_headers})
+            await send({"type": "http.response.body", "body": content})
+        
+        await self.app(scope, receive, buffer_send)
@@ -0,0 +1,140 @@
+"""
+API 응답 캐시
+REDIS_URL이 설정되어 있으면 Redis(워커 간 공유), 없으면 프로세스 메모리에 저장합니다.
+"""
+import os
+import time
+import inspect
+import functools
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from anyio import from_thread
+import orjson
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+# Redis 클라이언트 (REDIS_URL이 있을 때만 생성)
+_redis = None
+
+# 메모리 캐시 최대 항목 수 (키에 쿼리 파라미터가 들어가므로 상한을 둠)
+LOCAL_CACHE_MAXSIZE = 1024
+
+# 메모리 캐시: key -> (만료 시각, 직렬화된 값), 최근에 쓴 키가 뒤쪽 (LRU)
+_local: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+
+
+def _get_redis():
+    """Redis 클라이언트 싱글톤 (설정이 없거나 패키지가 없으면 None)"""
+    global _redis
+    if _redis is None and aioredis is not None:
+        redis_url = os.getenv("REDIS_URL")
+        if redis_url:
+            _redis = aioredis.from_url(redis_url)
+    return _redis
+
+
+async def _get(key: str) -> Optional[bytes]:
+    r = _get_redis()
+    if r is not None:
+        return await r.get(key)
+    
+    entry = _local.get(key)
+    if entry is None:
+        return None
+    expires_at, raw = entry
+    if expires_at < time.monotonic():
+        _local.pop(key, None)
+        return None
+    _local.move_to_end(key)
+    return raw
+
+
+def _evict_local():
+    """메모리 캐시가 가득 차면 만료된 항목을 먼저 지우고, 그래도 차 있으면 가장 오래 안 쓴 항목부터 제거"""
+    now = time.monotonic()
+    for key in [k for k, (expires_at, _) in _local.items() if expires_at < now]:
+        del _local[key]
+    while len(_local) >= LOCAL_CACHE_MAXSIZE:
+        _local.popitem(last=False)
+
+
+async def _set(key: str, raw: bytes, ttl: int):
+    r = _get_redis()
+    if r is not None:
+        await r.setex(key, ttl, raw)
+    else:
+        if key not in _local and len(_local) >= LOCAL_CACHE_MAXSIZE:
+            _evict_local()
+        _local[key] = (time.monotonic() + ttl, raw)
+        _local.move_to_end(key)
+
+
+async def cached(key: str, ttl: int, compute: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    key에 캐시된 응답이 있으면 반환하고, 없으면 compute()로 계산해 ttl초 동안 저장
+    
+    캐시 저장소 오류는 경고만 남기고 compute() 결과를 그대로 반환합니다.
+    """
+    try:
+        raw = await _get(key)
+        if raw is not None:
+            return orjson.loads(raw)
+    except Exception as e:
+        logger.warning(f"⚠️ 응답 캐시 조회 실패 ({key}): {e}")
+    
+    value = await compute()
+    
+    try:
+        await _set(key, orjson.dumps(value), ttl)
+    except Exception as e:
+        logger.warning(f"⚠️ 응답 캐시 저장 실패 ({key}): {e}")
+    return value
+
+
+async def invalidate(*prefixes: str):
+    """prefix로 시작하는 캐시 키 삭제 (데이터 변경 후 호출)"""
+    try:
+        r = _get_redis()
+        if r is not None:
+            for prefix in prefixes:
+                keys = [key async for key in r.scan_iter(match=f"{prefix}*")]
+                if keys:
+                    await r.delete(*keys)
+        else:
+            for key in [k for k in _local if k.startswith(prefixes)]:
+                _local.pop(key, None)
+    except Exception as e:
+        logger.warning(f"⚠️ 응답 캐시 삭제 실패 ({prefixes}): {e}")
+
+
+def invalidate_from_thread(*prefixes: str):
+    """동기 엔드포인트(스레드풀)에서 invalidate() 호출 - 이벤트 루프에서 실행하고 끝날 때까지 기다림"""
+    from_thread.run(invalidate, *prefixes)
+
+
+def cache_response(key: str, ttl: int) -> Callable:
+    """
+    async 엔드포인트 응답 캐시 데코레이터
+    
+    key는 엔드포인트 인자로 포맷됩니다. 예: @cache_response("stats:trend:{days}", ttl=60)
+    functools.wraps로 원래 시그니처를 유지하므로 FastAPI 파라미터 해석에 영향이 없습니다.
+    """
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+        
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return await cached(key.format(**bound.arguments), ttl, lambda: func(*args, **kwargs))
+        
+        return wrapper
+    
+    return decorator
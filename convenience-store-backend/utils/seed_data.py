@@ -4,20 +4,41 @@ MySQL 데이터베이스와 벡터 스토어에 테스트 데이터를 추가합
 """
 import sys
 import os
+import traceback
 from datetime import datetime, timedelta
 import random
 
+import numpy as np
+
 # 프로젝트 루트를 경로에 추가
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from database import get_db
-from rag import get_rag
+from database import get_db, init_pool, run_migrations, refresh_sales_daily
 
+# 다중 행 INSERT 한 문장에 담을 행 수 (max_allowed_packet 기본값 내에서 여유 있게)
+SEED_BATCH_SIZE = 500
 
-def seed_inventory_data():
-    """재고 데이터 생성"""
-    db = get_db()
-    
+# INSERT 컬럼 순서 (생성한 튜플을 RAG 인덱싱용 dict로 바꿀 때 사용)
+INVENTORY_COLUMNS = ("product_name", "category", "quantity", "unit_price", "expiry_date")
+SALES_COLUMNS = ("product_name", "quantity_sold", "sale_price", "sale_date", "sale_time", "day_of_week")
+ORDER_COLUMNS = (
+    "product_name", "quantity_ordered", "unit_cost", "total_cost", "order_date", "delivery_date", "status"
+)
+
+# 판매 시간대 (아침, 점심, 저녁)와 판매 가격 후보
+SALE_HOURS = (8, 12, 19)
+SALE_PRICES = (1500, 2000, 2500, 5000)
+
+# 시드 인덱싱 임베딩 배치 크기
+SEED_EMBED_BATCH_SIZE = 64
+
+# 난수 시드 - 다시 실행해도 같은 데이터가 생성되어 임베딩 캐시가 그대로 적중함
+# (시더마다 이 시드로 자기 생성기를 만들어 실행 순서와 무관하게 같은 값이 나옴)
+SEED_RANDOM = int(os.getenv("SEED_RANDOM", "42"))
+
+
+def seed_inventory_data(db):
+    """재고 데이터 생성 (커밋은 호출자가, 인덱싱용 행 dict 목록 반환)"""
     products = [
         ("삼각김밥", "즉석식품", 15, 1500, "2024-12-20"),
         ("도시락", "즉석식품", 8, 5000, "2024-12-18"),
@@ -32,148 +53,145 @@ def seed_inventory_data():
     ]
     
     print("📦 재고 데이터 생성 중...")
-    for product_name, category, quantity, unit_price, expiry_date in products:
-        query = """
-            INSERT INTO inventory (product_name, category, quantity, unit_price, expiry_date)
-            VALUES (%s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE 
-                quantity = VALUES(quantity),
-                unit_price = VALUES(unit_price),
-                expiry_date = VALUES(expiry_date)
-        """
-        db.execute_query(query, (product_name, category, quantity, unit_price, expiry_date))
+    query = """
+        INSERT INTO inventory (product_name, category, quantity, unit_price, expiry_date)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE 
+            quantity = VALUES(quantity),
+            unit_price = VALUES(unit_price),
+            expiry_date = VALUES(expiry_date)
+    """
+    # 행마다 왕복하지 않고 executemany로 한 번에 저장
+    if not db.execute_many(query, products, batch_size=SEED_BATCH_SIZE, commit=False):
+        raise RuntimeError("재고 데이터 저장 실패")
     
     print(f"✅ {len(products)}개 상품 재고 데이터 생성 완료")
     
-    # 벡터 스토어에 인덱싱
-    inventory_data = db.fetch_all("SELECT * FROM inventory")
-    rag = get_rag()
-    rag.index_inventory_data(inventory_data)
-    print("✅ 재고 데이터 벡터 인덱싱 완료")
+    # 벡터 스토어 인덱싱용 (방금 저장한 행을 그대로 사용, 테이블을 다시 읽지 않음)
+    return [dict(zip(INVENTORY_COLUMNS, product)) for product in products]
 
 
-def seed_sales_data():
-    """판매 데이터 생성 (최근 30일)"""
-    db = get_db()
-    rag = get_rag()
-    
+def seed_sales_data(db):
+    """판매 데이터 생성 (최근 30일, 커밋은 호출자가, 인덱싱용 행 dict 이터레이터 반환)"""
     products = ["삼각김밥", "도시락", "컵라면", "우유", "빵", "음료수", "과자", "라면"]
     days_of_week = ["월", "화", "수", "목", "금", "토", "일"]
     
     print("📊 판매 데이터 생성 중...")
-    sales_count = 0
+    query = """
+        INSERT INTO sales (product_name, quantity_sold, sale_price, sale_date, sale_time, day_of_week)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """
+    # 날짜별 값 (최근 30일) - 현재 시각은 한 번만 읽고 날짜 문자열/요일을 미리 계산
+    today = datetime.now().date()
+    sale_dates = [today - timedelta(days=i) for i in range(30)]
+    days = [(sale_date.isoformat(), days_of_week[sale_date.weekday()]) for sale_date in sale_dates]
     
-    for i in range(30):  # 최근 30일
-        sale_date = datetime.now() - timedelta(days=i)
-        weekday = sale_date.weekday()
-        day_name = days_of_week[weekday]
-        
-        for product in products:
-            # 요일별 판매 패턴
-            base_sales = random.randint(20, 40)
-            
-            if weekday == 0:  # 월요일
-                quantity = int(base_sales * 1.3)
-            elif weekday == 4:  # 금요일
-                quantity = int(base_sales * 1.2)
-            elif weekday in [5, 6]:  # 주말
-                quantity = int(base_sales * 0.8)
-            else:
-                quantity = base_sales
-            
-            # 시간대별 판매 (아침, 점심, 저녁)
-            for hour in [8, 12, 19]:
-                sale_time = f"{hour:02d}:{random.randint(0, 59):02d}:00"
-                sale_price = random.choice([1500, 2000, 2500, 5000])
-                
-                query = """
-                    INSERT INTO sales (product_name, quantity_sold, sale_price, sale_date, sale_time, day_of_week)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                """
-                db.execute_query(query, (
-                    product,
-                    random.randint(1, 5),
-                    sale_price,
-                    sale_date.strftime("%Y-%m-%d"),
-                    sale_time,
-                    day_name
-                ))
-                sales_count += 1
-    
-    print(f"✅ {sales_count}개 판매 데이터 생성 완료")
-    
-    # 벡터 스토어에 인덱싱
-    sales_data = db.fetch_all("SELECT * FROM sales ORDER BY sale_date DESC LIMIT 500")
-    rag.index_sales_data(sales_data)
-    print("✅ 판매 데이터 벡터 인덱싱 완료")
-
-
-def seed_order_data():
-    """발주 데이터 생성"""
-    db = get_db()
-    rag = get_rag()
+    # 수량/판매 시각(분)/가격을 (일, 상품, 시간대) 배열로 한 번에 생성
+    rng = np.random.default_rng(SEED_RANDOM)
+    shape = (len(days), len(products), len(SALE_HOURS))
+    quantities = rng.integers(1, 6, size=shape).tolist()
+    minutes = rng.integers(0, 60, size=shape).tolist()
+    prices = rng.choice(SALE_PRICES, size=shape).tolist()
+    
+    rows = [
+        (product, quantity, price, sale_date, f"{hour:02d}:{minute:02d}:00", day_name)
+        for (sale_date, day_name), day_qty, day_min, day_price in zip(days, quantities, minutes, prices)
+        for product, product_qty, product_min, product_price in zip(products, day_qty, day_min, day_price)
+        for hour, quantity, minute, price in zip(SALE_HOURS, product_qty, product_min, product_price)
+    ]
+    
+    # 행마다 왕복하지 않고 SEED_BATCH_SIZE행씩 다중 행 INSERT로 저장
+    if not db.execute_many(query, rows, batch_size=SEED_BATCH_SIZE, commit=False):
+        raise RuntimeError("판매 데이터 저장 실패")
     
+    print(f"✅ {len(rows)}개 판매 데이터 생성 완료")
+    
+    # 벡터 스토어 인덱싱용 (생성한 행 중 최근 500건, 행은 최근 날짜부터 생성됨)
+    # dict는 인덱싱하면서 배치 단위로 만들어지도록 제너레이터로 반환
+    return (dict(zip(SALES_COLUMNS, row)) for row in rows[:500])
+
+
+def seed_order_data(db):
+    """발주 데이터 생성 (커밋은 호출자가, 인덱싱용 행 dict 목록 반환)"""
     products = ["삼각김밥", "도시락", "컵라면", "우유", "빵"]
     
     print("📋 발주 데이터 생성 중...")
+    rows = []
+    rand = random.Random(SEED_RANDOM)
     
-    for i in range(10):  # 최근 10건의 발주
-        order_date = datetime.now() - timedelta(days=i*3)
-        delivery_date = order_date + timedelta(days=1)
-        
-        for product in random.sample(products, 3):
-            quantity = random.randint(20, 50)
-            unit_cost = random.choice([1000, 1500, 2000])
+    # 최근 10건의 발주 날짜/배송일 문자열을 미리 계산 (행마다 strftime 하지 않음)
+    today = datetime.now().date()
+    order_dates = [today - timedelta(days=i*3) for i in range(10)]
+    order_days = [
+        (order_date.isoformat(), (order_date + timedelta(days=1)).isoformat())
+        for order_date in order_dates
+    ]
+    
+    for order_date, delivery_date in order_days:
+        for product in rand.sample(products, 3):
+            quantity = rand.randint(20, 50)
+            unit_cost = rand.choice([1000, 1500, 2000])
             total_cost = quantity * unit_cost
-            status = random.choice(["completed", "completed", "pending"])
+            status = rand.choice(["completed", "completed", "pending"])
             
-            query = """
-                INSERT INTO orders (product_name, quantity_ordered, unit_cost, total_cost, order_date, delivery_date, status)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """
-            db.execute_query(query, (
+            rows.append((
                 product,
                 quantity,
                 unit_cost,
                 total_cost,
-                order_date.strftime("%Y-%m-%d"),
-                delivery_date.strftime("%Y-%m-%d"),
+                order_date,
+                delivery_date,
                 status
             ))
     
+    # 다중 행 INSERT 한 문장으로 저장 (발주 ID는 인덱싱 문서 ID에 쓰이므로 첫 ID를 받음)
+    query = """
+        INSERT INTO orders (product_name, quantity_ordered, unit_cost, total_cost, order_date, delivery_date, status)
+        VALUES 
+    """ + ",".join(["(%s, %s, %s, %s, %s, %s, %s)"] * len(rows))
+    params = tuple(value for row in rows for value in row)
+    first_id = db.execute_insert(query, params, commit=False)
+    if first_id is None:
+        raise RuntimeError("발주 데이터 저장 실패")
+    
     print("✅ 발주 데이터 생성 완료")
     
-    # 벡터 스토어에 인덱싱
-    order_data = db.fetch_all("SELECT * FROM orders ORDER BY order_date DESC")
-    rag.index_order_data(order_data)
-    print("✅ 발주 데이터 벡터 인덱싱 완료")
+    # 벡터 스토어 인덱싱용 (단일 다중 행 INSERT의 AUTO_INCREMENT ID는 연속적으로 할당됨)
+    return [
+        dict(zip(ORDER_COLUMNS, row), id=order_id)
+        for order_id, row in enumerate(rows, start=first_id)
+    ]
 
 
-def seed_weather_data():
-    """날씨 데이터 생성"""
-    db = get_db()
-    
+def seed_weather_data(db):
+    """날씨 데이터 생성 (커밋은 호출자가)"""
     weather_conditions = ["맑음", "흐림", "비", "눈", "흐림"]
     
     print("🌤️ 날씨 데이터 생성 중...")
+    query = """
+        INSERT INTO weather_history (date, temperature, weather_condition, precipitation_probability, humidity)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            temperature = VALUES(temperature),
+            weather_condition = VALUES(weather_condition)
+    """
+    # 최근 30일 날짜 문자열을 미리 계산 (현재 시각은 한 번만 읽음)
+    today = datetime.now().date()
+    weather_dates = [(today - timedelta(days=i)).isoformat() for i in range(30)]
     
-    for i in range(30):
-        date = datetime.now() - timedelta(days=i)
-        
-        query = """
-            INSERT INTO weather_history (date, temperature, weather_condition, precipitation_probability, humidity)
-            VALUES (%s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-                temperature = VALUES(temperature),
-                weather_condition = VALUES(weather_condition)
-        """
-        db.execute_query(query, (
-            date.strftime("%Y-%m-%d"),
-            random.randint(5, 25),
-            random.choice(weather_conditions),
-            random.randint(0, 100),
-            random.randint(40, 80)
-        ))
+    # 기온/날씨/강수확률/습도를 날짜 수만큼 한 번에 생성 (범위는 양끝 포함)
+    rng = np.random.default_rng(SEED_RANDOM)
+    n = len(weather_dates)
+    rows = list(zip(
+        weather_dates,
+        rng.integers(5, 26, size=n).tolist(),
+        rng.choice(weather_conditions, size=n).tolist(),
+        rng.integers(0, 101, size=n).tolist(),
+        rng.integers(40, 81, size=n).tolist()
+    ))
+    
+    if not db.execute_many(query, rows, batch_size=SEED_BATCH_SIZE, commit=False):
+        raise RuntimeError("날씨 데이터 저장 실패")
     
     print("✅ 날씨 데이터 생성 완료")
 
@@ -185,22 +203,46 @@ def main():
     print("="*60 + "\n")
     
     try:
-        # 데이터베이스 연결 확인
-        db = get_db()
-        if not db.connection or not db.connection.is_connected():
-            print("❌ MySQL 연결 실패. .env 파일의 데이터베이스 설정을 확인하세요.")
+        # 데이터베이스 연결 확인 (테이블 마이그레이션 + 커넥션 풀 생성)
+        try:
+            run_migrations()
+            init_pool()
+        except Exception as e:
+            print(f"❌ MySQL 연결 실패 ({e}). .env 파일의 데이터베이스 설정을 확인하세요.")
             return
         
         print("✅ MySQL 연결 성공\n")
         
-        # 샘플 데이터 생성
-        seed_inventory_data()
-        print()
-        seed_sales_data()
-        print()
-        seed_order_data()
-        print()
-        seed_weather_data()
+        # 샘플 데이터 생성 - 네 테이블 전체를 하나의 트랜잭션으로 저장하고 마지막에 한 번만 커밋
+        # (실패하면 with 블록이 롤백하므로 일부 테이블만 채워진 상태로 남지 않음.
+        #  sales/orders INSERT는 멱등이 아니라 테이블별로 커밋하면 재실행 시 행이 중복됨)
+        with get_db() as db:
+            db.begin()
+            inventory_data = seed_inventory_data(db)
+            print()
+            sales_data = seed_sales_data(db)
+            print()
+            order_data = seed_order_data(db)
+            print()
+            seed_weather_data(db)
+            db.commit()
+        
+        refresh_sales_daily(since=(datetime.now() - timedelta(days=30)).date())
+        
+        # 커밋이 끝난 뒤 벡터 스토어에 인덱싱 (롤백된 행이 인덱스에 남지 않도록)
+        # 세 컬렉션 문서를 모아 한 번에 임베딩한 뒤 컬렉션마다 일괄 upsert
+        print("\n🔍 벡터 인덱싱 중...")
+        # RAG 패키지는 임베딩 모델(torch 등)까지 불러오므로 DB 시드가 끝난 뒤에 import
+        from rag import get_rag, configure as configure_rag
+        
+        # 임베딩 장치/배치 설정 (EMBEDDING_DEVICE 미지정 시 GPU가 있으면 자동 사용)
+        configure_rag(device=os.getenv("EMBEDDING_DEVICE"), embed_batch_size=SEED_EMBED_BATCH_SIZE)
+        indexed = get_rag().bulk_index({
+            "inventory_history": inventory_data,
+            "sales_patterns": sales_data,
+            "order_history": order_data,
+        })
+        print(f"✅ {indexed}개 문서 벡터 인덱싱 완료")
         
         print("\n" + "="*60)
         print("✨ 모든 샘플 데이터 생성 완료!")
@@ -210,10 +252,7 @@ def main():
         
     except Exception as e:
         print(f"\n❌ 오류 발생: {e}")
-        import traceback
         traceback.print_exc()
-    finally:
-        db.disconnect()
 
 
 if __name__ == "__main__":
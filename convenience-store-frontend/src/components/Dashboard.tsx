@@ -20,6 +20,9 @@ interface SalesData {
   orders: number;
 }
 
+// Trend dates arrive as ISO "YYYY-MM-DD"; show them as "MM/DD" on the chart
+const formatDay = (isoDate: string) => isoDate.slice(5).replace('-', '/');
+
 interface Product {
   name: string;
   sales: number;
@@ -49,29 +52,14 @@ export function Dashboard() {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        // Fetch stats
-        const statsRes = await fetch(API_ENDPOINTS.stats);
-        if (!statsRes.ok) throw new Error('Failed to fetch stats');
-        const statsData = await statsRes.json();
-        setStats(statsData);
-
-        // Fetch sales data (last 7 days)
-        const salesRes = await fetch(`${API_ENDPOINTS.salesData}?days=7`);
-        if (!salesRes.ok) throw new Error('Failed to fetch sales data');
-        const salesData = await salesRes.json();
-        setSalesData(salesData.data || []);
-
-        // Fetch top products
-        const productsRes = await fetch(`${API_ENDPOINTS.products}?limit=5`);
-        if (!productsRes.ok) throw new Error('Failed to fetch products');
-        const productsData = await productsRes.json();
-        setTopProducts(productsData.products || []);
-
-        // Fetch categories
-        const categoriesRes = await fetch(API_ENDPOINTS.categories);
-        if (!categoriesRes.ok) throw new Error('Failed to fetch categories');
-        const categoriesData = await categoriesRes.json();
-        setCategoryData(categoriesData.data || []);
+        // Fetch stats, sales trend, top products and categories in one request
+        const res = await fetch(`${API_ENDPOINTS.dashboard}?days=7&limit=5`);
+        if (!res.ok) throw new Error('Failed to fetch dashboard data');
+        const data = await res.json();
+        setStats(data.summary);
+        setSalesData(data.sales || []);
+        setTopProducts(data.products || []);
+        setCategoryData(data.categories || []);
       } catch (error) {
         console.error('Failed to fetch data:', error);
         toast.error('데이터를 불러오는데 실패했습니다.');
@@ -209,9 +197,10 @@ export function Dashboard() {
           <ResponsiveContainer width="100%" height={250}>
             <LineChart data={salesData}>
               <CartesianGrid strokeDasharray="3 3" stroke="#e2e8f0" />
-              <XAxis dataKey="date" stroke="#64748b" />
+              <XAxis dataKey="date" stroke="#64748b" tickFormatter={formatDay} />
               <YAxis stroke="#64748b" />
               <Tooltip
+                labelFormatter={formatDay}
                 contentStyle={{
                   backgroundColor: 'white',
                   border: '1px solid #e2e8f0',
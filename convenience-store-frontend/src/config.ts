@@ -5,6 +5,7 @@ export const config = {
 
 export const API_ENDPOINTS = {
     // Dashboard
+    dashboard: `${config.apiUrl}/api/dashboard/bootstrap`,
     stats: `${config.apiUrl}/api/stats/summary`,
     salesData: `${config.apiUrl}/api/stats/sales/trend`,
     products: `${config.apiUrl}/api/stats/products/top`,